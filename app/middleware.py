@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+
+from core import instrumentation, routers
+
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+    Measure every request and report where its time went.
+
+    SQL is counted and timed through the execute wrapper every database
+    connection carries. The view and template rendering are recorded as
+    spans, next to any span the code adds with `core.instrumentation.timed()`.
+    The timings are sent back in a Server-Timing header and folded into
+    the per route histograms behind the metrics endpoint. Requests slower
+    than SLOW_REQUEST_THRESHOLD_MS are logged together with their SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        self.keep_queries = (
+            settings.SLOW_REQUEST_LOGGED_QUERIES if self.threshold else 0
+        )
+        if asyncio.iscoroutinefunction(get_response):
+            # Let Django call us without a thread switch under ASGI
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = instrumentation.RequestMetrics(self.keep_queries)
+        request._metrics = metrics
+        with instrumentation.collect(metrics):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        metrics = instrumentation.RequestMetrics(self.keep_queries)
+        request._metrics = metrics
+        with instrumentation.collect(metrics):
+            response = await self.get_response(request)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        """Report the measurements of a handled request"""
+        metrics = request._metrics
+        self._end_span(request, 'view', '_view_started')
+        self._end_span(request, 'render', '_render_started')
+
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = metrics.server_timing()
+        route = self.get_route(request)
+        instrumentation.histograms.add(
+            route,
+            metrics.elapsed,
+            metrics.query_count,
+            metrics.query_seconds,
+            size
+        )
+        if self.threshold and metrics.elapsed * 1000 >= self.threshold:
+            self.log_slow_request(route, metrics, size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Open the view span"""
+        request._view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Close the view span, the response is rendered next"""
+        self._end_span(request, 'view', '_view_started')
+        request._render_started = time.perf_counter()
+        return response
+
+    def _end_span(self, request, name, attr):
+        """Record the time since a start mark, if it was set"""
+        started = request.__dict__.pop(attr, None)
+        if started is not None:
+            request._metrics.add_span(
+                name, time.perf_counter() - started
+            )
+
+    def get_route(self, request):
+        """Name a request by its method and resolved URL name"""
+        match = request.resolver_match
+        name = match.view_name if match is not None else 'unresolved'
+        return f'{request.method} {name}'
+
+    def log_slow_request(self, route, metrics, size):
+        """Log a slow request with the SQL it ran"""
+        lines = [
+            f'{seconds * 1000:.2f}ms {sql}'
+            for sql, seconds in metrics.queries
+        ]
+        if metrics.query_count > len(lines):
+            lines.append(f'... {metrics.query_count - len(lines)} more')
+        logger.warning(
+            'Slow request %s took %.1fms (%d queries, %.1fms SQL, %s bytes)'
+            '\n%s',
+            route,
+            metrics.elapsed * 1000,
+            metrics.query_count,
+            metrics.query_seconds * 1000,
+            size,
+            '\n'.join(lines)
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the reads of safe requests to the read replicas.
+
+    Unsafe requests read from the primary, and so do safe ones from clients
+    that wrote within REPLICA_STICKY_SECONDS. A successful write marks the
+    client with a cookie and, when authenticated, its user in the cache.
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with routers.routing(request, self.use_primary(request)):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        with routers.routing(request, self.use_primary(request)):
+            response = await self.get_response(request)
+        return self.finish(request, response)
+
+    def use_primary(self, request):
+        """Return whether the request must read from the primary"""
+        return (
+            request.method not in self.safe_methods
+            or routers.STICKY_COOKIE in request.COOKIES
+        )
+
+    def finish(self, request, response):
+        """Keep a client that wrote on the primary for a while"""
+        if (
+            request.method in self.safe_methods
+            or response.status_code >= 400
+            or not settings.DATABASE_REPLICAS
+        ):
+            return response
+        seconds = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            routers.STICKY_COOKIE, '1',
+            max_age=seconds,
+            httponly=True,
+            samesite='Lax'
+        )
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            routers.remember_write(user.pk)
+        return response
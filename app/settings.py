@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.InstrumentationMiddleware',
+    'app.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,12 +84,107 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# SQLite next to the code by default; set DB_ENGINE and the DB_* connection
+# variables to use a database server in production.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        # Seconds a connection is reused across requests, 0 closes it after
+        # every request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Server side cursors do not survive a transaction pooler such as
+        # PgBouncer, set DB_POOLER=1 when connecting through one
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.environ.get('DB_POOLER', '0') == '1'
+        ),
+    }
+}
+# Read replicas of the primary as comma separated hosts, or file names
+# for SQLite. Safe requests read from them, see core.routers
+DATABASE_PRIMARY = 'default'
+DATABASE_REPLICAS = []
+replica_key = (
+    'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+)
+for index, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias][replica_key] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Seconds a client keeps reading from the primary after it wrote
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+# Test persistent connections before each request and drop dead ones
+DB_HEALTH_CHECKS = os.environ.get('DB_HEALTH_CHECKS', '1') == '1'
+# Run on every new SQLite connection by core.database.configure_sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a file based
+# or shared cache in production so workers see each other's invalidations.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'recipe-api'),
     }
 }
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_ATTR_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_ATTR_CACHE_TIMEOUT', 300)
+)
+# Seconds a per-user change stamp lives, bounding how long list validators
+# and cached lists can miss writes that did not move it
+RECIPE_VERSION_TIMEOUT = int(
+    os.environ.get('RECIPE_VERSION_TIMEOUT', 300)
+)
+# Server worker processes, more than one needs a cache they all share
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Render recipe lists from the denormalized name columns of core_recipe
+# instead of joining the tag and ingredient tables
+RECIPE_LIST_FROM_SUMMARY = (
+    os.environ.get('RECIPE_LIST_FROM_SUMMARY', '1') == '1'
+)
+# Users whose ingredient match index each process keeps in memory
+MATCH_INDEX_USERS = int(os.environ.get('MATCH_INDEX_USERS', 100))
+
+# In-process cache of authenticated API tokens
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60))
+# In-process cache of verified HTTP Basic credentials
+BASIC_AUTH_CACHE_SIZE = int(os.environ.get('BASIC_AUTH_CACHE_SIZE', 10000))
+BASIC_AUTH_CACHE_TTL = int(os.environ.get('BASIC_AUTH_CACHE_TTL', 60))
+
+# Requests kept per route for the latency percentiles of /api/metrics/
+REQUEST_METRICS_WINDOW = int(os.environ.get('REQUEST_METRICS_WINDOW', 1000))
+# Requests at least this slow are logged with their SQL, 0 disables logging
+SLOW_REQUEST_THRESHOLD_MS = float(
+    os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500)
+)
+SLOW_REQUEST_LOGGED_QUERIES = int(
+    os.environ.get('SLOW_REQUEST_LOGGED_QUERIES', 50)
+)
+
+# Threads running the ORM work of the async read endpoints
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
 
 
 # Password validation
@@ -130,9 +227,15 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DATETIME_FORMAT': "%d-%m-%Y %H:%M",
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
-    # 'DEFAULT_PARSER_CLASSES': [
-    #     'rest_framework.parsers.FormParser',
-    #     'rest_framework.parsers.MultiPartParser',
-    #     'rest_framework.parsers.JSONParser',
-    # ],
+    # Encode and decode JSON with orjson when it is installed, use
+    # rest_framework.renderers.JSONRenderer and parsers.JSONParser to opt out
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
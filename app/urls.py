@@ -18,6 +18,8 @@ from django.urls import path, include
 from django.conf.urls import url, include
 from rest_framework.documentation import include_docs_urls
 
+from app.views import MetricsView
+
 
 urlpatterns = [
     url(
@@ -30,4 +32,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,32 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import instrumentation
+from core.authentication import (
+    CachedBasicAuthentication, CachedTokenAuthentication, credential_cache,
+    token_cache,
+)
+
+
+class MetricsView(APIView):
+    """Latency percentiles, SQL and response sizes per route"""
+    authentication_classes = (
+        CachedTokenAuthentication, CachedBasicAuthentication,
+    )
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        """Return the rolling per route summary and the auth cache stats"""
+        summary = instrumentation.histograms.summary()
+        # Process wide counters, next to the routes
+        summary['auth_caches'] = {
+            'token': token_cache.stats(),
+            'credentials': credential_cache.stats(),
+        }
+        return Response(summary)
+
+    def delete(self, request):
+        """Start a new measurement window"""
+        instrumentation.histograms.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
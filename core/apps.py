@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from core import authentication, database, instrumentation
+
+        post_delete.connect(authentication.invalidate_token, sender=Token)
+        post_save.connect(authentication.invalidate_user, sender='core.User')
+        post_delete.connect(authentication.invalidate_user, sender='core.User')
+
+        connection_created.connect(instrumentation.install_execute_wrapper)
+        connection_created.connect(database.configure_sqlite)
+        request_started.connect(database.check_connections)
@@ -0,0 +1,44 @@
+"""
+Database access for async views.
+
+Django 3.1 has no async ORM, and `sync_to_async` either funnels every call
+through one shared thread or uses the event loop's default executor.
+`run_db` instead runs ORM work on a dedicated pool of ASYNC_DB_THREADS
+threads, so the number of queries in flight can be sized to the database
+independently of the number of open connections to the server.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.database import check_connections
+
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS,
+    thread_name_prefix='async-db',
+)
+
+
+def _call(func, args, kwargs):
+    # Pool threads live across requests, expire their connections the
+    # way the request handler does
+    close_old_connections()
+    check_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking callable on the database pool and await its result"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        functools.partial(context.run, _call, func, args, kwargs)
+    )
@@ -0,0 +1,197 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from rest_framework.authentication import (
+    BasicAuthentication, TokenAuthentication,
+)
+
+from core.async_db import run_db
+from core.instrumentation import timed
+
+
+class ExpiringLRUCache:
+    """
+    Thread safe in-process cache bounded by size and entry age.
+
+    Entries are tagged with the id of the user they belong to so every entry
+    of a user can be dropped at once when the account changes.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored under key, or None when absent or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, user_id, value):
+        """Store value under key on behalf of a user"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user_id, value)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def delete_user(self, user_id):
+        """Drop every entry belonging to a user"""
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def _remove(self, key):
+        user_id = self._entries.pop(key)[1]
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+class CacheMiss(Exception):
+    """The credentials are not cached and need a database lookup"""
+
+
+class AsyncAuthenticationMixin:
+    """
+    Authenticate from async views without blocking the event loop.
+
+    Cached credentials are answered on the loop itself. Anything else,
+    including every failure, is authenticated again on the database pool.
+    """
+    cache_only = False
+
+    async def authenticate_async(self, request):
+        """Return (user, auth) like `authenticate()`, or None"""
+        cached = copy.copy(self)
+        cached.cache_only = True
+        try:
+            return cached.authenticate(request)
+        except CacheMiss:
+            return await run_db(self.authenticate, request)
+
+
+token_cache = ExpiringLRUCache(
+    max_size=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL,
+)
+
+
+class CachedTokenAuthentication(AsyncAuthenticationMixin,
+                                TokenAuthentication):
+    """
+    Token authentication that remembers recently seen tokens.
+
+    Saves the Token/User lookup on repeat requests. Entries are dropped when
+    the token is deleted or its user changes, and otherwise expire after
+    TOKEN_AUTH_CACHE_TTL seconds, which bounds how long another worker
+    process can keep honouring a revoked token.
+    """
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        with timed('auth'):
+            return self._authenticate_credentials(key)
+
+    def _authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # Hand out copies so one request cannot mutate another's user
+            return copy.copy(user), token
+        if self.cache_only:
+            raise CacheMiss(key)
+
+        user, token = super().authenticate_credentials(key)
+        self.cache.set(key, user.pk, (user, token))
+        return copy.copy(user), token
+
+
+credential_cache = ExpiringLRUCache(
+    max_size=settings.BASIC_AUTH_CACHE_SIZE,
+    ttl=settings.BASIC_AUTH_CACHE_TTL,
+)
+
+
+class CachedBasicAuthentication(AsyncAuthenticationMixin,
+                                BasicAuthentication):
+    """
+    Basic authentication that skips the password hasher for known logins.
+
+    A successful login is remembered under a keyed HMAC of the user id and
+    password, so repeat requests cost one hash instead of a full PBKDF2 run.
+    The plain password is never stored. Entries are dropped when the user is
+    saved, which covers password changes, and expire after
+    BASIC_AUTH_CACHE_TTL seconds.
+    """
+    cache = credential_cache
+    key_salt = 'core.authentication.CachedBasicAuthentication'
+
+    def authenticate_credentials(self, userid, password, request=None):
+        with timed('auth'):
+            return self._authenticate_credentials(userid, password, request)
+
+    def _authenticate_credentials(self, userid, password, request):
+        key = salted_hmac(self.key_salt, f'{userid}\0{password}').hexdigest()
+        user = self.cache.get(key)
+        if user is not None:
+            return copy.copy(user), None
+        if self.cache_only:
+            raise CacheMiss(userid)
+
+        user, _ = super().authenticate_credentials(userid, password, request)
+        self.cache.set(key, user.pk, user)
+        return copy.copy(user), None
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """Forget a deleted token"""
+    token_cache.delete(instance.key)
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """Forget cached credentials of a changed or deleted user"""
+    token_cache.delete_user(instance.pk)
+    credential_cache.delete_user(instance.pk)
@@ -0,0 +1,36 @@
+"""
+Recompute data derived from recipes, one batch of recipes at a time.
+
+Used by the backfills of `core.summary` and `core.similarity`.
+"""
+from django.db import transaction
+
+
+BATCH_SIZE = 500
+
+
+def walk(recipe_model, refresh, using='default', user_id=None,
+         progress=None, batch_size=BATCH_SIZE):
+    """
+    Call `refresh` with the ids of every recipe, or of one user's recipes.
+
+    Recipes are walked in id order one batch at a time, each batch in its
+    own transaction. `progress` is called with the running total after
+    each batch. Returns the total.
+    """
+    queryset = recipe_model.objects.using(using).order_by('pk')
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    done, last = 0, 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last).values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not ids:
+            return done
+        with transaction.atomic(using=using):
+            refresh(ids)
+        done += len(ids)
+        last = ids[-1]
+        if progress is not None:
+            progress(done)
@@ -0,0 +1,179 @@
+"""
+Helpers for the `manage.py benchmark` command.
+
+Apps register scenarios in a `benchmarks` module with the `register`
+decorator. Every scenario runs against its own freshly migrated test
+database and returns a JSON serializable dict of measurements.
+"""
+import platform
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test.utils import CaptureQueriesContext
+
+
+SCENARIOS = {}
+
+
+def register(name):
+    """Register a benchmark scenario under a name"""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """Point the default connection at a new test database for the block"""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        serialize=False,
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def close_connections():
+    """
+    Close the calling thread's connections.
+
+    Threads a scenario starts must call it before they finish: the rows
+    of an in-memory test database live as long as any connection to it,
+    and would leak into the next scenario's database.
+    """
+    for conn in connections.all():
+        if conn.connection is not None:
+            # The SQLite backend ignores close() on in-memory databases
+            BaseDatabaseWrapper.close(conn)
+
+
+def close_pool_connections(executor, workers):
+    """Run `close_connections()` once on each of a pool's threads"""
+    barrier = threading.Barrier(workers)
+
+    def close():
+        # Holding every thread until all arrived spreads the calls
+        barrier.wait()
+        close_connections()
+
+    for future in [executor.submit(close) for _ in range(workers)]:
+        future.result()
+
+
+def percentile(timings, fraction):
+    """Return the value at a fraction of the sorted timings"""
+    if not timings:
+        return 0.0
+    index = min(len(timings) - 1, int(round(fraction * (len(timings) - 1))))
+    return timings[index]
+
+
+def summarize(timings, total=None, queries=None):
+    """Summarize call timings in seconds as throughput and latency"""
+    timings = sorted(timings)
+    total = total if total is not None else sum(timings)
+    summary = {
+        'runs': len(timings),
+        'per_second': round(len(timings) / total, 1) if total else None,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+    }
+    if queries is not None:
+        summary['queries_per_run'] = round(queries / len(timings), 2)
+    return summary
+
+
+def measure(func, repeat=100, warmup=3):
+    """Call func repeatedly and summarize throughput, latency and queries"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            began = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - began)
+        total = time.perf_counter() - start
+
+    return summarize(timings, total, len(context.captured_queries))
+
+
+# Measurements where a larger value is an improvement
+HIGHER_IS_BETTER = {'per_second', 'speedup'}
+COMPARED = HIGHER_IS_BETTER | {
+    'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_run',
+}
+
+
+def environment():
+    """Describe the code and platform a report was produced on"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+
+def compare(baseline, report, tolerance=10.0):
+    """
+    Return the relative change of every shared measurement.
+
+    Walks both reports in parallel and, for each latency, throughput and
+    query count present in both, gives the baseline value, the new value
+    and the change in percent. Timings that got worse by more than
+    `tolerance` percent, and any extra query, are flagged as regressions.
+    """
+    changes = {}
+    for key, value in report.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            nested = (
+                compare(old, value, tolerance)
+                if isinstance(old, dict) else {}
+            )
+            if nested:
+                changes[key] = nested
+        elif (
+            key in COMPARED and
+            isinstance(value, (int, float)) and
+            isinstance(old, (int, float))
+        ):
+            change = (value - old) / old * 100 if old else 0.0
+            if key == 'queries_per_run':
+                regression = value > old
+            elif key in HIGHER_IS_BETTER:
+                regression = change < -tolerance
+            else:
+                regression = change > tolerance
+            changes[key] = {
+                'before': old,
+                'after': value,
+                'change_pct': round(change, 1),
+                'regression': regression,
+            }
+    return changes
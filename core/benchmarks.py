@@ -0,0 +1,179 @@
+import base64
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authentication import BasicAuthentication
+
+from core.authentication import CachedBasicAuthentication, credential_cache
+from core.benchmarking import measure, register, summarize
+from user.views import ManageUserView
+
+
+@register('basic-auth')
+def basic_auth(repeat, scale):
+    """Compare plain and cached HTTP Basic authentication on /api/user/me/"""
+    get_user_model().objects.create_user('bench@test.com', 'benchpassword')
+    credentials = base64.b64encode(b'bench@test.com:benchpassword').decode()
+    client = Client(HTTP_AUTHORIZATION=f'Basic {credentials}')
+    url = reverse('user:me')
+
+    def fetch():
+        assert client.get(url).status_code == 200
+
+    report = {}
+    original = ManageUserView.authentication_classes
+    try:
+        for label, auth_class in (
+            ('before', BasicAuthentication),
+            ('after', CachedBasicAuthentication),
+        ):
+            ManageUserView.authentication_classes = (auth_class,)
+            credential_cache.clear()
+            report[label] = measure(fetch, repeat=repeat)
+    finally:
+        ManageUserView.authentication_classes = original
+
+    report['speedup'] = round(
+        report['after']['per_second'] / report['before']['per_second'], 1
+    )
+    return report
+
+
+@contextmanager
+def sqlite_file_database(alias):
+    """Register a SQLite file database under an alias for the block"""
+    directory = tempfile.mkdtemp()
+    connections.databases[alias] = dict(
+        connections['default'].settings_dict,
+        NAME=os.path.join(directory, 'db.sqlite3'),
+        CONN_MAX_AGE=None,
+    )
+    try:
+        yield
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+        shutil.rmtree(directory)
+
+
+@register('sqlite-writers')
+def sqlite_writers(repeat, scale):
+    """
+    Compare SQLite under concurrent writers with and without SQLITE_PRAGMAS.
+
+    Each writer thread commits `repeat` transactions of one recipe sized
+    insert into a table of `scale` rows, while as many reader threads page
+    through the newest rows until the writers are done. `before` runs with
+    SQLite's defaults (rollback journal, synchronous=FULL), `after` with
+    the configured pragmas. Both use a file database, WAL does not apply
+    to the in-memory test database.
+    """
+    payload = 'x' * 500
+    report = {}
+    for label, pragmas in (
+        ('before', {}),
+        ('after', settings.SQLITE_PRAGMAS),
+    ):
+        with override_settings(SQLITE_PRAGMAS=pragmas), \
+                sqlite_file_database('writers'):
+            with connections['writers'].cursor() as cursor:
+                cursor.execute(
+                    'CREATE TABLE bench (id INTEGER PRIMARY KEY, '
+                    'user_id INTEGER, title TEXT, body TEXT)'
+                )
+                cursor.execute('CREATE INDEX bench_user ON bench (user_id)')
+                cursor.executemany(
+                    'INSERT INTO bench (user_id, title, body) '
+                    'VALUES (%s, %s, %s)',
+                    [(index % 10, f'Recipe {index}', payload)
+                     for index in range(scale)]
+                )
+            report[label] = {
+                str(writers): run_writers(writers, repeat, payload)
+                for writers in (1, 4, 16)
+            }
+    report['speedup'] = {
+        writers: round(
+            report['after'][writers]['writes']['per_second']
+            / report['before'][writers]['writes']['per_second'], 1
+        )
+        for writers in report['after']
+    }
+    return report
+
+
+def run_writers(writers, repeat, payload):
+    """Run writer and reader threads against the `writers` database"""
+    write_timings, read_timings, errors = [], [], []
+    done = threading.Event()
+
+    def write(worker):
+        try:
+            for index in range(repeat):
+                began = time.perf_counter()
+                try:
+                    with transaction.atomic(using='writers'):
+                        with connections['writers'].cursor() as cursor:
+                            cursor.execute(
+                                'INSERT INTO bench (user_id, title, body) '
+                                'VALUES (%s, %s, %s)',
+                                (worker, f'Recipe {index}', payload)
+                            )
+                except OperationalError as exc:
+                    errors.append(str(exc))
+                    continue
+                write_timings.append(time.perf_counter() - began)
+        finally:
+            connections['writers'].close()
+
+    def read(worker):
+        try:
+            while not done.is_set():
+                began = time.perf_counter()
+                try:
+                    with connections['writers'].cursor() as cursor:
+                        cursor.execute(
+                            'SELECT id, title FROM bench WHERE user_id = %s '
+                            'ORDER BY id DESC LIMIT 100',
+                            (worker % 10,)
+                        )
+                        cursor.fetchall()
+                except OperationalError as exc:
+                    errors.append(str(exc))
+                    continue
+                read_timings.append(time.perf_counter() - began)
+        finally:
+            connections['writers'].close()
+
+    threads = [
+        threading.Thread(target=write, args=(worker,))
+        for worker in range(writers)
+    ]
+    readers = [
+        threading.Thread(target=read, args=(worker,))
+        for worker in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads + readers:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in readers:
+        thread.join()
+    return {
+        'writes': summarize(write_timings, elapsed),
+        'reads': summarize(read_timings, elapsed),
+        'errors': len(errors),
+    }
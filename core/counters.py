@@ -0,0 +1,245 @@
+"""
+Materialized per user recipe counters.
+
+`core_recipecounter` holds per user counts of recipes by type, by UTC
+creation day and by tag and ingredient, see `core.models.RecipeCounter`.
+`recipe.signals` moves them inside the transaction of every ORM write:
+recipe saves and deletes, relinks from either side and tag or ingredient
+deletes. Code writing rows without signals, like the bulk API and the
+importer, builds the changes with `recipe_deltas()` / `link_deltas()` and
+passes them to `add()` itself. Queryset updates and raw SQL bypass both,
+`fill()` recounts from the recipes afterwards.
+
+Increments upsert, decrements only update existing rows, so the recipes
+of a user whose counters a cascade already removed recreate nothing.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import RecipeCounter
+
+
+# Relation -> counter kind
+KINDS = {'tags': 'tag', 'ingredients': 'ingredient'}
+# Counters written per statement, four parameters each
+BATCH_SIZE = 200
+
+
+def day_key(created):
+    """Return the counter key of the UTC day of a creation time"""
+    return created.astimezone(timezone.utc).date().isoformat()
+
+
+def recipe_keys(recipe):
+    """Return the (user id, kind, key) counters a recipe counts in"""
+    return _keys(recipe_values(recipe))
+
+
+def recipe_values(recipe):
+    """Return the values of a recipe's counted columns"""
+    return tuple(recipe.__dict__.get(name) for name in recipe.counted_fields)
+
+
+def remember(recipe):
+    """Note the counted values of a saved recipe, to count changes later"""
+    recipe._counted = recipe_values(recipe)
+
+
+def counted_values(recipe, using='default'):
+    """Return the counted values of a recipe when it was loaded or saved"""
+    counted = recipe.__dict__.get('_counted')
+    if (counted is None or None in counted) and recipe.pk is not None:
+        # Loaded without the counted columns, read them
+        counted = type(recipe).objects.using(using).filter(
+            pk=recipe.pk
+        ).values_list(*recipe.counted_fields).first()
+    return counted
+
+
+def counted_keys(recipe, using='default'):
+    """Return the counters a saved recipe counted in"""
+    return _keys(counted_values(recipe, using) or ())
+
+
+def _keys(values):
+    if len(values) != 3 or None in values:
+        return ()
+    user_id, recipe_type, created = values
+    return (
+        (user_id, 'type', recipe_type),
+        (user_id, 'day', day_key(created)),
+    )
+
+
+def recipe_deltas(recipes, sign=1):
+    """Return the type and day changes of adding or removing recipes"""
+    return Counter({
+        key: sign * count
+        for key, count in Counter(
+            key for recipe in recipes for key in recipe_keys(recipe)
+        ).items()
+    })
+
+
+def change_deltas(recipes, using='default'):
+    """Return the type and day changes of updated recipes"""
+    deltas = Counter()
+    for recipe in recipes:
+        deltas.subtract(counted_keys(recipe, using))
+        deltas.update(recipe_keys(recipe))
+        remember(recipe)
+    return deltas
+
+
+def link_deltas(user_id, field, related_ids, sign=1):
+    """Return the changes of linking recipes to tags or ingredients"""
+    kind = KINDS[field]
+    return Counter({
+        (user_id, kind, str(related_id)): sign * count
+        for related_id, count in Counter(related_ids).items()
+    })
+
+
+def linked(recipe_model, field, recipe_ids=None, related_ids=None,
+           using='default'):
+    """Return the related ids of the links between recipes and relateds"""
+    relation = getattr(recipe_model, field)
+    column = relation.field.m2m_reverse_field_name() + '_id'
+    links = relation.through.objects.using(using)
+    if recipe_ids is not None:
+        links = links.filter(recipe_id__in=recipe_ids)
+    if related_ids is not None:
+        links = links.filter(**{f'{column}__in': related_ids})
+    return list(links.values_list(column, flat=True))
+
+
+def forget(user_id, field, related_id, using='default'):
+    """Drop the counter of a deleted tag or ingredient"""
+    RecipeCounter.objects.using(using).filter(
+        user_id=user_id, kind=KINDS[field], key=str(related_id)
+    ).delete()
+
+
+def add(deltas, using='default'):
+    """Apply {(user id, kind, key): change} to the counters"""
+    increments = {key: value for key, value in deltas.items() if value > 0}
+    decrements = {key: value for key, value in deltas.items() if value < 0}
+    if increments:
+        connection = connections[using]
+        if upsert_supported(connection):
+            _upsert(connection, increments)
+        else:
+            RecipeCounter.objects.using(using).bulk_create([
+                RecipeCounter(user_id=user_id, kind=kind, key=key)
+                for user_id, kind, key in increments
+            ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+            _update(increments, using)
+    if decrements:
+        _update(decrements, using)
+
+
+def upsert_supported(connection):
+    """Return True when counters can be upserted in one statement"""
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 24, 0)
+    return connection.vendor in ('postgresql', 'mysql')
+
+
+def _upsert(connection, increments):
+    quote = connection.ops.quote_name
+    table = quote(RecipeCounter._meta.db_table)
+    value = quote('value')
+    if connection.vendor == 'mysql':
+        conflict = (
+            f'ON DUPLICATE KEY UPDATE {value} = {value} + VALUES({value})'
+        )
+    else:
+        conflict = (
+            f'ON CONFLICT ({quote("user_id")}, {quote("kind")}, '
+            f'{quote("key")}) DO UPDATE SET {value} = {table}.{value} + '
+            f'excluded.{value}'
+        )
+    columns = ', '.join(quote(column) for column in (
+        'user_id', 'kind', 'key', 'value'
+    ))
+    rows = list(increments.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES '
+                + ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+                + f' {conflict}',
+                [param for key, change in batch for param in (*key, change)]
+            )
+
+
+def _update(deltas, using):
+    # One UPDATE per user and change, most writes change every counter
+    # they touch by the same amount
+    groups = defaultdict(lambda: defaultdict(list))
+    for (user_id, kind, key), change in deltas.items():
+        groups[user_id, change][kind].append(key)
+    for (user_id, change), keys in groups.items():
+        condition = Q()
+        for kind, kind_keys in keys.items():
+            for start in range(0, len(kind_keys), BATCH_SIZE):
+                condition |= Q(
+                    kind=kind, key__in=kind_keys[start:start + BATCH_SIZE]
+                )
+        RecipeCounter.objects.using(using).filter(
+            condition, user_id=user_id
+        ).update(value=F('value') + change)
+
+
+def aggregate(recipe_model, using='default', user_id=None):
+    """Return {(user id, kind, key): count} counted from the recipes"""
+    recipes = recipe_model.objects.using(using)
+    if user_id is not None:
+        recipes = recipes.filter(user_id=user_id)
+    counts = Counter()
+    for owner, recipe_type, count in recipes.values(
+        'user_id', 'type'
+    ).annotate(count=Count('id')).values_list(
+        'user_id', 'type', 'count'
+    ).order_by():
+        counts[owner, 'type', recipe_type] = count
+    for owner, day, count in recipes.annotate(
+        day=TruncDate('rcpCreatedOn', tzinfo=timezone.utc)
+    ).values('user_id', 'day').annotate(count=Count('id')).values_list(
+        'user_id', 'day', 'count'
+    ).order_by():
+        counts[owner, 'day', day.isoformat()] = count
+    for field, kind in KINDS.items():
+        relation = getattr(recipe_model, field)
+        column = relation.field.m2m_reverse_field_name() + '_id'
+        links = relation.through.objects.using(using)
+        if user_id is not None:
+            links = links.filter(recipe__user_id=user_id)
+        for owner, related_id, count in links.values(
+            'recipe__user_id', column
+        ).annotate(count=Count('id')).values_list(
+            'recipe__user_id', column, 'count'
+        ).order_by():
+            counts[owner, kind, str(related_id)] = count
+    return counts
+
+
+def fill(recipe_model, counter_model, using='default', user_id=None):
+    """Recount every user's recipes, or one user's, from scratch"""
+    counts = aggregate(recipe_model, using, user_id)
+    counters = counter_model.objects.using(using)
+    if user_id is not None:
+        counters = counters.filter(user_id=user_id)
+    counters.delete()
+    counter_model.objects.using(using).bulk_create([
+        counter_model(user_id=owner, kind=kind, key=key, value=count)
+        for (owner, kind, key), count in counts.items()
+    ], batch_size=BATCH_SIZE)
+    return sum(
+        count for (_, kind, _), count in counts.items() if kind == 'type'
+    )
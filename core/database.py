@@ -0,0 +1,37 @@
+"""
+Set up and look after database connections.
+
+`configure_sqlite` runs SQLITE_PRAGMAS on every new SQLite connection,
+by default WAL journaling so readers never wait for the writer, fewer
+fsyncs with `synchronous=NORMAL`, a busy timeout instead of immediate
+"database is locked" errors, and memory mapped reads.
+
+Connections persist for CONN_MAX_AGE seconds, long enough for the server
+to drop them in between. With DB_HEALTH_CHECKS, `check_connections`
+closes dead connections when a request starts, before they fail it.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to a new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    # On the raw connection, so the pragmas are not counted as queries
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections(**kwargs):
+    """Close persistent connections the database no longer answers on"""
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict['CONN_MAX_AGE'] != 0
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,116 @@
+"""
+Schema helpers for the SQLite FTS5 index over recipe text.
+
+`core_recipe_fts` is an external content FTS5 table over `core_recipe`.
+The owner id is indexed as a token too, so a search can be scoped to one
+user inside the index. The table is kept in sync by triggers so every
+write path (ORM saves, bulk writes, queryset updates and raw SQL) updates
+the index. SQLite drops triggers whenever Django rebuilds `core_recipe`
+during a migration, so migrations that alter the table must call
+`create_triggers` again.
+"""
+from django.db.utils import OperationalError
+
+
+FTS_TABLE = 'core_recipe_fts'
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    user_id,
+    title,
+    cookingInstruction,
+    content='core_recipe',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON core_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_id, title, cookingInstruction)
+        VALUES (new.id, new.user_id, new.title, new.cookingInstruction);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON core_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(
+            {FTS_TABLE}, rowid, user_id, title, cookingInstruction
+        )
+        VALUES (
+            'delete', old.id, old.user_id, old.title, old.cookingInstruction
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au
+    AFTER UPDATE OF user_id, title, cookingInstruction ON core_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(
+            {FTS_TABLE}, rowid, user_id, title, cookingInstruction
+        )
+        VALUES (
+            'delete', old.id, old.user_id, old.title, old.cookingInstruction
+        );
+        INSERT INTO {FTS_TABLE}(rowid, user_id, title, cookingInstruction)
+        VALUES (new.id, new.user_id, new.title, new.cookingInstruction);
+    END
+    """,
+)
+
+
+def fts_supported(schema_editor):
+    """Return True when the database can host the FTS5 index"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(probe)'
+            )
+        except OperationalError:
+            return False
+        cursor.execute('DROP TABLE temp.fts5_probe')
+    return True
+
+
+def create_triggers(schema_editor):
+    """(Re)create the triggers syncing the index with core_recipe"""
+    if not table_exists(schema_editor):
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    for trigger in TRIGGERS:
+        schema_editor.execute(trigger)
+
+
+def table_exists(schema_editor):
+    """Return True when the index table is present"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        return FTS_TABLE in connection.introspection.table_names(cursor)
+
+
+def create_index(apps, schema_editor):
+    """Create the index, its triggers and index the existing recipes"""
+    if not fts_supported(schema_editor):
+        return
+    schema_editor.execute(CREATE_TABLE)
+    create_triggers(schema_editor)
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+    )
+
+
+def drop_index(apps, schema_editor):
+    """Remove the index and its triggers"""
+    if not table_exists(schema_editor):
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+def recreate_triggers(apps, schema_editor):
+    """Migration operation wrapper around `create_triggers`"""
+    create_triggers(schema_editor)
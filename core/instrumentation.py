@@ -0,0 +1,174 @@
+"""
+Per request performance measurements.
+
+`app.middleware.InstrumentationMiddleware` opens a `RequestMetrics` for
+every request. Code running inside the request adds named spans with
+`timed()`, and SQL is counted by an execute wrapper installed on every
+database connection. Finished requests are folded into the rolling per
+route `histograms`.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from core.benchmarking import percentile
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings, SQL and size of a single request"""
+
+    def __init__(self, keep_queries=0):
+        self.started = time.perf_counter()
+        self.spans = defaultdict(float)
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.queries = []
+        self.keep_queries = keep_queries
+
+    @property
+    def elapsed(self):
+        """Seconds since the request started"""
+        return time.perf_counter() - self.started
+
+    def add_span(self, name, seconds):
+        """Add time to a named span, repeated spans are summed"""
+        self.spans[name] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Connection execute wrapper counting and timing every query"""
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - began
+            self.query_count += 1
+            self.query_seconds += seconds
+            if len(self.queries) < self.keep_queries:
+                self.queries.append((sql, seconds))
+
+    def server_timing(self):
+        """Return the Server-Timing header value"""
+        entries = [
+            f'db;dur={self.query_seconds * 1000:.2f};'
+            f'desc="{self.query_count} queries"'
+        ]
+        entries.extend(
+            f'{name};dur={seconds * 1000:.2f}'
+            for name, seconds in self.spans.items()
+        )
+        entries.append(f'total;dur={self.elapsed * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def current():
+    """Return the metrics of the request being handled, if any"""
+    return _current.get()
+
+
+def forward_queries(execute, sql, params, many, context):
+    """Execute wrapper handing queries to the current request's metrics"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """
+    Add `forward_queries` to a new database connection.
+
+    Connected to `connection_created`, so queries are attributed to the
+    current request on whichever thread runs them, including the worker
+    threads of async views.
+    """
+    if forward_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(forward_queries)
+
+
+@contextmanager
+def collect(metrics):
+    """Make metrics the current request's metrics for the block"""
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Record the block as a span of the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, time.perf_counter() - began)
+
+
+class RouteHistograms:
+    """
+    Rolling window of the latest requests of every route.
+
+    Each route keeps its last `window` samples, so percentiles follow the
+    current behaviour of the app rather than its whole uptime.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, query_count, query_seconds, size):
+        """Record a finished request"""
+        with self._lock:
+            samples = self._samples.get(route)
+            if samples is None:
+                samples = self._samples[route] = deque(maxlen=self.window)
+            samples.append((seconds, query_count, query_seconds, size))
+
+    def clear(self):
+        """Drop every sample"""
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """Return latency percentiles, queries and sizes per route"""
+        with self._lock:
+            routes = {
+                route: list(samples)
+                for route, samples in self._samples.items()
+            }
+
+        summary = {}
+        for route, samples in sorted(routes.items()):
+            durations = sorted(sample[0] for sample in samples)
+            sql = sorted(sample[2] for sample in samples)
+            sizes = sorted(
+                sample[3] for sample in samples if sample[3] is not None
+            )
+            summary[route] = {
+                'count': len(samples),
+                'p50_ms': round(percentile(durations, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(durations, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+                'queries_avg': round(
+                    sum(sample[1] for sample in samples) / len(samples), 2
+                ),
+                'sql_p95_ms': round(percentile(sql, 0.95) * 1000, 3),
+                'bytes_p50': percentile(sizes, 0.50) if sizes else None,
+            }
+        return summary
+
+
+histograms = RouteHistograms(window=settings.REQUEST_METRICS_WINDOW)
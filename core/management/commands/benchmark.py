@@ -0,0 +1,107 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules
+
+from core.benchmarking import (
+    SCENARIOS, compare, environment, throwaway_database,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run performance scenarios against throwaway databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios',
+            nargs='*',
+            help='Scenarios to run, all of them when omitted',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=100,
+            help='Measured calls per case',
+        )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=100,
+            help='Number of rows of synthetic data to generate',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the available scenarios and exit',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--compare',
+            metavar='BASELINE',
+            help='Add the change against a previous JSON report',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=10.0,
+            help='Percent a timing may worsen before it counts as a '
+                 'regression',
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules('benchmarks')
+        if options['list']:
+            for name in sorted(SCENARIOS):
+                self.stdout.write(name)
+            return
+
+        names = options['scenarios'] or sorted(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(
+                f'Unknown scenarios: {", ".join(sorted(unknown))}'
+            )
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read the baseline: {exc}')
+
+        report = {
+            'environment': environment(),
+            'options': {
+                'repeat': options['repeat'],
+                'scale': options['scale'],
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            self.stderr.write(f'Running {name}...')
+            with throwaway_database():
+                report['scenarios'][name] = SCENARIOS[name](
+                    repeat=options['repeat'],
+                    scale=options['scale'],
+                )
+
+        if baseline is not None:
+            report['comparison'] = {
+                'baseline': baseline.get('environment'),
+                'changes': compare(
+                    baseline.get('scenarios', {}),
+                    report['scenarios'],
+                    options['tolerance']
+                ),
+            }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.1 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auto_20201003_1731'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-rcpCreatedOn', '-id'], name='recipe_user_created_idx'),
+        ),
+    ]
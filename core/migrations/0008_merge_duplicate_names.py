@@ -0,0 +1,36 @@
+# Generated by Django 3.1.1 on 2026-10-17 17:30
+
+from django.db import migrations
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate per-user tags and ingredients into the oldest row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = model_name.lower()
+        keep = {}
+        for obj in model.objects.order_by('id'):
+            key = (obj.user_id, obj.name)
+            if key not in keep:
+                keep[key] = obj.id
+                continue
+            linked = through.objects.filter(**{f'{column}_id': keep[key]})
+            through.objects.filter(**{f'{column}_id': obj.id}).exclude(
+                recipe_id__in=linked.values('recipe_id')
+            ).update(**{f'{column}_id': keep[key]})
+            obj.delete()
+
+
+# Kept apart from the constraints in 0008_tag_ingredient_user_name, so
+# PostgreSQL does not refuse to alter tables with pending trigger events
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
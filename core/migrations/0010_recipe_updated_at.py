@@ -0,0 +1,20 @@
+# Generated by Django 3.1.1 on 2026-10-17 17:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_tag_ingredient_user_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Date and Time when the recipe was last changed.', verbose_name='Recipe Updated on'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.1.1 on 2026-10-17 18:05
+
+from django.db import migrations
+
+from core import fts
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts.create_index, fts.drop_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.1.1 on 2026-10-17 18:28
+
+from django.db import migrations, models
+
+from core import fts
+
+
+BATCH_SIZE = 500
+# Relation -> (names column, count column)
+COLUMNS = {
+    'tags': ('tag_names', 'tag_count'),
+    'ingredients': ('ingredient_names', 'ingredient_count'),
+}
+
+
+def backfill_summaries(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    alias = schema_editor.connection.alias
+    recipe_ids = list(
+        Recipe.objects.using(alias).order_by('pk').values_list('pk', flat=True)
+    )
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        recipes = {
+            pk: Recipe(pk=pk) for pk in recipe_ids[start:start + BATCH_SIZE]
+        }
+        for field, (names_column, count_column) in COLUMNS.items():
+            names = {pk: [] for pk in recipes}
+            relation = getattr(Recipe, field)
+            column = relation.field.m2m_reverse_field_name()
+            for recipe_id, name in relation.through.objects.using(
+                alias
+            ).filter(recipe_id__in=recipes).order_by(
+                f'{column}_id'
+            ).values_list('recipe_id', f'{column}__name'):
+                names[recipe_id].append(name)
+            for pk, recipe_names in names.items():
+                setattr(recipes[pk], names_column, recipe_names)
+                setattr(recipes[pk], count_column, len(recipe_names))
+        Recipe.objects.using(alias).bulk_update(
+            recipes.values(),
+            [column for columns in COLUMNS.values() for column in columns]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        # Adding columns rebuilds core_recipe on SQLite, dropping triggers
+        migrations.RunPython(fts.recreate_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
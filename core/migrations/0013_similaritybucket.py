@@ -0,0 +1,85 @@
+# Generated by Django 3.1.1 on 2026-10-17 18:39
+
+import hashlib
+import random
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 500
+# The MinHash / LSH parameters of core.similarity when the buckets were
+# added, a later change comes with a migration rebuilding them
+BANDS = 16
+ROWS = 2
+PRIME = (1 << 61) - 1
+FIELDS = {'tags': 0, 'ingredients': 1}
+_rng = random.Random(0)
+PERMUTATIONS = tuple(
+    (_rng.randrange(1, PRIME), _rng.randrange(PRIME))
+    for _ in range(BANDS * ROWS)
+)
+
+
+def buckets(elements):
+    if not elements:
+        return []
+    values = [
+        min((a * element + b) % PRIME for element in elements)
+        for a, b in PERMUTATIONS
+    ]
+    result = []
+    for band in range(BANDS):
+        key = repr((band, values[band * ROWS:(band + 1) * ROWS]))
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
+
+
+def build_buckets(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    SimilarityBucket = apps.get_model('core', 'SimilarityBucket')
+    alias = schema_editor.connection.alias
+    owners = list(
+        Recipe.objects.using(alias).order_by('pk').values_list('pk', 'user_id')
+    )
+    for start in range(0, len(owners), BATCH_SIZE):
+        batch = dict(owners[start:start + BATCH_SIZE])
+        elements = {pk: set() for pk in batch}
+        for field, offset in FIELDS.items():
+            relation = getattr(Recipe, field)
+            column = relation.field.m2m_reverse_field_name() + '_id'
+            for recipe_id, related_id in relation.through.objects.using(
+                alias
+            ).filter(recipe_id__in=batch).values_list('recipe_id', column):
+                elements[recipe_id].add(2 * related_id + offset)
+        SimilarityBucket.objects.using(alias).bulk_create([
+            SimilarityBucket(recipe_id=pk, user_id=batch[pk], bucket=bucket)
+            for pk, recipe_elements in elements.items()
+            for bucket in buckets(recipe_elements)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_buckets', to='core.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='similaritybucket',
+            index=models.Index(fields=['user', 'bucket'], name='similarity_user_bucket_idx'),
+        ),
+        migrations.RunPython(build_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.1.1 on 2026-10-17 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeCounter = apps.get_model('core', 'RecipeCounter')
+    alias = schema_editor.connection.alias
+    recipes = Recipe.objects.using(alias)
+    counts = [
+        (user_id, 'type', recipe_type, count)
+        for user_id, recipe_type, count in recipes.values(
+            'user_id', 'type'
+        ).annotate(count=Count('id')).values_list(
+            'user_id', 'type', 'count'
+        ).order_by()
+    ]
+    counts.extend(
+        (user_id, 'day', day.isoformat(), count)
+        for user_id, day, count in recipes.annotate(
+            day=TruncDate('rcpCreatedOn', tzinfo=timezone.utc)
+        ).values('user_id', 'day').annotate(count=Count('id')).values_list(
+            'user_id', 'day', 'count'
+        ).order_by()
+    )
+    for field, kind in (('tags', 'tag'), ('ingredients', 'ingredient')):
+        relation = getattr(Recipe, field)
+        column = relation.field.m2m_reverse_field_name() + '_id'
+        counts.extend(
+            (user_id, kind, str(related_id), count)
+            for user_id, related_id, count in relation.through.objects.using(
+                alias
+            ).values('recipe__user_id', column).annotate(
+                count=Count('id')
+            ).values_list('recipe__user_id', column, 'count').order_by()
+        )
+    RecipeCounter.objects.using(alias).bulk_create([
+        RecipeCounter(user_id=user_id, kind=kind, key=key, value=count)
+        for user_id, kind, key, count in counts
+    ], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_similaritybucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=255)),
+                ('value', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='recipecounter',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'key'), name='recipecounter_user_kind_key_uniq'),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
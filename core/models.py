@@ -76,6 +76,17 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='tag_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['name'], name='tag_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -88,6 +99,17 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='ingredient_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['name'], name='ingredient_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -108,6 +130,11 @@ class Recipe(models.Model):
         verbose_name='Recipe Created on',
         help_text='Date and Time when the recipe was created.',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Recipe Updated on',
+        help_text='Date and Time when the recipe was last changed.',
+    )
     type = models.CharField(
         max_length=255,
         choices=[
@@ -125,6 +152,82 @@ class Recipe(models.Model):
         help_text='Cooking Instructions',
     )
     tags = models.ManyToManyField('Tag')
+    # Denormalized from `tags` and `ingredients` by core.summary, the names
+    # are in id order like the API renders them
+    tag_names = models.JSONField(default=list, blank=True, editable=False)
+    tag_count = models.PositiveIntegerField(default=0, editable=False)
+    ingredient_names = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+    )
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-rcpCreatedOn', '-id'],
+                name='recipe_user_created_idx',
+            ),
+        ]
+
+    # The columns core.counters counts a recipe by
+    counted_fields = ('user_id', 'type', 'rcpCreatedOn')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        # As loaded, so saves can move the counters off the old values
+        recipe._counted = tuple(
+            recipe.__dict__.get(name) for name in cls.counted_fields
+        )
+        return recipe
 
     def __str__(self):
         return self.title
+
+
+class SimilarityBucket(models.Model):
+    """LSH bucket of a recipe's tag and ingredient set, see core.similarity"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'bucket'],
+                name='similarity_user_bucket_idx',
+            ),
+        ]
+
+
+class RecipeCounter(models.Model):
+    """
+    Materialized count of a user's recipes, kept by core.counters.
+
+    `kind` is 'type' (keyed by the recipe type), 'day' (keyed by the UTC
+    creation date), 'tag' or 'ingredient' (keyed by the related id).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(max_length=20)
+    key = models.CharField(max_length=255)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'key'],
+                name='recipecounter_user_kind_key_uniq',
+            ),
+        ]
@@ -0,0 +1,64 @@
+import datetime
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def format_datetime(value):
+    """Render a datetime the way `serializers.DateTimeField` does"""
+    return serializers.DateTimeField().to_representation(value)
+
+
+class DateTimeJSONEncoder(encoders.JSONEncoder):
+    """JSON encoder rendering datetimes with the DATETIME_FORMAT setting"""
+
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return format_datetime(obj)
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with orjson when it is installed.
+
+    Compact UTF-8 output is byte for byte what `JSONRenderer` produces,
+    with the same escaping of U+2028 and U+2029. Indented or ASCII-only
+    output, payloads orjson rejects and installs without orjson go
+    through the stdlib encoder. Datetimes that reach the renderer as
+    objects are formatted with DATETIME_FORMAT, like serializer fields do.
+    """
+    encoder_class = DateTimeJSONEncoder
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or
+            self.ensure_ascii or not self.compact or
+            self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder handles
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -0,0 +1,106 @@
+"""
+Read replica routing.
+
+Reads of safe requests go to one of DATABASE_REPLICAS, everything else
+to the DATABASE_PRIMARY alias. `app.middleware.ReplicaRoutingMiddleware`
+opens the routing state of every request; outside requests, in
+management commands for instance, every query goes to the primary.
+
+Replicas lag behind the primary, so a client that just wrote keeps
+reading from the primary for REPLICA_STICKY_SECONDS: browsers through a
+cookie, API clients through a marker on their user in the cache.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+
+STICKY_COOKIE = 'db_primary'
+# Read on the primary by every request, a replica may not know a token or
+# password created moments ago yet
+PRIMARY_APPS = {'authtoken', 'sessions'}
+
+_current = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """Where the reads of one request go"""
+
+    def __init__(self, request, use_primary=False):
+        self.request = request
+        self.use_primary = use_primary
+        self.user_checked = use_primary
+
+    def reads_primary(self):
+        """Return whether reads must see the primary's latest writes"""
+        if not self.user_checked:
+            user = self.request.__dict__.get('user')
+            # Until DRF authenticates, `user` is the lazy session user and
+            # evaluating it here would query from inside the router
+            if user is not None and type(user) is not SimpleLazyObject:
+                self.user_checked = True
+                self.use_primary = wrote_recently(user.pk)
+        return self.use_primary
+
+
+@contextmanager
+def routing(request, use_primary=False):
+    """Route the queries of the block on behalf of a request"""
+    token = _current.set(RoutingState(request, use_primary))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def remember_write(user_id):
+    """Keep the user's reads on the primary for REPLICA_STICKY_SECONDS"""
+    cache.set(sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def wrote_recently(user_id):
+    """Return whether the user wrote within REPLICA_STICKY_SECONDS"""
+    if user_id is None:
+        return False
+    return cache.get(sticky_key(user_id), False)
+
+
+class ReplicaRouter:
+    """Send reads to the replicas and writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if (
+            not settings.DATABASE_REPLICAS
+            or state is None
+            or model._meta.app_label in PRIMARY_APPS
+            or model._meta.label == settings.AUTH_USER_MODEL
+            or state.reads_primary()
+        ):
+            return settings.DATABASE_PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            # Let the rest of the request read what it wrote
+            state.use_primary = state.user_checked = True
+        return settings.DATABASE_PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas copy the schema of the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
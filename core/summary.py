@@ -0,0 +1,110 @@
+"""
+Denormalized tag and ingredient names of recipes.
+
+`Recipe.tag_names` and `Recipe.ingredient_names` hold the names of a
+recipe's tags and ingredients in id order, the order the API renders them
+in, and `tag_count` / `ingredient_count` their number, so recipe lists can
+be rendered from the recipe table alone. `recipe.signals` refreshes them
+when links change and when a tag or ingredient is renamed or deleted.
+Code writing relation rows directly, like the bulk API and the importer,
+fills them in itself with `summarize()`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.utils import timezone
+
+from core import batches
+
+
+# Relation -> (names column, count column)
+COLUMNS = {
+    'tags': ('tag_names', 'tag_count'),
+    'ingredients': ('ingredient_names', 'ingredient_count'),
+}
+BATCH_SIZE = batches.BATCH_SIZE
+
+_ignored = ContextVar('summary_ignored', default=frozenset())
+
+
+def summarize(field, links):
+    """Return the summary columns of a recipe from its (id, name) links"""
+    names_column, count_column = COLUMNS[field]
+    names = [name for _, name in sorted(set(links))]
+    return {names_column: names, count_column: len(names)}
+
+
+def collect(recipe_model, recipe_ids, field, using='default'):
+    """Return {recipe id: names} of a relation, read from its link rows"""
+    relation = getattr(recipe_model, field)
+    column = relation.field.m2m_reverse_field_name()
+    names = {recipe_id: [] for recipe_id in recipe_ids}
+    links = relation.through.objects.using(using).filter(
+        recipe_id__in=names
+    ).order_by(f'{column}_id').values_list('recipe_id', f'{column}__name')
+    for recipe_id, name in links:
+        names[recipe_id].append(name)
+    return names
+
+
+def linked_recipes(recipe_model, field, related_ids, using='default'):
+    """Return the ids of recipes linked to any of the tags or ingredients"""
+    relation = getattr(recipe_model, field)
+    column = relation.field.m2m_reverse_field_name()
+    return list(relation.through.objects.using(using).filter(
+        **{f'{column}_id__in': related_ids}
+    ).values_list('recipe_id', flat=True).distinct())
+
+
+def refresh(recipe_model, recipe_ids, fields=tuple(COLUMNS),
+            using='default'):
+    """Recompute the summary columns of recipes from their link rows"""
+    recipe_ids = sorted(set(recipe_ids))
+    columns = [column for field in fields for column in COLUMNS[field]]
+    # The rendered names changed, so did the recipe's detail validators
+    columns.append('updated_at')
+    now = timezone.now()
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        recipes = {
+            pk: recipe_model(pk=pk, updated_at=now)
+            for pk in recipe_ids[start:start + BATCH_SIZE]
+        }
+        for field in fields:
+            names_column, count_column = COLUMNS[field]
+            for pk, names in collect(
+                recipe_model, recipes, field, using
+            ).items():
+                setattr(recipes[pk], names_column, names)
+                setattr(recipes[pk], count_column, len(names))
+        recipe_model.objects.using(using).bulk_update(
+            recipes.values(), columns
+        )
+
+
+def backfill(recipe_model, using='default', user_id=None, progress=None):
+    """Recompute the summary of every recipe, or of one user's recipes"""
+    return batches.walk(
+        recipe_model,
+        lambda ids: refresh(recipe_model, ids, using=using),
+        using, user_id, progress
+    )
+
+
+@contextmanager
+def ignore_changes(fields):
+    """
+    Skip the signal refresh of recipes relinked within the block.
+
+    For callers that already wrote the summary of the given relations.
+    Changes made from the tag or ingredient side are still refreshed.
+    """
+    token = _ignored.set(_ignored.get() | frozenset(fields))
+    try:
+        yield
+    finally:
+        _ignored.reset(token)
+
+
+def ignored(field):
+    """Return whether link changes of a relation are being skipped"""
+    return field in _ignored.get()
@@ -0,0 +1,151 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    ExpiringLRUCache, credential_cache, token_cache,
+)
+
+
+ME_URL = reverse('user:me')
+
+
+def basic_header(email, password):
+    """Return an HTTP Basic authorization header value"""
+    credentials = base64.b64encode(f'{email}:{password}'.encode()).decode()
+    return f'Basic {credentials}'
+
+
+class ExpiringLRUCacheTests(TestCase):
+    """Test the bounded in-process cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted when full"""
+        cache = ExpiringLRUCache(max_size=2, ttl=60)
+        cache.set('a', 1, 'A')
+        cache.set('b', 2, 'B')
+        cache.get('a')
+        cache.set('c', 3, 'C')
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 2})
+
+    def test_entries_expire(self):
+        """Test entries older than the ttl are misses"""
+        cache = ExpiringLRUCache(max_size=2, ttl=0)
+        cache.set('a', 1, 'A')
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_user(self):
+        """Test every entry of a user can be dropped"""
+        cache = ExpiringLRUCache(max_size=10, ttl=60)
+        cache.set('a', 1, 'A')
+        cache.set('b', 1, 'B')
+        cache.set('c', 2, 'C')
+        cache.delete_user(1)
+
+        self.assertEqual(cache.stats()['size'], 1)
+        self.assertEqual(cache.get('c'), 'C')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token authentication served from the token cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_token_lookup(self):
+        """Test the second request authenticates without queries"""
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating immediately"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating immediately"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CachedBasicAuthenticationTests(TestCase):
+    """Test basic authentication served from the credential cache"""
+
+    def setUp(self):
+        credential_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword',
+            name='Test'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'testpassword')
+        )
+
+    def test_repeat_requests_skip_password_check(self):
+        """Test the second request authenticates without queries"""
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(credential_cache.stats()['hits'], 1)
+
+    def test_wrong_password_not_served_from_cache(self):
+        """Test a cached login does not admit a different password"""
+        self.client.get(ME_URL)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'wrongpassword')
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        """Test the old password stops working after a password change"""
+        self.client.patch(ME_URL, {'password': 'newpassword'})
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'newpassword')
+        )
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,82 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils.module_loading import autodiscover_modules
+
+from core.benchmarking import SCENARIOS, compare, percentile, summarize
+
+
+class BenchmarkingTests(SimpleTestCase):
+    """Test the benchmark report helpers"""
+
+    def test_summarize(self):
+        """Test timings are summarized as throughput and percentiles"""
+        summary = summarize([0.002, 0.001, 0.004, 0.003], queries=8)
+
+        self.assertEqual(summary['runs'], 4)
+        self.assertEqual(summary['per_second'], 400.0)
+        self.assertEqual(summary['p50_ms'], 3.0)
+        self.assertEqual(summary['p99_ms'], 4.0)
+        self.assertEqual(summary['queries_per_run'], 2)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare_flags_regressions(self):
+        """Test slower timings and extra queries are regressions"""
+        baseline = {'api': {'list': {
+            'per_second': 100.0, 'p50_ms': 10.0, 'p95_ms': 20.0,
+            'queries_per_run': 3.0,
+        }}}
+        report = {'api': {'list': {
+            'per_second': 95.0, 'p50_ms': 12.0, 'p95_ms': 18.0,
+            'queries_per_run': 4.0,
+        }, 'detail': {'p50_ms': 1.0}}}
+
+        changes = compare(baseline, report)['api']['list']
+
+        self.assertFalse(changes['per_second']['regression'])
+        self.assertEqual(changes['p50_ms']['change_pct'], 20.0)
+        self.assertTrue(changes['p50_ms']['regression'])
+        self.assertFalse(changes['p95_ms']['regression'])
+        self.assertTrue(changes['queries_per_run']['regression'])
+        self.assertNotIn('detail', compare(baseline, report)['api'])
+
+
+class BenchmarkScenarioTests(TransactionTestCase):
+    """Test the registered benchmark scenarios"""
+
+    def test_scenarios_run_at_small_scale(self):
+        """Test every scenario runs on less than a page of recipes"""
+        autodiscover_modules('benchmarks')
+
+        for name, scenario in sorted(SCENARIOS.items()):
+            with self.subTest(scenario=name):
+                self.assertIsInstance(scenario(repeat=1, scale=5), dict)
+            call_command('flush', interactive=False, verbosity=0)
+            cache.clear()
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    """Test the benchmark command"""
+
+    def test_scenarios_run_in_a_row(self):
+        """Test a scenario's threads leave nothing in the next database"""
+        # Each scenario gets a throwaway database, which the test database
+        # cannot nest, so the command runs in its own process
+        result = subprocess.run(
+            [
+                sys.executable, 'manage.py', 'benchmark', 'asgi',
+                'basic-auth', '--repeat', '1', '--scale', '5',
+            ],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        scenarios = json.loads(result.stdout)['scenarios']
+        self.assertEqual(set(scenarios), {'asgi', 'basic-auth'})
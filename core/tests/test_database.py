@@ -0,0 +1,96 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from core import database
+
+
+def file_connection(directory):
+    """Return an unopened connection to a SQLite file in the directory"""
+    settings_dict = dict(
+        connections['default'].settings_dict,
+        NAME=os.path.join(directory, 'db.sqlite3'),
+    )
+    return connections['default'].__class__(settings_dict, alias='file')
+
+
+class SqlitePragmaTests(SimpleTestCase):
+    """Test the pragmas applied to new SQLite connections"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 1234,
+        'mmap_size': 1048576,
+    })
+    def test_pragmas_applied(self):
+        """Test new connections run the configured pragmas"""
+        wrapper = file_connection(self.directory.name)
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+
+        self.assertEqual(self._pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self._pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self._pragma(wrapper, 'busy_timeout'), 1234)
+        self.assertEqual(self._pragma(wrapper, 'mmap_size'), 1048576)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas(self):
+        """Test SQLite defaults are kept when no pragmas are configured"""
+        wrapper = file_connection(self.directory.name)
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+
+        self.assertEqual(self._pragma(wrapper, 'journal_mode'), 'delete')
+
+
+class CheckConnectionsTests(SimpleTestCase):
+    """Test dead persistent connections are dropped"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.wrapper = file_connection(self.directory.name)
+        self.wrapper.settings_dict['CONN_MAX_AGE'] = 60
+        self.wrapper.ensure_connection()
+        self.addCleanup(self.wrapper.close)
+        patcher = mock.patch.object(
+            database.connections, 'all', return_value=[self.wrapper]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(DB_HEALTH_CHECKS=True)
+    def test_unusable_connection_closed(self):
+        """Test a connection failing the check is closed"""
+        with mock.patch.object(self.wrapper, 'is_usable', return_value=False):
+            database.check_connections()
+
+        self.assertIsNone(self.wrapper.connection)
+
+    @override_settings(DB_HEALTH_CHECKS=True)
+    def test_usable_connection_kept(self):
+        """Test a healthy connection is reused"""
+        raw = self.wrapper.connection
+
+        database.check_connections()
+
+        self.assertIs(self.wrapper.connection, raw)
+
+    @override_settings(DB_HEALTH_CHECKS=False)
+    def test_checks_disabled(self):
+        """Test no check runs when health checks are off"""
+        with mock.patch.object(self.wrapper, 'is_usable') as is_usable:
+            database.check_connections()
+
+        is_usable.assert_not_called()
@@ -0,0 +1,82 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, IntegrityError
+from django.test import TestCase
+
+from core import models
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite specific')
+class IndexUsageTests(TestCase):
+    """Test that the hot filter queries are answered from indexes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+
+    def assertUsesIndexes(self, queryset):
+        """Assert every table in the query plan is searched via an index"""
+        plan = queryset.explain()
+        self.assertNotIn('SCAN', plan)
+        for line in plan.splitlines():
+            self.assertIn('USING', line)
+
+    def test_user_filter_uses_index(self):
+        """Test filtering recipes, tags and ingredients by user"""
+        self.assertUsesIndexes(models.Tag.objects.filter(user=self.user))
+        self.assertUsesIndexes(
+            models.Ingredient.objects.filter(user=self.user)
+        )
+        self.assertUsesIndexes(
+            models.Recipe.objects.filter(user=self.user).order_by(
+                '-rcpCreatedOn', '-id'
+            )
+        )
+
+    def test_name_filter_uses_index(self):
+        """Test looking up tags and ingredients by name"""
+        self.assertUsesIndexes(
+            models.Tag.objects.filter(user=self.user, name__in=['a', 'b'])
+        )
+        self.assertUsesIndexes(
+            models.Ingredient.objects.filter(name__in=['a', 'b'])
+        )
+
+    def test_recipe_relation_filters_use_index(self):
+        """Test filtering recipes by tag and ingredient names"""
+        self.assertUsesIndexes(
+            models.Recipe.objects.filter(
+                user=self.user,
+                tags__name__in=['a', 'b']
+            )
+        )
+        self.assertUsesIndexes(
+            models.Recipe.objects.filter(
+                user=self.user,
+                ingredients__name__in=['a', 'b']
+            )
+        )
+
+
+class UniqueNameTests(TestCase):
+    """Test tag and ingredient names are unique per user"""
+
+    def test_duplicate_tag_name_rejected(self):
+        """Test a user cannot hold two tags with the same name"""
+        user = get_user_model().objects.create_user('a@test.com', 'pass')
+        models.Tag.objects.create(user=user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_same_name_for_different_users(self):
+        """Test two users may use the same ingredient name"""
+        user1 = get_user_model().objects.create_user('a@test.com', 'pass')
+        user2 = get_user_model().objects.create_user('b@test.com', 'pass')
+        models.Ingredient.objects.create(user=user1, name='Salt')
+        models.Ingredient.objects.create(user=user2, name='Salt')
+
+        self.assertEqual(models.Ingredient.objects.count(), 2)
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.authentication import token_cache
+from core.models import Recipe
+
+
+METRICS_URL = reverse('metrics')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RouteHistogramsTests(TestCase):
+    """Test the rolling per route histograms"""
+
+    def test_window_keeps_latest_samples(self):
+        """Test only the last `window` requests count"""
+        histograms = instrumentation.RouteHistograms(window=3)
+        for ms in (900, 10, 20, 30):
+            histograms.add('GET x', ms / 1000, 2, 0.001, 100)
+
+        summary = histograms.summary()['GET x']
+
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['p50_ms'], 20.0)
+        self.assertEqual(summary['p99_ms'], 30.0)
+        self.assertEqual(summary['queries_avg'], 2)
+        self.assertEqual(summary['bytes_p50'], 100)
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Test request timings, headers and the metrics endpoint"""
+
+    def setUp(self):
+        instrumentation.histograms.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+        Recipe.objects.create(user=self.user, title='Dal', type='VEG')
+
+    def test_server_timing_header(self):
+        """Test responses report SQL, auth, view and render timings"""
+        res = self.client.get(RECIPE_URL)
+
+        timing = res['Server-Timing']
+        for entry in ('db;dur=', 'queries"', 'auth;dur=', 'view;dur=',
+                      'serialize;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(entry, timing)
+
+    def test_metrics_staff_only(self):
+        """Test the metrics endpoint rejects regular users"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_summary(self):
+        """Test staff users see percentiles per route"""
+        self.user.is_staff = True
+        self.user.save()
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        route = res.data['GET recipe:recipe-list']
+        self.assertEqual(route['count'], 3)
+        self.assertGreater(route['queries_avg'], 0)
+        self.assertGreater(route['bytes_p50'], 0)
+        self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+
+    def test_metrics_auth_caches(self):
+        """Test staff users see the hits and misses of the auth caches"""
+        self.user.is_staff = True
+        self.user.save()
+        token_cache.clear()
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        stats = res.data['auth_caches']['token']
+        self.assertEqual(stats['misses'], 1)
+        self.assertGreaterEqual(stats['hits'], 2)
+        self.assertIn('hits', res.data['auth_caches']['credentials'])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0.001)
+    def test_slow_requests_logged_with_sql(self):
+        """Test requests over the threshold are logged with their SQL"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('app.middleware', 'WARNING') as logs:
+            client.get(RECIPE_URL)
+
+        self.assertIn('Slow request GET recipe:recipe-list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -0,0 +1,115 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+from unittest import mock
+
+import pytz
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+PAYLOAD = OrderedDict([
+    ('next', None),
+    ('results', [
+        OrderedDict([
+            ('id', 1),
+            ('title', 'Pāneer "tikka"\n line '),
+            ('tags', ['Spicy', 'Dinner']),
+            ('rating', 4.5),
+            ('rcpCreatedOn', '01-02-2020 10:30'),
+            ('veg', True),
+        ]),
+    ]),
+    ('price', decimal.Decimal('1.25')),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('label', gettext_lazy('Recipe')),
+    ('ids', (1, 2)),
+    (3, 'int key'),
+])
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the orjson backed renderer matches the stdlib renderer"""
+
+    def test_output_matches_json_renderer(self):
+        """Test compact output is byte identical"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_stdlib_fallback_matches(self):
+        """Test the output does not change without orjson"""
+        with mock.patch.object(renderers, 'orjson', None):
+            fallback = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(fallback, FastJSONRenderer().render(PAYLOAD))
+
+    def test_big_integers_fall_back(self):
+        """Test values orjson cannot encode still render"""
+        self.assertEqual(
+            FastJSONRenderer().render({'id': 2 ** 70}),
+            b'{"id":1180591620717411303424}'
+        )
+
+    def test_indent_is_honoured(self):
+        """Test indented output requested through the media type"""
+        self.assertEqual(
+            FastJSONRenderer().render(
+                {'id': 1}, 'application/json; indent=2'
+            ),
+            b'{\n  "id": 1\n}'
+        )
+
+    def test_datetimes_use_datetime_format(self):
+        """Test datetimes are formatted like serializer fields"""
+        created = datetime.datetime(2020, 2, 1, 10, 30, 15, tzinfo=pytz.utc)
+
+        self.assertEqual(
+            FastJSONRenderer().render({'created': created}),
+            b'{"created":"01-02-2020 10:30"}'
+        )
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render({'created': created}),
+                b'{"created":"01-02-2020 10:30"}'
+            )
+
+
+class FastJSONParserTests(TestCase):
+    """Test the orjson backed parser"""
+
+    def test_parse_matches_json_parser(self):
+        """Test a body parses to the same data as with the stdlib parser"""
+        body = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_invalid_json(self):
+        """Test malformed bodies raise a parse error"""
+        for body in (b'{"id": ', b'{"id": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_other_encodings_use_stdlib(self):
+        """Test bodies in other encodings are still decoded"""
+        body = '{"name": "Pāneer"}'.encode('utf-16')
+
+        data = FastJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': 'utf-16'}
+        )
+
+        self.assertEqual(data, {'name': 'Pāneer'})
@@ -0,0 +1,215 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import counters, routers
+from core.models import Ingredient, Recipe, RecipeCounter, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return a recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(
+    DATABASE_PRIMARY='primary',
+    DATABASE_REPLICAS=['replica'],
+    REPLICA_STICKY_SECONDS=60,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test reads go to the replica unless the client just wrote"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        for alias in ('primary', 'replica'):
+            connections.databases[alias] = dict(
+                connections['default'].settings_dict,
+                NAME=os.path.join(cls.directory, f'{alias}.sqlite3'),
+                TEST={},
+            )
+        call_command('migrate', database='primary', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in ('primary', 'replica'):
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            f'{self._testMethodName}@test.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Spicy')
+        Ingredient.objects.create(user=self.user, name='Rice')
+        self.replicate()
+
+    def replicate(self):
+        """Copy the primary to the replica, like replication catching up"""
+        connections['replica'].close()
+        for connection in (connections['primary'], connections['replica']):
+            connection.ensure_connection()
+        connections['primary'].connection.backup(
+            connections['replica'].connection
+        )
+
+    def create_recipe(self, title):
+        """Create a recipe on the primary only"""
+        return Recipe.objects.create(
+            user=self.user, title=title, type='VEG', cookingInstruction=''
+        )
+
+    def post_recipe(self, title):
+        """Create a recipe through the API"""
+        return self.client.post(RECIPE_URL, {
+            'title': title,
+            'type': 'VEG',
+            'tags': ['Spicy'],
+            'ingredients': ['Rice'],
+            'cookingInstruction': '',
+        }, format='json')
+
+    def titles(self, res):
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_reads_go_to_replica(self):
+        """Test safe requests do not see writes the replica lacks"""
+        recipe = self.create_recipe('Not replicated')
+
+        res = self.client.get(RECIPE_URL)
+        detail = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), [])
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_replicated_rows_read(self):
+        """Test rows copied to the replica are served from it"""
+        self.create_recipe('Replicated')
+        self.replicate()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.titles(res), ['Replicated'])
+
+    def test_writes_go_to_primary(self):
+        """Test unsafe requests write to and read from the primary"""
+        res = self.post_recipe('Posted')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        for alias, exists in (('primary', True), ('replica', False)):
+            self.assertEqual(
+                Recipe.objects.using(alias).filter(user=self.user).exists(),
+                exists
+            )
+
+    def test_bulk_writes_go_to_primary(self):
+        """Test bulk writes keep the counters next to the recipes"""
+        res = self.client.post(reverse('recipe:recipe-bulk'), [{
+            'title': f'Recipe {index}',
+            'type': 'VEG',
+            'tags': ['Spicy'],
+            'ingredients': ['Rice'],
+            'cookingInstruction': '',
+        } for index in range(2)], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.patch(reverse('recipe:recipe-bulk'), [
+            {'id': res.data[0]['id'], 'type': 'NON-VEG', 'tags': []},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        stored = {
+            (self.user.pk, kind, key): value
+            for kind, key, value in RecipeCounter.objects.using(
+                'primary'
+            ).filter(user=self.user, value__gt=0).values_list(
+                'kind', 'key', 'value'
+            )
+        }
+        self.assertEqual(
+            stored, counters.aggregate(Recipe, 'primary', self.user.pk)
+        )
+        self.assertFalse(RecipeCounter.objects.using('default').exists())
+
+    def test_cookie_keeps_client_on_primary(self):
+        """Test a client reads its own writes through the sticky cookie"""
+        self.post_recipe('Posted')
+        cache.clear()
+
+        self.assertIn(routers.STICKY_COOKIE, self.client.cookies)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.titles(res), ['Posted'])
+
+    def test_user_window_keeps_client_on_primary(self):
+        """Test a user reads their own writes without the cookie"""
+        self.post_recipe('Posted')
+        self.client.cookies.clear()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.titles(res), ['Posted'])
+
+    def test_other_users_read_replica(self):
+        """Test one user's writes do not pin other users to the primary"""
+        self.post_recipe('Posted')
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        Recipe.objects.create(
+            user=other, title='Not replicated', type='VEG',
+            cookingInstruction=''
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+
+        res = client.get(RECIPE_URL)
+
+        self.assertEqual(self.titles(res), [])
+
+    def test_window_expires(self):
+        """Test reads return to the replica after the sticky window"""
+        self.post_recipe('Posted')
+        self.client.cookies.clear()
+        cache.clear()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.titles(res), [])
+
+    def test_failed_write_not_sticky(self):
+        """Test rejected writes leave the client on the replica"""
+        res = self.client.post(RECIPE_URL, {'title': ''}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(routers.STICKY_COOKIE, self.client.cookies)
+        self.assertFalse(routers.wrote_recently(self.user.pk))
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test management code and shells read from the primary"""
+        self.create_recipe('Not replicated')
+
+        self.assertEqual(
+            Recipe.objects.filter(user=self.user).count(), 1
+        )
@@ -0,0 +1,59 @@
+import functools
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def query_counts(populate, request, sizes=(1, 100)):
+    """
+    Return the queries `request()` runs after populating each size.
+
+    `populate(size)` must top the data up to `size` objects, the sizes are
+    visited in increasing order so caches can only lower later counts.
+    """
+    counts = {}
+    for size in sorted(sizes):
+        populate(size)
+        with CaptureQueriesContext(connection) as context:
+            request()
+        counts[size] = len(context.captured_queries)
+    return counts
+
+
+def assert_constant_queries(testcase, populate, request, sizes=(1, 100),
+                            budget=None):
+    """Fail when the queries of `request()` grow with the data size"""
+    counts = query_counts(populate, request, sizes)
+    smallest, largest = counts[min(counts)], counts[max(counts)]
+    testcase.assertLessEqual(
+        largest, smallest,
+        f'Query count grows with the number of objects: {counts}'
+    )
+    if budget is not None:
+        testcase.assertLessEqual(
+            max(counts.values()), budget,
+            f'Query count exceeds the budget of {budget}: {counts}'
+        )
+    return counts
+
+
+def constant_queries(populate, sizes=(1, 100), budget=None):
+    """
+    Run a test once per data size and fail if its queries grow with it.
+
+    `populate` is the name of a test case method taking the size, which
+    must top the data up to that many objects before each run. The body
+    of the decorated test should make the request being guarded.
+    """
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self):
+            assert_constant_queries(
+                self,
+                lambda size: getattr(self, populate)(size),
+                lambda: test(self),
+                sizes,
+                budget
+            )
+        return wrapper
+    return decorator
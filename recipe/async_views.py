@@ -0,0 +1,90 @@
+"""
+Async entry points to the read endpoints, for ASGI deployments.
+
+Under ASGI, Django 3.1 runs every sync view on one shared thread, so a
+slow query holds up every other request of the process. The views built
+by `async_view()` authenticate on the event loop, answering cached
+credentials without a thread switch, and run the existing viewset on the
+`core.async_db` pool, so responses match the sync endpoints byte for byte.
+"""
+from contextvars import ContextVar
+
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import APIException
+
+from core.async_db import run_db
+from core.instrumentation import timed
+from recipe import views
+
+
+# (user and auth or the error, challenge header) of the current request
+_outcome = ContextVar('async_auth_outcome')
+
+
+class PrecomputedAuthentication(BaseAuthentication):
+    """
+    Hand the viewset what `authenticate()` found on the event loop.
+
+    Returns the (user, auth) pair or raises the error found there, so the
+    credentials are checked once and the viewset still builds the error
+    response, challenge header included, like the sync endpoints do.
+    """
+
+    def authenticate(self, request):
+        result, _ = _outcome.get()
+        if isinstance(result, APIException):
+            raise result
+        return result
+
+    def authenticate_header(self, request):
+        return _outcome.get()[1]
+
+
+async def authenticate(viewset_class, request):
+    """Return (user, auth) from the viewset's authenticators, or None"""
+    for authentication_class in viewset_class.authentication_classes:
+        result = await authentication_class().authenticate_async(request)
+        if result is not None:
+            return result
+    return None
+
+
+def async_view(viewset_class, actions):
+    """Return an async view serving `actions` of a viewset"""
+    authenticators = viewset_class.authentication_classes
+    if all(hasattr(cls, 'authenticate_async') for cls in authenticators):
+        view = viewset_class.as_view(
+            actions, authentication_classes=(PrecomputedAuthentication,)
+        )
+    else:
+        # Authenticate on the pool like the sync endpoints
+        view = viewset_class.as_view(actions)
+        authenticators = ()
+
+    def respond(request, args, kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            with timed('render'):
+                response.render()
+        return response
+
+    async def async_view(request, *args, **kwargs):
+        if authenticators:
+            try:
+                result = await authenticate(viewset_class, request)
+            except APIException as exc:
+                result = exc
+            header = authenticators[0]().authenticate_header(request)
+            # run_db copies the context, the viewset reads it on the pool
+            _outcome.set((result, header))
+        return await run_db(respond, request, args, kwargs)
+
+    async_view.__name__ = f'async_{viewset_class.__name__}'
+    async_view.__doc__ = viewset_class.__doc__
+    return async_view
+
+
+recipe_list = async_view(views.RecipeViewset, {'get': 'list'})
+recipe_detail = async_view(views.RecipeViewset, {'get': 'retrieve'})
+tag_list = async_view(views.TagViewset, {'get': 'list'})
+ingredient_list = async_view(views.IngredientViewset, {'get': 'list'})
@@ -0,0 +1,643 @@
+import asyncio
+import base64
+import io
+import itertools
+import random
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import async_db, counters, similarity
+from core.benchmarking import (
+    close_connections, close_pool_connections, measure, register, summarize,
+)
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from core.models import Recipe, RecipeCounter, Tag, Ingredient
+from recipe import export, importer, matching, search, stats
+from recipe.serializers import RecipeSerializer, TagSerializer
+
+
+WORDS = (
+    'paneer rice dal masala curry tikka roti naan chicken mutton fish egg '
+    'potato tomato onion garlic ginger chilli cumin coriander turmeric '
+    'lentil spinach cauliflower peas cabbage carrot beans yogurt ghee '
+    'butter cream coconut tamarind jaggery mustard fenugreek cardamom '
+    'clove cinnamon pepper lemon mint basil noodle pasta cheese bread '
+    'grill roast fry boil steam bake simmer stir chop slice knead'
+).split()
+
+
+def create_user(email='bench@test.com', password='benchpassword'):
+    """Create the user that owns the synthetic data"""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipes(user, count, rare_word=None, rare_every=100,
+                   batch_size=1000, seed=0):
+    """Bulk create `count` recipes made of random words"""
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        batch = []
+        for index in range(start, min(start + batch_size, count)):
+            instructions = rng.choices(WORDS, k=30)
+            if rare_word and index % rare_every == 0:
+                instructions.append(rare_word)
+            batch.append(Recipe(
+                user=user,
+                title=' '.join(rng.sample(WORDS, 3)),
+                type=rng.choice(('VEG', 'NON-VEG')),
+                cookingInstruction=' '.join(instructions),
+            ))
+        Recipe.objects.bulk_create(batch)
+
+
+def create_dataset(user, count, tags=20, ingredients=50, tags_per_recipe=3,
+                   ingredients_per_recipe=5, seed=0):
+    """Create recipes for a user linked to a pool of tags and ingredients"""
+    rng = random.Random(seed)
+    create_recipes(user, count, seed=seed)
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    for field, model, size, per_recipe in (
+        ('tags', Tag, tags, tags_per_recipe),
+        ('ingredients', Ingredient, ingredients, ingredients_per_recipe),
+    ):
+        model.objects.bulk_create([
+            model(user=user, name=f'{field[:-1]}-{index}')
+            for index in range(size)
+        ])
+        ids = list(model.objects.filter(user=user).values_list(
+            'id', flat=True
+        ))
+        relation = getattr(Recipe, field)
+        column = relation.field.m2m_reverse_field_name() + '_id'
+        for start in range(0, len(recipe_ids), 1000):
+            relation.through.objects.bulk_create([
+                relation.through(recipe_id=recipe_id, **{column: pk})
+                for recipe_id in recipe_ids[start:start + 1000]
+                for pk in rng.sample(ids, min(per_recipe, len(ids)))
+            ])
+    # The rows above are written without signals
+    counters.fill(Recipe, RecipeCounter, user_id=user.pk)
+
+
+@register('search')
+def search_recipes(repeat, scale):
+    """Compare the FTS5 index with icontains scans for recipe search"""
+    user = create_user()
+    create_recipes(user, scale, rare_word='saffron', rare_every=1000)
+    recipes = Recipe.objects.filter(user=user)
+
+    report = {'recipes': scale}
+    for label, terms in (('common', ['paneer']), ('rare', ['saffron'])):
+        fts = search.fts_search(recipes, terms, user.pk)
+        scan = search.icontains_search(recipes, terms)
+        report[label] = {
+            'matches': fts.count(),
+            'first_page': {
+                'fts': measure(
+                    lambda: list(fts.order_by('search_rank', 'id')[:20]),
+                    repeat=repeat
+                ),
+                'icontains': measure(
+                    lambda: list(scan.order_by('-rcpCreatedOn', '-id')[:20]),
+                    repeat=repeat
+                ),
+            },
+            'count': {
+                'fts': measure(fts.count, repeat=repeat),
+                'icontains': measure(scan.count, repeat=repeat),
+            },
+        }
+    return report
+
+
+@register('match')
+def match_ingredients(repeat, scale):
+    """Compare the ingredient match index with grouping the link rows in SQL"""
+    user = create_user()
+    create_dataset(user, scale)
+    have = list(Ingredient.objects.filter(user=user).order_by(
+        'id'
+    ).values_list('id', flat=True)[:8])
+    limit = 20
+    grouped = Recipe.objects.filter(user=user).annotate(
+        matched=Count('ingredients', filter=Q(ingredients__in=have)),
+        total=Count('ingredients'),
+    ).filter(matched__gt=0).annotate(coverage=ExpressionWrapper(
+        F('matched') * 1.0 / F('total'), output_field=FloatField()
+    )).order_by('-coverage', '-matched', '-id').values_list(
+        'coverage', 'matched', 'id'
+    )
+    recipe_id = Recipe.objects.filter(user=user).values_list(
+        'id', flat=True
+    ).first()
+
+    def cold():
+        matching.clear()
+        matching.get_index(user.pk)
+
+    cold_build = measure(cold, repeat=max(1, repeat // 10), warmup=1)
+    return {
+        'recipes': scale,
+        'ingredients': len(have),
+        'same_results': (
+            [row[2] for row in grouped[:limit]]
+            == [row[2] for row in matching.match(user.pk, have, limit)]
+        ),
+        'top_k': {
+            'index': measure(
+                lambda: matching.match(user.pk, have, limit), repeat=repeat
+            ),
+            'sql': measure(lambda: list(grouped[:limit]), repeat=repeat),
+        },
+        'index_build': cold_build,
+        'index_update': measure(
+            lambda: matching.recipes_changed(user.pk, [recipe_id]),
+            repeat=repeat
+        ),
+    }
+
+
+@register('similar')
+def similar_recipes(repeat, scale):
+    """Compare LSH bucket lookups with exact Jaccard over every recipe"""
+    user = create_user()
+    create_dataset(user, scale)
+    started = time.perf_counter()
+    similarity.rebuild(Recipe, user_id=user.pk)
+    rebuild_seconds = time.perf_counter() - started
+    recipe_id = Recipe.objects.filter(user=user).values_list(
+        'id', flat=True
+    ).first()
+    limit = 10
+
+    def lsh():
+        shared = dict(similarity.candidates(
+            Recipe, recipe_id, user.pk, limit * 5
+        ))
+        linked = similarity.elements(Recipe, [recipe_id, *shared])
+        target = linked.pop(recipe_id)
+        return sorted(
+            linked,
+            key=lambda pk: (
+                similarity.jaccard(target, linked[pk]), shared[pk], pk
+            ),
+            reverse=True
+        )[:limit]
+
+    def exact():
+        linked = similarity.elements(
+            Recipe, Recipe.objects.filter(user=user).values_list(
+                'id', flat=True
+            )
+        )
+        target = linked.pop(recipe_id)
+        return sorted(
+            linked,
+            key=lambda pk: (similarity.jaccard(target, linked[pk]), pk),
+            reverse=True
+        )[:limit]
+
+    best = [similarity.jaccard(
+        *similarity.elements(Recipe, [recipe_id, pk]).values()
+    ) for pk in exact()]
+    found = [similarity.jaccard(
+        *similarity.elements(Recipe, [recipe_id, pk]).values()
+    ) for pk in lsh()]
+    return {
+        'recipes': scale,
+        'rebuild_per_second': round(scale / rebuild_seconds, 1),
+        'top_k_similarity': {'lsh': found, 'exact': best},
+        'top_k': {
+            'lsh': measure(lsh, repeat=repeat),
+            'exact': measure(exact, repeat=max(1, repeat // 10), warmup=1),
+        },
+    }
+
+
+@register('stats')
+def recipe_statistics(repeat, scale):
+    """Compare the materialized counters with aggregating every recipe"""
+    user = create_user()
+    create_dataset(user, scale)
+    stored = {
+        (user.pk, kind, key): value
+        for kind, key, value in RecipeCounter.objects.filter(
+            user=user, value__gt=0
+        ).values_list('kind', 'key', 'value')
+    }
+    return {
+        'recipes': scale,
+        'same_results': (
+            stored == counters.aggregate(Recipe, 'default', user.pk)
+        ),
+        'counters': measure(
+            lambda: stats.read_counters(user, 'default'), repeat=repeat
+        ),
+        'aggregates': measure(
+            lambda: counters.aggregate(Recipe, 'default', user.pk),
+            repeat=max(1, repeat // 10)
+        ),
+    }
+
+
+def peak_memory(func):
+    """Return the peak traced allocation of a call in KiB"""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024)
+    finally:
+        tracemalloc.stop()
+
+
+@register('export')
+def export_recipes(repeat, scale):
+    """Compare peak memory of a materialized list with a streamed export"""
+    user = create_user()
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=word) for word in WORDS[:10]]
+    )
+    tags = list(Tag.objects.filter(user=user))
+    report = {}
+    for size in (scale // 10, scale):
+        create_recipes(user, size - Recipe.objects.count())
+        Recipe.tags.through.objects.all().delete()
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=pk, tag_id=tags[pk % 10].pk)
+            for pk in Recipe.objects.values_list('id', flat=True)
+        ])
+        recipes = Recipe.objects.filter(user=user).order_by('-id')
+
+        def materialized():
+            data = RecipeSerializer(
+                RecipeSerializer.setup_eager_loading(recipes), many=True
+            ).data
+            return JSONRenderer().render(data)
+
+        def streamed():
+            response = export.streaming_response(
+                recipes.only(*RecipeSerializer.eager_fields),
+                RecipeSerializer, {}, 'ndjson', 500
+            )
+            for _ in response.streaming_content:
+                pass
+
+        report[size] = {
+            'materialized_peak_kib': peak_memory(materialized),
+            'streamed_peak_kib': peak_memory(streamed),
+        }
+    return report
+
+
+@register('import')
+def import_recipes(repeat, scale):
+    """Measure the throughput of the bulk recipe importer"""
+    user = create_user()
+    rng = random.Random(0)
+    rows = [
+        (index, {
+            'title': ' '.join(rng.sample(WORDS, 3)),
+            'type': rng.choice(('VEG', 'NON-VEG')),
+            'cookingInstruction': ' '.join(rng.choices(WORDS, k=30)),
+            'tags': rng.sample(WORDS[:20], 2),
+            'ingredients': rng.sample(WORDS, 5),
+        })
+        for index in range(scale)
+    ]
+    recipe_importer = importer.RecipeImporter(default_user=user)
+    recipe_importer.run(iter(rows))
+    return {
+        'recipes': recipe_importer.imported,
+        'per_second': round(recipe_importer.rate, 1),
+    }
+
+
+@register('serializers')
+def serialize_pages(repeat, scale):
+    """Compare serializer rendering of list pages with the values() path"""
+    user = create_user()
+    create_recipes(user, scale)
+    Tag.objects.bulk_create([Tag(user=user, name=word) for word in WORDS])
+    tags = list(Tag.objects.filter(user=user).order_by('id'))
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=pk, tag_id=tags[(pk + i) % 20].pk)
+        for pk in Recipe.objects.values_list('id', flat=True)
+        for i in range(3)
+    ])
+
+    page = min(scale, 100)
+    recipes = Recipe.objects.filter(user=user).order_by('-id')[:page]
+    tag_rows = Tag.objects.filter(user=user).order_by('id')
+    return {
+        'page_size': page,
+        'recipes': {
+            'serializer': measure(lambda: RecipeSerializer(
+                RecipeSerializer.setup_eager_loading(recipes), many=True
+            ).data, repeat=repeat),
+            'values': measure(lambda: RecipeSerializer.serialize_rows(
+                recipes.values(*RecipeSerializer.values_fields())
+            ), repeat=repeat),
+        },
+        'tags': {
+            'serializer': measure(
+                lambda: TagSerializer(tag_rows.all(), many=True).data,
+                repeat=repeat
+            ),
+            'values': measure(lambda: TagSerializer.serialize_rows(
+                tag_rows.values(*TagSerializer.values_fields())
+            ), repeat=repeat),
+        },
+    }
+
+
+@register('json')
+def render_json(repeat, scale):
+    """Compare the stdlib and fast JSON backends on recipe list payloads"""
+    user = create_user()
+    create_recipes(user, scale)
+    rows = Recipe.objects.filter(user=user).order_by('-id').values(
+        *RecipeSerializer.values_fields()
+    )
+
+    report = {}
+    for size in sorted({min(scale, 100), scale}):
+        payload = {
+            'next': None,
+            'previous': None,
+            'results': RecipeSerializer.serialize_rows(rows[:size]),
+        }
+        body = JSONRenderer().render(payload['results'])
+        report[size] = {
+            'bytes': len(body),
+            'render': {
+                'stdlib': measure(
+                    lambda: JSONRenderer().render(payload), repeat=repeat
+                ),
+                'fast': measure(
+                    lambda: FastJSONRenderer().render(payload), repeat=repeat
+                ),
+            },
+            'parse': {
+                'stdlib': measure(
+                    lambda: JSONParser().parse(io.BytesIO(body)),
+                    repeat=repeat
+                ),
+                'fast': measure(
+                    lambda: FastJSONParser().parse(io.BytesIO(body)),
+                    repeat=repeat
+                ),
+            },
+        }
+    return report
+
+
+@register('api')
+def drive_api(repeat, scale):
+    """
+    Drive the main API endpoints in-process through the test client.
+
+    The measured user owns `scale` recipes linked to 20 tags and 50
+    ingredients, next to two other users with a tenth of that each.
+    """
+    user = create_user()
+    create_dataset(user, scale)
+    for index in range(2):
+        create_dataset(
+            create_user(f'other{index}@test.com'), scale // 10, seed=index + 1
+        )
+
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+    )
+    basic = APIClient()
+    basic.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(
+        b'bench@test.com:benchpassword'
+    ).decode())
+    anonymous = APIClient()
+
+    recipes_url = reverse('recipe:recipe-list')
+    next_page = client.get(recipes_url).data['next']
+    detail_ids = itertools.cycle(Recipe.objects.filter(
+        user=user
+    ).values_list('id', flat=True)[:100])
+    payloads = (
+        {
+            'title': f'Bench recipe {index}',
+            'type': 'VEG',
+            'tags': ['tag-1', 'tag-2'],
+            'ingredients': ['ingredient-1', 'ingredient-2', 'ingredient-3'],
+            'cookingInstruction': 'Mix and serve',
+        }
+        for index in itertools.count()
+    )
+
+    def call(client, method, url, expected=200, **kwargs):
+        def request():
+            res = getattr(client, method)(url, **kwargs)
+            assert res.status_code == expected, (url, res.status_code)
+        return request
+
+    def detail():
+        call(client, 'get', reverse(
+            'recipe:recipe-detail', args=[next(detail_ids)]
+        ))()
+
+    def create():
+        call(
+            client, 'post', recipes_url, expected=201,
+            data=next(payloads), format='json'
+        )()
+
+    cases = {
+        'recipe-list': call(client, 'get', recipes_url),
+        'recipe-filter-any': call(
+            client, 'get', recipes_url, data={'tags': 'tag-1,tag-2'}
+        ),
+        'recipe-filter-all': call(
+            client, 'get', recipes_url,
+            data={'tags': 'tag-1,tag-2', 'match': 'all'}
+        ),
+        'recipe-filter-ingredients': call(
+            client, 'get', recipes_url, data={'ingredients': 'ingredient-7'}
+        ),
+        'recipe-search': call(client, 'get', recipes_url, data={'q': 'dal'}),
+        'recipe-detail': detail,
+        'recipe-create': create,
+        'tag-list': call(client, 'get', reverse('recipe:tag-list')),
+        'ingredient-list': call(
+            client, 'get', reverse('recipe:ingredient-list')
+        ),
+        'auth-token': call(client, 'get', reverse('user:me')),
+        'auth-basic': call(basic, 'get', reverse('user:me')),
+    }
+    # Scales up to one page have no second page to fetch
+    if next_page is not None:
+        cases['recipe-list-page-2'] = call(client, 'get', next_page)
+    report = {'recipes': scale}
+    for name, func in cases.items():
+        report[name] = measure(func, repeat=repeat)
+    # Every login runs the password hasher, keep the sample small
+    report['auth-login'] = measure(call(
+        anonymous, 'post', reverse('user:token'),
+        data={'email': 'bench@test.com', 'password': 'benchpassword'}
+    ), repeat=min(repeat, 10), warmup=1)
+    return report
+
+
+def run_threads(concurrency, count, request):
+    """Send `count` requests from `concurrency` threads, WSGI worker style"""
+    timings = []
+    remaining = iter(range(count))
+    lock = threading.Lock()
+
+    def worker():
+        send = request()
+        try:
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                began = time.perf_counter()
+                send()
+                timings.append(time.perf_counter() - began)
+        finally:
+            close_connections()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(timings, time.perf_counter() - start)
+
+
+def run_tasks(concurrency, count, request):
+    """Send `count` requests with at most `concurrency` in flight on a loop"""
+    async def main():
+        timings = []
+        semaphore = asyncio.Semaphore(concurrency)
+        send = request()
+
+        async def one():
+            async with semaphore:
+                began = time.perf_counter()
+                await send()
+                timings.append(time.perf_counter() - began)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(count)))
+        return summarize(timings, time.perf_counter() - start)
+
+    return asyncio.run(main())
+
+
+# Added to every query while the `asgi` scenario runs, roughly the round
+# trip to a database server on the local network
+DB_ROUND_TRIP = 0.002
+round_trips = threading.Event()
+
+
+def round_trip(execute, sql, params, many, context):
+    """Execute wrapper sleeping like a networked database"""
+    if round_trips.is_set():
+        time.sleep(DB_ROUND_TRIP)
+    return execute(sql, params, many, context)
+
+
+def add_round_trip(sender, connection, **kwargs):
+    if round_trip not in connection.execute_wrappers:
+        connection.execute_wrappers.append(round_trip)
+
+
+@register('asgi')
+def compare_servers(repeat, scale):
+    """
+    Compare WSGI and ASGI throughput of the recipe list at rising concurrency.
+
+    `wsgi` runs one thread per connection like a threaded WSGI server,
+    `asgi-sync` sends the requests from one event loop to the sync view and
+    `asgi-async` to its async variant. Every level sends at least `repeat`
+    requests and at least one per connection. The in-memory database
+    answers far faster than a real one, so every mode also runs with
+    DB_ROUND_TRIP added to each query. Requests are handled in process,
+    the numbers compare the request paths, not the servers.
+    """
+    user = create_user()
+    create_dataset(user, scale)
+    token = f'Token {Token.objects.create(user=user)}'
+    sync_url = reverse('recipe:recipe-list')
+    async_url = reverse('recipe:async-recipe-list')
+
+    def wsgi():
+        client = Client(HTTP_AUTHORIZATION=token)
+
+        def send():
+            res = client.get(sync_url)
+            assert res.status_code == 200, res.status_code
+        return send
+
+    def asgi(url):
+        def request():
+            client = AsyncClient()
+            headers = [(b'host', b'testserver'),
+                       (b'authorization', token.encode())]
+
+            async def send():
+                res = await client.get(url, headers=list(headers))
+                assert res.status_code == 200, res.status_code
+            return send
+        return request
+
+    modes = {
+        'wsgi': (run_threads, wsgi),
+        'asgi-sync': (run_tasks, asgi(sync_url)),
+        'asgi-async': (run_tasks, asgi(async_url)),
+    }
+    report = {
+        'recipes': scale,
+        'db_round_trip_ms': DB_ROUND_TRIP * 1000,
+    }
+    connection.execute_wrappers.append(round_trip)
+    connection_created.connect(add_round_trip)
+    try:
+        # Keep slow request logging out of the report
+        with override_settings(SLOW_REQUEST_THRESHOLD_MS=0):
+            for delayed in (False, True):
+                if delayed:
+                    round_trips.set()
+                for name, (run, request) in modes.items():
+                    # Warm up authentication and the connections
+                    run(1, 3, request)
+                    report[f'{name}-round-trip' if delayed else name] = {
+                        str(concurrency): run(
+                            concurrency, max(repeat, concurrency), request
+                        )
+                        for concurrency in (1, 10, 50, 100)
+                    }
+    finally:
+        round_trips.clear()
+        connection_created.disconnect(add_round_trip)
+        connection.execute_wrappers.remove(round_trip)
+        # Sync views and async queries ran on these long lived threads
+        close_pool_connections(SyncToAsync.single_thread_executor, 1)
+        close_pool_connections(async_db.executor, settings.ASYNC_DB_THREADS)
+    return report
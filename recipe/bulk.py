@@ -0,0 +1,161 @@
+from django.db import connections, router, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class BulkModelMixin:
+    """
+    Create or partially update many objects in one request.
+
+    `POST <list>/bulk/` takes a list of objects to create and
+    `PATCH <list>/bulk/` a list of objects carrying their `id`. Every item
+    is validated first; if any item fails, the response is a 400 holding
+    one error dict per item (empty for valid items) and nothing is written.
+    An update naming the same `id` twice fails before validation.
+    Otherwise the whole batch is written in one transaction through the
+    `perform_bulk_create` / `perform_bulk_update` hooks.
+    """
+    bulk_max_items = 500
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """Create or update a list of objects in one transaction"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Expected a non-empty list of objects.')
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                f'Send at most {self.bulk_max_items} objects per request.'
+            )
+
+        partial = request.method == 'PATCH'
+        if partial:
+            errors = self.check_bulk_ids(items)
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        instances = self.get_bulk_instances(items) if partial else {}
+        context = self.get_bulk_context(items)
+        serializer_class = self.get_serializer_class()
+
+        validated, errors = [], []
+        for item in items:
+            instance = None
+            if partial:
+                instance = instances.get(
+                    item.get('id') if isinstance(item, dict) else None
+                )
+                if instance is None:
+                    validated.append(None)
+                    errors.append({'id': ['Not found.']})
+                    continue
+            serializer = serializer_class(
+                instance,
+                data=item,
+                partial=partial,
+                context=context
+            )
+            serializer.is_valid()
+            validated.append(serializer)
+            errors.append(dict(serializer.errors))
+        self.check_bulk_items(validated, errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        using = router.db_for_write(self.get_queryset().model)
+        with transaction.atomic(using=using):
+            if partial:
+                objs = self.perform_bulk_update(validated)
+            else:
+                objs = self.perform_bulk_create(validated)
+        self.invalidate_bulk()
+
+        return Response(
+            self.get_bulk_response_data(objs),
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED
+        )
+
+    def check_bulk_ids(self, items):
+        """Return one error dict per item, rejecting repeated ids"""
+        first, errors = {}, []
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if isinstance(pk, int) and pk in first:
+                errors.append({'id': [
+                    f'Repeats the id of item {first[pk]} in this batch.'
+                ]})
+                continue
+            if isinstance(pk, int):
+                first[pk] = index
+            errors.append({})
+        return errors
+
+    def get_bulk_instances(self, items):
+        """Return the user's objects referenced by the items keyed by id"""
+        ids = [
+            item['id'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('id'), int)
+        ]
+        return self.get_queryset().in_bulk(ids)
+
+    def get_bulk_context(self, items):
+        """Return the serializer context shared by every item"""
+        return self.get_serializer_context()
+
+    def check_bulk_items(self, serializers, errors):
+        """Hook to add cross-item errors in place"""
+
+    def get_bulk_response_data(self, objs):
+        """Serialize the written objects"""
+        return self.get_serializer(objs, many=True).data
+
+    def perform_bulk_create(self, serializers):
+        raise NotImplementedError(
+            '`perform_bulk_create()` must be implemented.'
+        )
+
+    def perform_bulk_update(self, serializers):
+        raise NotImplementedError(
+            '`perform_bulk_update()` must be implemented.'
+        )
+
+    def invalidate_bulk(self):
+        """Hook to drop caches after a committed batch"""
+
+
+def bulk_insert(model, objs, batch_size=None):
+    """
+    Insert objects with `bulk_create` and set their primary keys.
+
+    Relation rows need the keys, which backends without RETURNING leave
+    unset. SQLite hands out increasing rowids and the write transaction
+    keeps other writers out, so the batch owns the newest ids and they are
+    read back. Other such backends insert one by one, sending signals.
+
+    Returns True when the objects were saved one by one, so callers doing
+    the work of the signals themselves can skip it.
+    """
+    alias = router.db_for_write(model)
+    with transaction.atomic(using=alias):
+        if saves_one_by_one(connections[alias]):
+            for obj in objs:
+                obj.save(force_insert=True, using=alias)
+            return True
+        if connections[alias].features.can_return_rows_from_bulk_insert:
+            model.objects.using(alias).bulk_create(objs, batch_size)
+            return False
+        model.objects.using(alias).bulk_create(objs, batch_size)
+        ids = model.objects.using(alias).order_by('-pk').values_list(
+            'pk', flat=True
+        )[:len(objs)]
+        for obj, pk in zip(objs, reversed(ids)):
+            obj.pk = pk
+        return False
+
+
+def saves_one_by_one(connection):
+    """Return True when `bulk_insert()` has to save objects one by one"""
+    return not connection.features.can_return_rows_from_bulk_insert and (
+        connection.vendor != 'sqlite'
+    )
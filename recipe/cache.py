@@ -0,0 +1,75 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    """Return the cache backend used for recipe API responses"""
+    return caches[getattr(settings, 'RECIPE_CACHE_ALIAS', 'default')]
+
+
+def version_timeout():
+    """Return the seconds a version is kept, None keeps it until evicted"""
+    return getattr(settings, 'RECIPE_VERSION_TIMEOUT', None)
+
+
+def _version_key(scope, user_id):
+    if not isinstance(scope, str):
+        scope = scope._meta.label_lower
+    return f'recipe:version:{scope}:{user_id}'
+
+
+def get_version(scope, user_id):
+    """
+    Return the current cache version of a user's objects of a scope.
+
+    A scope is a model or the name of other per user data. Versions are
+    nanosecond timestamps of the last change, so they double as a
+    Last-Modified stamp and an evicted counter never reuses an old value.
+    They expire after RECIPE_VERSION_TIMEOUT seconds, which bounds how long
+    a process can miss a change its cache was not told about.
+    """
+    cache = get_cache()
+    key = _version_key(scope, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope, user_id):
+    """
+    Invalidate every cached response for a user's objects of a scope.
+
+    Returns the (previous, new) versions. The version moves by an atomic
+    increment, so of two concurrent bumps the later one sees the version
+    the other left. `previous` is None when the version had been evicted.
+    """
+    cache = get_cache()
+    key = _version_key(scope, user_id)
+    current = cache.get(key)
+    if current is not None:
+        step = max(1, time.time_ns() - current)
+        try:
+            version = cache.incr(key, step)
+            return version - step, version
+        except ValueError:
+            # Evicted since it was read
+            pass
+    cache.add(key, time.time_ns(), version_timeout())
+    return None, cache.get(key)
+
+
+def list_key(model, request):
+    """Return the cache key of a list response for the requesting user"""
+    digest = hashlib.md5(
+        request.build_absolute_uri().encode('utf-8')
+    ).hexdigest()
+    version = get_version(model, request.user.pk)
+    return (
+        f'recipe:list:{model._meta.label_lower}:'
+        f'{request.user.pk}:{version}:{digest}'
+    )
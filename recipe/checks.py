@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Backends whose entries only the process writing them can see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse a process local cache for the change stamps of many workers"""
+    alias = getattr(settings, 'RECIPE_CACHE_ALIAS', 'default')
+    backend = settings.CACHES[alias]['BACKEND']
+    if getattr(settings, 'WEB_CONCURRENCY', 1) > 1 and (
+        backend in PROCESS_LOCAL_CACHES
+    ):
+        return [Error(
+            f'The {alias!r} cache ({backend}) is not shared between the '
+            f'{settings.WEB_CONCURRENCY} worker processes.',
+            hint=(
+                'Workers would answer 304 Not Modified and serve cached '
+                'recipe lists after writes handled by another worker. Set '
+                'CACHE_BACKEND and CACHE_LOCATION to a shared cache such as '
+                'memcached or redis.'
+            ),
+            id='recipe.E001',
+        )]
+    return []
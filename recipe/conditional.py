@@ -0,0 +1,71 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from recipe import cache
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs from the user's change stamps.
+
+    List validators are derived from the per-user cache version of the
+    viewset's model, so a matching request is answered with 304 before the
+    queryset is evaluated. Detail validators come from the object's
+    `updated_at` column, one primary key lookup instead of loading and
+    serializing the object, and stay exact whichever cache is configured.
+    """
+    updated_field = 'updated_at'
+
+    def get_stamp(self, request):
+        """Return the change stamp in nanoseconds, None for a missing object"""
+        if not self.detail:
+            return cache.get_version(self.queryset.model, request.user.pk)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            updated = self.queryset.model.objects.filter(
+                user=request.user,
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(self.updated_field, flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            # A malformed lookup, get_object_or_404 answers it with 404
+            return None
+        if updated is None:
+            return None
+        return int(updated.timestamp() * 10 ** 6) * 1000
+
+    def get_validators(self, request):
+        """Return the (etag, last_modified) pair for the current request"""
+        version = self.get_stamp(request)
+        if version is None:
+            return None, None
+        digest = hashlib.md5(
+            request.get_full_path().encode('utf-8')
+        ).hexdigest()[:16]
+        etag = quote_etag(f'{request.user.pk}-{version}-{digest}')
+        return f'W/{etag}', version // 10 ** 9
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Return 304 when the client copy is current, else call handler"""
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            # Not found, let the handler answer
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # The validators are per user, keep shared caches out of it
+            patch_cache_control(response, private=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,73 @@
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+
+from core.renderers import FastJSONRenderer
+
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def iter_batches(queryset, chunk_size, prefetches):
+    """
+    Yield the queryset as lists of at most chunk_size objects.
+
+    `QuerySet.iterator()` ignores `prefetch_related()`, so the relations of
+    each batch are loaded here with one query per lookup. Only one batch is
+    held in memory at a time.
+    """
+    batch = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        batch.append(obj)
+        if len(batch) == chunk_size:
+            prefetch_related_objects(batch, *prefetches())
+            yield batch
+            batch = []
+    if batch:
+        prefetch_related_objects(batch, *prefetches())
+        yield batch
+
+
+def render_ndjson(batches, serialize):
+    """Render one JSON document per line"""
+    renderer = FastJSONRenderer()
+    for batch in batches:
+        yield b''.join(
+            renderer.render(item) + b'\n' for item in serialize(batch)
+        )
+
+
+def render_json(batches, serialize):
+    """Render a single JSON array, one batch at a time"""
+    renderer = FastJSONRenderer()
+    separator = b'['
+    for batch in batches:
+        items = [renderer.render(item) for item in serialize(batch)]
+        if items:
+            yield separator + b','.join(items)
+            separator = b','
+    yield b']' if separator == b',' else b'[]'
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'json': render_json,
+}
+
+
+def streaming_response(queryset, serializer_class, context, layout,
+                       chunk_size):
+    """Return a response streaming the serialized queryset"""
+    batches = iter_batches(
+        queryset, chunk_size, serializer_class.eager_prefetches
+    )
+
+    def serialize(batch):
+        return serializer_class(batch, many=True, context=context).data
+
+    return StreamingHttpResponse(
+        RENDERERS[layout](batches, serialize),
+        content_type=CONTENT_TYPES[layout]
+    )
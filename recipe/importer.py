@@ -0,0 +1,291 @@
+"""
+Bulk loading of recipe datasets.
+
+Rows are read lazily from NDJSON or CSV and written in chunks: tag and
+ingredient names are upserted per user through in-memory name to id maps,
+recipes, with their denormalized names, and their relation rows are
+inserted with `bulk_create`, followed by their similarity buckets, and
+every chunk commits in its own transaction.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from core import counters, similarity, summary
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache, matching
+from recipe.bulk import bulk_insert
+
+
+RECIPE_TYPES = {
+    choice for choice, _ in Recipe._meta.get_field('type').choices
+}
+TITLE_MAX_LENGTH = Recipe._meta.get_field('title').max_length
+INSTRUCTION_MAX_LENGTH = (
+    Recipe._meta.get_field('cookingInstruction').max_length
+)
+NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+class RowError(ValueError):
+    """A row of the dataset cannot be imported"""
+
+    def __init__(self, line, message):
+        super().__init__(f'Line {line}: {message}')
+        self.line = line
+
+
+def read_ndjson(stream):
+    """Yield (line number, row) for every non blank line"""
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            raise RowError(line, f'Invalid JSON ({exc}).')
+        yield line, row
+
+
+def read_csv(stream, separator=';'):
+    """
+    Yield (line number, row) for every CSV record after the header.
+
+    `tags` and `ingredients` cells hold names joined by the separator.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        for field in ('tags', 'ingredients'):
+            cell = row.get(field) or ''
+            row[field] = [name for name in cell.split(separator)]
+        yield reader.line_num, row
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def clean_names(line, field, names):
+    """Return the stripped, deduplicated names of a relation"""
+    if names is None:
+        return []
+    if not isinstance(names, list):
+        raise RowError(line, f'`{field}` must be a list of names.')
+    cleaned = []
+    for name in names:
+        if not isinstance(name, str):
+            raise RowError(line, f'`{field}` must be a list of names.')
+        name = name.strip()
+        if len(name) > NAME_MAX_LENGTH:
+            raise RowError(
+                line,
+                f'`{field}` names are at most {NAME_MAX_LENGTH} characters.'
+            )
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+
+def clean_row(line, row):
+    """Validate a raw row and return it with normalized values"""
+    if not isinstance(row, dict):
+        raise RowError(line, 'Expected an object.')
+    title = row.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise RowError(line, '`title` is required.')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise RowError(
+            line, f'`title` is at most {TITLE_MAX_LENGTH} characters.'
+        )
+    if row.get('type') not in RECIPE_TYPES:
+        raise RowError(
+            line, f'`type` must be one of {", ".join(sorted(RECIPE_TYPES))}.'
+        )
+    instruction = row.get('cookingInstruction') or ''
+    if not isinstance(instruction, str):
+        raise RowError(line, '`cookingInstruction` must be a string.')
+    if len(instruction) > INSTRUCTION_MAX_LENGTH:
+        raise RowError(
+            line,
+            f'`cookingInstruction` is at most {INSTRUCTION_MAX_LENGTH} '
+            f'characters.'
+        )
+    return {
+        'user': row.get('user') or None,
+        'title': title,
+        'type': row['type'],
+        'cookingInstruction': instruction,
+        'tags': clean_names(line, 'tags', row.get('tags')),
+        'ingredients': clean_names(
+            line, 'ingredients', row.get('ingredients')
+        ),
+    }
+
+
+class RecipeImporter:
+    """
+    Write validated recipe rows to the database chunk by chunk.
+
+    Rows belong to `default_user` unless they name another user by email.
+    Name to id maps of every user's tags and ingredients are kept for the
+    whole run, so each name costs at most one lookup and one insert.
+    """
+    relation_fields = {'tags': Tag, 'ingredients': Ingredient}
+    # Stay below the bound parameter limit of SQLite
+    lookup_batch_size = 500
+
+    def __init__(self, default_user=None, chunk_size=1000,
+                 skip_invalid=False, progress=None):
+        self.default_user = default_user
+        self.chunk_size = chunk_size
+        self.skip_invalid = skip_invalid
+        self.progress = progress
+        self.user_ids = {}
+        self.name_ids = {
+            model: {} for model in self.relation_fields.values()
+        }
+        self.imported = 0
+        self.skipped = 0
+        self.started = None
+
+    def run(self, rows):
+        """Import (line, row) pairs and return the number of recipes written"""
+        self.started = time.monotonic()
+        rows = self._clean(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic(using=router.db_for_write(Recipe)):
+                self.write_chunk(chunk)
+            self.imported += len(chunk)
+            self.invalidate(chunk)
+            if self.progress is not None:
+                self.progress(self)
+        return self.imported
+
+    @property
+    def rate(self):
+        """Imported recipes per second so far"""
+        elapsed = time.monotonic() - self.started
+        return self.imported / elapsed if elapsed else 0.0
+
+    def _clean(self, rows):
+        for line, row in rows:
+            try:
+                row = clean_row(line, row)
+                row['user'] = self.resolve_user(line, row['user'])
+            except RowError:
+                if not self.skip_invalid:
+                    raise
+                self.skipped += 1
+                continue
+            yield row
+
+    def resolve_user(self, line, email):
+        """Return the id of the row's owner"""
+        if email is None:
+            if self.default_user is None:
+                raise RowError(line, 'No `user` given and no default.')
+            return self.default_user.pk
+        if email not in self.user_ids:
+            user_id = get_user_model().objects.filter(
+                email=email
+            ).values_list('id', flat=True).first()
+            if user_id is None:
+                raise RowError(line, f'Unknown user {email}.')
+            self.user_ids[email] = user_id
+        return self.user_ids[email]
+
+    def write_chunk(self, rows):
+        """Insert one chunk of rows with their names and relation rows"""
+        for field, model in self.relation_fields.items():
+            self.upsert_names(model, {
+                (row['user'], name) for row in rows for name in row[field]
+            })
+
+        recipes = [
+            Recipe(
+                user_id=row['user'],
+                title=row['title'],
+                type=row['type'],
+                cookingInstruction=row['cookingInstruction'],
+                **self.summarize(row)
+            )
+            for row in rows
+        ]
+        deltas = Counter()
+        if not self.insert_recipes(recipes):
+            # Otherwise the save signals counted them
+            deltas.update(counters.recipe_deltas(recipes))
+        ids = [recipe.pk for recipe in recipes]
+
+        for field, model in self.relation_fields.items():
+            through = getattr(Recipe, field).through
+            column = getattr(Recipe, field).field.m2m_reverse_field_name()
+            name_ids = self.name_ids[model]
+            through.objects.bulk_create([
+                through(**{
+                    'recipe_id': recipe_id,
+                    f'{column}_id': name_ids[row['user'], name],
+                })
+                for recipe_id, row in zip(ids, rows)
+                for name in row[field]
+            ], batch_size=self.chunk_size)
+            for row in rows:
+                deltas.update(counters.link_deltas(row['user'], field, [
+                    name_ids[row['user'], name] for name in row[field]
+                ]))
+        using = router.db_for_write(Recipe)
+        counters.add(deltas, using)
+        similarity.refresh(Recipe, ids, using)
+
+    def summarize(self, row):
+        """Return the denormalized name columns of a row's recipe"""
+        columns = {}
+        for field, model in self.relation_fields.items():
+            name_ids = self.name_ids[model]
+            columns.update(summary.summarize(field, [
+                (name_ids[row['user'], name], name) for name in row[field]
+            ]))
+        return columns
+
+    def upsert_names(self, model, keys):
+        """Make sure every (user id, name) pair exists and has a known id"""
+        known = self.name_ids[model]
+        missing = {}
+        for user_id, name in keys:
+            if (user_id, name) not in known:
+                missing.setdefault(user_id, set()).add(name)
+        for user_id, names in missing.items():
+            model.objects.bulk_create(
+                [model(user_id=user_id, name=name) for name in names],
+                batch_size=self.chunk_size,
+                ignore_conflicts=True
+            )
+            # Names may have existed already, so read every id back
+            names = list(names)
+            for start in range(0, len(names), self.lookup_batch_size):
+                for name, pk in model.objects.filter(
+                    user_id=user_id,
+                    name__in=names[start:start + self.lookup_batch_size]
+                ).values_list('name', 'id'):
+                    known[user_id, name] = pk
+
+    def insert_recipes(self, recipes):
+        """Bulk insert recipes, True when they were saved one by one"""
+        return bulk_insert(Recipe, recipes, batch_size=self.chunk_size)
+
+    def invalidate(self, rows):
+        """Drop the cached responses and match indexes of a chunk's users"""
+        for user_id in {row['user'] for row in rows}:
+            for model in (Tag, Ingredient, Recipe):
+                cache.bump_version(model, user_id)
+            matching.invalidate(user_id)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class RecipeBatchCommand(BaseCommand):
+    """
+    Base of commands recomputing derived data of every recipe.
+
+    Subclasses implement `run(user_id, progress)` returning the number of
+    recipes done, and set `done_message` formatted with it.
+    """
+    done_message = 'Recomputed {done} recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the only user whose recipes to recompute',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        user_id = None
+        if options['user']:
+            try:
+                user_id = get_user_model().objects.get(
+                    email=options['user']
+                ).pk
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Unknown user {options["user"]}.')
+
+        done = self.run(user_id, self.report_progress)
+        self.stdout.write(
+            self.style.SUCCESS(self.done_message.format(done=done))
+        )
+
+    def run(self, user_id, progress):
+        raise NotImplementedError
+
+    def report_progress(self, done):
+        """Print the running total after every batch"""
+        if self.verbosity >= 1:
+            self.stderr.write(f'{done} recipes')
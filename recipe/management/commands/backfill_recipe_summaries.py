@@ -0,0 +1,14 @@
+from core import summary
+from core.models import Recipe
+from recipe.management.base import RecipeBatchCommand
+
+
+class Command(RecipeBatchCommand):
+    help = (
+        'Recompute the denormalized tag and ingredient names of recipes '
+        'from their relation rows'
+    )
+    done_message = 'Backfilled {done} recipes.'
+
+    def run(self, user_id, progress):
+        return summary.backfill(Recipe, user_id=user_id, progress=progress)
@@ -0,0 +1,97 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    help = 'Stream recipes from an NDJSON or CSV file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help="File to import, '-' reads standard input",
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(importer.READERS),
+            help='Input format, guessed from the file extension by default',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the owner of rows without a `user` field',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Recipes written per transaction',
+        )
+        parser.add_argument(
+            '--separator',
+            default=';',
+            help='Separator of tag and ingredient names in CSV cells',
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Skip invalid rows instead of stopping at the first one',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Unknown user {options["user"]}.')
+
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        reader_kwargs = {}
+        if fmt == 'csv':
+            reader_kwargs['separator'] = options['separator']
+
+        recipe_importer = importer.RecipeImporter(
+            default_user=user,
+            chunk_size=options['chunk_size'],
+            skip_invalid=options['skip_invalid'],
+            progress=self.report_progress,
+        )
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8'
+        )
+        try:
+            recipe_importer.run(
+                importer.READERS[fmt](stream, **reader_kwargs)
+            )
+        except importer.RowError as exc:
+            raise CommandError(
+                f'{exc} {recipe_importer.imported} recipes were imported '
+                f'before the error.'
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {recipe_importer.imported} recipes '
+            f'({recipe_importer.rate:.0f}/s), '
+            f'skipped {recipe_importer.skipped} invalid rows.'
+        ))
+
+    def report_progress(self, recipe_importer):
+        """Print the running totals after every committed chunk"""
+        if self.verbosity >= 1:
+            self.stderr.write(
+                f'{recipe_importer.imported} recipes '
+                f'({recipe_importer.rate:.0f}/s)'
+            )
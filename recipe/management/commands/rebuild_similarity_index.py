@@ -0,0 +1,14 @@
+from core import similarity
+from core.models import Recipe
+from recipe.management.base import RecipeBatchCommand
+
+
+class Command(RecipeBatchCommand):
+    help = (
+        'Recompute the similarity buckets of recipes from their tag and '
+        'ingredient links'
+    )
+    done_message = 'Indexed {done} recipes.'
+
+    def run(self, user_id, progress):
+        return similarity.rebuild(Recipe, user_id=user_id, progress=progress)
@@ -0,0 +1,20 @@
+from django.db import transaction
+
+from core import counters
+from core.models import Recipe, RecipeCounter
+from recipe.management.base import RecipeBatchCommand
+
+
+class Command(RecipeBatchCommand):
+    help = (
+        'Recount the per user recipe counters read by the statistics, after '
+        'writes that bypass the ORM'
+    )
+    done_message = 'Counted {done} recipes.'
+
+    def run(self, user_id, progress):
+        # Aggregated in a few queries, readers never see emptied counters
+        with transaction.atomic():
+            done = counters.fill(Recipe, RecipeCounter, user_id=user_id)
+        progress(done)
+        return done
@@ -0,0 +1,196 @@
+"""
+In-process index answering "what can I cook with these ingredients".
+
+The index of a user maps every ingredient id to the sorted ids of the
+recipes using it (a posting list) and every recipe id to its ingredient
+ids. A match counts in how many of the given ingredients' posting lists
+each recipe appears and ranks recipes by the covered fraction of their
+ingredients, without touching the database.
+
+Indexes are built from the link rows on the first match and kept for the
+MATCH_INDEX_USERS most recently matched users. Writes report the recipes
+or ingredients they relinked, and once the transaction commits the
+writing process re-reads just those recipes into its own index and moves
+the user's index version in the shared cache. Any other process finds its
+copy older than that version on the next match and rebuilds it.
+"""
+import bisect
+import heapq
+import threading
+from collections import Counter, OrderedDict
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import Recipe
+from recipe import cache
+
+
+# Versions are kept with the API cache versions in `recipe.cache`
+VERSION_SCOPE = 'match-index'
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+class IngredientIndex:
+    """Posting lists of one user's recipes, keyed by ingredient id"""
+
+    def __init__(self, version, links=()):
+        """Build the index from (recipe id, ingredient id) pairs"""
+        self.version = version
+        self.postings = {}
+        self.recipes = {}
+        for recipe_id, ingredient_id in sorted(set(links)):
+            self.postings.setdefault(ingredient_id, []).append(recipe_id)
+            self.recipes.setdefault(recipe_id, set()).add(ingredient_id)
+
+    def replace(self, recipe_id, ingredient_ids):
+        """Set the ingredients of a recipe, none removes it"""
+        old = self.recipes.pop(recipe_id, set())
+        for ingredient_id in old - ingredient_ids:
+            posting = self.postings[ingredient_id]
+            del posting[bisect.bisect_left(posting, recipe_id)]
+            if not posting:
+                del self.postings[ingredient_id]
+        for ingredient_id in ingredient_ids - old:
+            bisect.insort(
+                self.postings.setdefault(ingredient_id, []), recipe_id
+            )
+        if ingredient_ids:
+            self.recipes[recipe_id] = set(ingredient_ids)
+
+    def recipes_using(self, ingredient_ids):
+        """Return the ids of recipes using any of the ingredients"""
+        return set(chain.from_iterable(
+            self.postings.get(ingredient_id, ())
+            for ingredient_id in ingredient_ids
+        ))
+
+    def match(self, ingredient_ids, limit):
+        """
+        Return the `limit` recipes best covered by the ingredients.
+
+        Results are (coverage, matched, recipe id) tuples, best first. Ties
+        on coverage go to the recipe using more of the ingredients, then to
+        the newest one.
+        """
+        matched = Counter(chain.from_iterable(
+            self.postings.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        return heapq.nlargest(limit, (
+            (count / len(self.recipes[recipe_id]), count, recipe_id)
+            for recipe_id, count in matched.items()
+        ))
+
+
+def current_version(user_id):
+    """Return the version the index of a user must have to be current"""
+    return cache.get_version(VERSION_SCOPE, user_id)
+
+
+def read_links(recipe_ids=None, user_id=None, using=None):
+    """Return {recipe id: ingredient ids} of some or all of a user's recipes"""
+    links = Recipe.ingredients.through.objects.using(
+        using or settings.DATABASE_PRIMARY
+    )
+    if recipe_ids is not None:
+        links = links.filter(recipe_id__in=recipe_ids)
+    else:
+        links = links.filter(recipe__user_id=user_id)
+    ingredients = {}
+    for recipe_id, ingredient_id in links.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+    return ingredients
+
+
+def get_index(user_id):
+    """Return the current index of a user, building it when needed"""
+    version = current_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(user_id)
+            return index
+
+    # Built from the primary, a lagging replica would leave it stale until
+    # the next write. The version is read first, so a write landing
+    # meanwhile outdates the new index instead of going missing from it.
+    links = read_links(user_id=user_id)
+    index = IngredientIndex(version, (
+        (recipe_id, ingredient_id)
+        for recipe_id, ingredient_ids in links.items()
+        for ingredient_id in ingredient_ids
+    ))
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.MATCH_INDEX_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def match(user_id, ingredient_ids, limit):
+    """Rank a user's recipes by the fraction the ingredients cover"""
+    index = get_index(user_id)
+    with _lock:
+        return index.match(ingredient_ids, limit)
+
+
+def recipes_changed(user_id, recipe_ids, using=None):
+    """Re-read the ingredients of recipes once the transaction commits"""
+    recipe_ids = set(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(
+            lambda: _update(user_id, recipe_ids, (), using), using=using
+        )
+
+
+def ingredients_changed(user_id, ingredient_ids, using=None):
+    """Re-read the recipes that used the ingredients once committed"""
+    ingredient_ids = set(ingredient_ids)
+    if ingredient_ids:
+        transaction.on_commit(
+            lambda: _update(user_id, set(), ingredient_ids, using),
+            using=using
+        )
+
+
+def invalidate(user_id):
+    """Make every process rebuild the index of a user on its next match"""
+    cache.bump_version(VERSION_SCOPE, user_id)
+
+
+def clear():
+    """Drop every index of this process"""
+    with _lock:
+        _indexes.clear()
+
+
+def _update(user_id, recipe_ids, ingredient_ids, using):
+    """Apply a committed change to the local index and move the version"""
+    previous, version = cache.bump_version(VERSION_SCOPE, user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            return
+        if index.version != previous:
+            # Another process changed the index too, rebuild on next use
+            del _indexes[user_id]
+            return
+        # The postings still list the recipes that used the ingredients
+        recipe_ids = recipe_ids | index.recipes_using(ingredient_ids)
+
+    links = read_links(recipe_ids, using=using)
+    with _lock:
+        if _indexes.get(user_id) is not index or (
+            index.version != previous
+        ):
+            return
+        for recipe_id in recipe_ids:
+            index.replace(recipe_id, links.get(recipe_id, set()))
+        index.version = version
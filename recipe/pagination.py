@@ -0,0 +1,143 @@
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that seeks on the full ordering tuple.
+
+    The cursor stores the ordering values of the boundary row, so every page
+    is fetched with a `WHERE (a, b) < (x, y)` style filter and costs the same
+    no matter how deep the client has paged. The last ordering field must be
+    unique for the seek to be exact. Views may page on annotations instead
+    by setting `pagination_ordering`.
+    """
+    ordering = ('id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        self.model = queryset.model
+        self.current_ordering = self.get_ordering(request, queryset, view)
+        ordering = self._get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._seek_filter(queryset.model, ordering, self.cursor)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=False,
+            position=self._get_position(self.page[-1]),
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=True,
+            position=self._get_position(self.page[0]),
+        ))
+
+    def get_ordering(self, request, queryset, view):
+        """Return the view's pagination ordering or the default one"""
+        return getattr(view, 'pagination_ordering', None) or self.ordering
+
+    def _get_ordering(self, reverse=False):
+        """Return the ordering, flipped when paging backwards"""
+        if not reverse:
+            return self.current_ordering
+        return tuple(
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.current_ordering
+        )
+
+    def _get_field(self, model, name):
+        """Return the model field behind an ordering name, if any"""
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _get_position(self, instance):
+        """Encode the ordering values of an instance as a cursor position"""
+        if isinstance(instance, dict):
+            # A `values()` row, rebuild just enough of an instance
+            row, instance = instance, self.model()
+            for name in self.current_ordering:
+                setattr(instance, name.lstrip('-'), row[name.lstrip('-')])
+        position = []
+        for name in self.current_ordering:
+            name = name.lstrip('-')
+            field = self._get_field(instance, name)
+            if field is None:
+                position.append(getattr(instance, name))
+            else:
+                position.append(field.value_to_string(instance))
+        return json.dumps(position)
+
+    def _seek_filter(self, model, ordering, cursor):
+        """Build the filter selecting rows strictly after the cursor"""
+        try:
+            position = json.loads(cursor.position)
+            fields = [name.lstrip('-') for name in ordering]
+            values = []
+            for name, value in zip(fields, position):
+                field = self._get_field(model, name)
+                if field is not None:
+                    value = field.to_python(value)
+                elif not isinstance(value, (int, float, str)):
+                    raise ValueError(value)
+                if value is None:
+                    # Never handed out, and no query value either
+                    raise ValueError(value)
+                values.append(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for index, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            clause = dict(zip(fields[:index], values[:index]))
+            clause[f'{fields[index]}__{lookup}'] = values[index]
+            condition |= Q(**clause)
+        return condition
+
+
+class RecipePagination(KeysetPagination):
+    """Paginate recipes newest first"""
+    ordering = ('-rcpCreatedOn', '-id')
@@ -0,0 +1,84 @@
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from core.fts import FTS_TABLE
+
+
+# bm25 weights of the title and cooking instruction columns
+TITLE_WEIGHT = 10.0
+INSTRUCTION_WEIGHT = 1.0
+MAX_TERMS = 10
+
+_fts_tables = {}
+
+
+def parse_terms(text):
+    """Split free text into at most MAX_TERMS unique search terms"""
+    terms = []
+    for term in re.findall(r'\w+', text.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def fts_available(alias):
+    """Return True when the database behind alias has the FTS5 index"""
+    if alias not in _fts_tables:
+        connection = connections[alias]
+        available = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                available = (
+                    FTS_TABLE in connection.introspection.table_names(cursor)
+                )
+        _fts_tables[alias] = available
+    return _fts_tables[alias]
+
+
+def search_recipes(queryset, terms, user_id=None):
+    """
+    Filter recipes matching every term as a word prefix and rank them.
+
+    The result is annotated with `search_rank`, lower is better. On SQLite
+    the FTS5 index answers the query and ranks with bm25; other databases
+    fall back to `icontains` scans with a constant rank.
+    """
+    if fts_available(queryset.db):
+        return fts_search(queryset, terms, user_id)
+    return icontains_search(queryset, terms)
+
+
+def fts_search(queryset, terms, user_id=None):
+    """Search through the FTS5 index, scoped to a user when given"""
+    match = '{title cookingInstruction} : (%s)' % ' AND '.join(
+        '"{}"*'.format(term) for term in terms
+    )
+    if user_id is not None:
+        match = f'user_id : "{int(user_id)}" AND {match}'
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            # The unary + keeps SQLite from driving the join from
+            # core_recipe and running one MATCH per recipe row
+            f'core_recipe.id = +{FTS_TABLE}.rowid',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+    ).annotate(search_rank=RawSQL(
+        f'bm25({FTS_TABLE}, 0.0, %s, %s)',
+        (TITLE_WEIGHT, INSTRUCTION_WEIGHT),
+        output_field=FloatField(),
+    ))
+
+
+def icontains_search(queryset, terms):
+    """Search by scanning title and instructions for every term"""
+    return queryset.filter(reduce(and_, (
+        Q(title__icontains=term) | Q(cookingInstruction__icontains=term)
+        for term in terms
+    ))).annotate(search_rank=Value(0.0, output_field=FloatField()))
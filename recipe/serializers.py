@@ -1,9 +1,172 @@
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Prefetch
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
+from core import summary
 from core.models import Tag, Ingredient, Recipe
+from recipe import cache
 
 
-class TagSerializer(serializers.ModelSerializer):
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    """Many related field that resolves every name in one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return self.child_relation.resolve_names(list(data))
+
+
+class BatchSlugRelatedField(serializers.SlugRelatedField):
+    """
+    Name field over the requesting user's tags or ingredients.
+
+    With `many=True` all names of a payload are looked up with a single
+    `name__in` query. Bulk writes can go further and resolve a whole batch
+    up front, passing the result as `resolved_names` ({model: {name: obj}})
+    in the serializer context. When `create_missing` is set, or the context
+    carries `create_missing_names`, unknown names resolve to unsaved
+    objects instead of failing validation, which `save_new_names()`
+    inserts once the write goes ahead.
+    """
+
+    def __init__(self, create_missing=False, **kwargs):
+        self.create_missing = create_missing
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Limit the names to the requesting user's objects"""
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+        return queryset
+
+    def to_internal_value(self, data):
+        return self.resolve_names([data])[0]
+
+    def resolve_names(self, names):
+        """Return the objects for a list of names, in the given order"""
+        model = self.queryset.model
+        max_length = model._meta.get_field('name').max_length
+        for name in names:
+            if not isinstance(name, str) or not 0 < len(name) <= max_length:
+                self.fail('invalid')
+
+        resolved = self.context.get('resolved_names', {}).get(model)
+        if resolved is not None:
+            found = {
+                name: resolved[name] for name in names if name in resolved
+            }
+        else:
+            found = {
+                obj.name: obj
+                for obj in self.get_queryset().filter(name__in=set(names))
+            }
+
+        missing = [name for name in dict.fromkeys(names) if name not in found]
+        if missing:
+            create = self.context.get(
+                'create_missing_names',
+                self.create_missing
+            )
+            if not create:
+                self.fail(
+                    'does_not_exist',
+                    slug_name=self.slug_field,
+                    value=smart_str(missing[0])
+                )
+            user = self.context['request'].user
+            # Shared through `resolved_names`, a batch makes one per name
+            created = {name: model(user=user, name=name) for name in missing}
+            found.update(created)
+            if resolved is not None:
+                resolved.update(created)
+
+        return [found[name] for name in names]
+
+
+def save_new_names(user, objs):
+    """
+    Insert the unsaved names among tag and ingredient objects and set ids.
+
+    Run inside the write's transaction, so a request failing validation
+    creates no names. Names another request created meanwhile get its id.
+    """
+    new = {}
+    for obj in objs:
+        if obj.pk is None:
+            new.setdefault(type(obj), {}).setdefault(obj.name, []).append(obj)
+    for model, named in new.items():
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in named],
+            ignore_conflicts=True
+        )
+        for name, pk in model.objects.filter(
+            user=user,
+            name__in=list(named)
+        ).values_list('name', 'id'):
+            for obj in named[name]:
+                obj.pk = pk
+                obj._state.adding = False
+        cache.bump_version(model, user.pk)
+
+
+class BaseRecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for user owned recipe attributes"""
+
+    @classmethod
+    def values_fields(cls):
+        """Return the columns the fast read path selects with `values()`"""
+        return cls.Meta.fields
+
+    @classmethod
+    def serialize_rows(cls, rows):
+        """Render `values()` rows exactly like the serializer would"""
+        return [{name: row[name] for name in cls.Meta.fields} for row in rows]
+
+    def validate_name(self, value):
+        """Reject names the requesting user already has"""
+        request = self.context.get('request')
+        if request is None:
+            return value
+        existing = self.context.get('existing_names')
+        if existing is not None:
+            # Bulk writes look every name of the batch up at once
+            taken = (
+                value in existing and
+                value != getattr(self.instance, 'name', None)
+            )
+        else:
+            queryset = self.Meta.model.objects.filter(
+                user=request.user,
+                name=value
+            )
+            if self.instance is not None:
+                queryset = queryset.exclude(pk=self.instance.pk)
+            taken = queryset.exists()
+        if taken:
+            raise serializers.ValidationError(
+                f'{self.Meta.model.__name__} with this name already exists.',
+                code='unique'
+            )
+        return value
+
+
+class TagSerializer(BaseRecipeAttrSerializer):
     """Serializer for Tag objects"""
 
     class Meta:
@@ -12,7 +175,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(BaseRecipeAttrSerializer):
     """Serializer for Ingredient objects"""
 
     class Meta:
@@ -23,12 +186,12 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for Recipe"""
-    ingredients = serializers.SlugRelatedField(
+    ingredients = BatchSlugRelatedField(
         many=True,
         slug_field='name',
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.SlugRelatedField(
+    tags = BatchSlugRelatedField(
         many=True,
         slug_field='name',
         queryset=Tag.objects.all()
@@ -43,6 +206,101 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
+    eager_fields = (
+        'id', 'title', 'type', 'rcpCreatedOn', 'cookingInstruction'
+    )
+
+    @staticmethod
+    def eager_prefetches():
+        """Return the lookups loading the rendered tag and ingredient names"""
+        return (
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id', 'name').order_by('id')
+            ),
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name').order_by('id')
+            ),
+        )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Fetch the related tags and ingredients in one query each"""
+        return queryset.only(*cls.eager_fields).prefetch_related(
+            *cls.eager_prefetches()
+        )
+
+    @classmethod
+    def values_fields(cls):
+        """Return the columns the fast read path selects with `values()`"""
+        if settings.RECIPE_LIST_FROM_SUMMARY:
+            return cls.eager_fields + tuple(
+                names for names, _ in summary.COLUMNS.values()
+            )
+        return cls.eager_fields
+
+    @classmethod
+    def serialize_rows(cls, rows):
+        """
+        Render `values()` rows exactly like the serializer would.
+
+        Tag and ingredient names come from the denormalized summary columns
+        with RECIPE_LIST_FROM_SUMMARY, otherwise they are read with one
+        query per relation. The creation date goes through the serializer's
+        own field, so DATETIME_FORMAT and the time zone are applied the
+        same way.
+        """
+        rows = list(rows)
+        names = {}
+        for field, (names_column, _) in summary.COLUMNS.items():
+            if settings.RECIPE_LIST_FROM_SUMMARY:
+                names[field] = {row['id']: row[names_column] for row in rows}
+            else:
+                names[field] = summary.collect(
+                    Recipe, [row['id'] for row in rows], field
+                )
+
+        created_on = cls().fields['rcpCreatedOn'].to_representation
+        data = []
+        for row in rows:
+            row = dict(
+                row,
+                ingredients=names['ingredients'][row['id']],
+                tags=names['tags'][row['id']],
+                rcpCreatedOn=created_on(row['rcpCreatedOn']),
+            )
+            data.append({name: row[name] for name in cls.Meta.fields})
+        return data
+
+    def create(self, validated_data):
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            self._save_new_names(validated_data)
+            with summary.ignore_changes(self._add_summary(validated_data)):
+                return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            self._save_new_names(validated_data)
+            with summary.ignore_changes(self._add_summary(validated_data)):
+                return super().update(instance, validated_data)
+
+    def _save_new_names(self, validated_data):
+        """Create the unknown names the client opted in to creating"""
+        save_new_names(self.context['request'].user, [
+            obj for field in summary.COLUMNS
+            for obj in validated_data.get(field, ())
+        ])
+
+    def _add_summary(self, validated_data):
+        """Add the summary columns of the relations being set to the data"""
+        fields = [field for field in summary.COLUMNS if field in validated_data]
+        for field in fields:
+            validated_data.update(summary.summarize(
+                field, [(obj.pk, obj.name) for obj in validated_data[field]]
+            ))
+        return fields
+
     # def create(self, validated_data):
     #     tags_data = validated_data.pop('tags')
     #     for tag in tags_data:
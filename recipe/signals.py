@@ -0,0 +1,212 @@
+from collections import Counter
+
+from django.db.models.signals import (
+    pre_save, post_save, post_delete, pre_delete, m2m_changed,
+)
+from django.dispatch import receiver
+
+from core import counters, similarity, summary
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache, matching
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_attr_lists(sender, instance, **kwargs):
+    """Drop cached tag and ingredient lists of the owning user"""
+    cache.bump_version(sender, instance.user_id)
+    # Recipes render tag and ingredient names
+    cache.bump_version(Recipe, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipes(sender, instance, **kwargs):
+    """Move the recipe change stamp of the owning user"""
+    cache.bump_version(Recipe, instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_relations(sender, instance, action, **kwargs):
+    """Move the recipe change stamp when tags or ingredients are relinked"""
+    if action.startswith('pre_'):
+        return
+    # Reverse changes start from a tag or ingredient, which shares the owner
+    cache.bump_version(Recipe, instance.user_id)
+
+
+RELATION_FIELDS = {
+    Recipe.tags.through: 'tags',
+    Recipe.ingredients.through: 'ingredients',
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_relinked_recipes(sender, instance, action, reverse, pk_set,
+                             using, **kwargs):
+    """Keep the names and similarity buckets of relinked recipes current"""
+    field = RELATION_FIELDS[sender]
+    if action in ('post_add', 'post_remove') and not pk_set:
+        return
+    if not reverse:
+        if action.startswith('post_'):
+            similarity.schedule(Recipe, [instance.pk], using)
+            if not summary.ignored(field):
+                summary.refresh(Recipe, [instance.pk], (field,), using)
+        return
+
+    # Relinked from the tag or ingredient side, pk_set holds recipe ids
+    if action == 'pre_clear':
+        instance._summary_recipe_ids = summary.linked_recipes(
+            Recipe, field, [instance.pk], using
+        )
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_summary_recipe_ids', ())
+        summary.refresh(Recipe, recipe_ids, (field,), using)
+        similarity.schedule(Recipe, recipe_ids, using)
+    elif action.startswith('post_'):
+        summary.refresh(Recipe, pk_set, (field,), using)
+        similarity.schedule(Recipe, pk_set, using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed_summaries(sender, instance, created, update_fields,
+                              using, **kwargs):
+    """Rewrite the names of recipes linked to a renamed tag or ingredient"""
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    field = RELATION_FIELDS[sender]
+    summary.refresh(
+        Recipe,
+        summary.linked_recipes(Recipe, field, [instance.pk], using),
+        (field,),
+        using
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_unlinked_recipes(sender, instance, using, **kwargs):
+    """Note the recipes a deleted tag or ingredient is unlinked from"""
+    instance._summary_recipe_ids = summary.linked_recipes(
+        Recipe, RELATION_FIELDS[sender], [instance.pk], using
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_unlinked_recipes(sender, instance, using, **kwargs):
+    """Drop a deleted tag or ingredient from its recipes' names and buckets"""
+    recipe_ids = instance.__dict__.pop('_summary_recipe_ids', ())
+    summary.refresh(Recipe, recipe_ids, (RELATION_FIELDS[sender],), using)
+    similarity.schedule(Recipe, recipe_ids, using)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_match_index(sender, instance, action, reverse, pk_set, using,
+                       **kwargs):
+    """Re-read relinked recipes into the ingredient match index"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        matching.recipes_changed(instance.user_id, [instance.pk], using)
+    elif action == 'post_clear':
+        matching.ingredients_changed(instance.user_id, [instance.pk], using)
+    else:
+        matching.recipes_changed(instance.user_id, pk_set, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, using, **kwargs):
+    """Drop a deleted recipe from the ingredient match index"""
+    matching.recipes_changed(instance.user_id, [instance.pk], using)
+
+
+@receiver(post_delete, sender=Ingredient)
+def unindex_deleted_ingredient(sender, instance, using, **kwargs):
+    """Drop a deleted ingredient from the recipes in the match index"""
+    matching.ingredients_changed(instance.user_id, [instance.pk], using)
+
+
+@receiver(pre_save, sender=Recipe)
+def read_counted_recipe(sender, instance, using, **kwargs):
+    """Make sure an updated recipe knows the values it was counted by"""
+    if instance.pk is not None and not instance._state.adding:
+        instance._counted = counters.counted_values(instance, using)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_counted_links(sender, instance, using, **kwargs):
+    """Note the counters of a deleted recipe, its links go without signals"""
+    instance._counted = counters.counted_values(instance, using)
+    instance._counted_links = {
+        field: counters.linked(Recipe, field, [instance.pk], using=using)
+        for field in counters.KINDS
+    }
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, using, **kwargs):
+    """Count a new recipe or move the counters of a changed one"""
+    if created:
+        deltas = counters.recipe_deltas([instance])
+        counters.remember(instance)
+    else:
+        deltas = counters.change_deltas([instance], using)
+    counters.add(deltas, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, using, **kwargs):
+    """Take a deleted recipe and its links off the counters"""
+    deltas = Counter()
+    deltas.subtract(counters.counted_keys(instance, using))
+    for field, related_ids in instance.__dict__.pop(
+        '_counted_links', {}
+    ).items():
+        deltas.update(counters.link_deltas(
+            instance.user_id, field, related_ids, -1
+        ))
+    counters.add(deltas, using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           using, **kwargs):
+    """Move the tag and ingredient counters of relinked recipes"""
+    field = RELATION_FIELDS[sender]
+    attr = f'_counted_{field}'
+    if action == 'post_add':
+        related_ids = [instance.pk] * len(pk_set) if reverse else pk_set
+        counters.add(counters.link_deltas(
+            instance.user_id, field, related_ids
+        ), using)
+    elif action in ('pre_remove', 'pre_clear'):
+        # pk_set may name rows that are not linked, count the links
+        recipe_ids, related_ids = [instance.pk], pk_set
+        if reverse:
+            recipe_ids, related_ids = pk_set, [instance.pk]
+        instance.__dict__[attr] = counters.linked(
+            Recipe, field, recipe_ids, related_ids, using
+        )
+    elif action in ('post_remove', 'post_clear'):
+        counters.add(counters.link_deltas(
+            instance.user_id, field, instance.__dict__.pop(attr, ()), -1
+        ), using)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def forget_deleted_counter(sender, instance, using, **kwargs):
+    """Drop the counter of a deleted tag or ingredient"""
+    counters.forget(
+        instance.user_id, RELATION_FIELDS[sender], instance.pk, using
+    )
@@ -0,0 +1,63 @@
+"""
+Per user recipe statistics.
+
+The numbers are read from the counters `core.counters` keeps in
+`core_recipecounter`, a handful of rows per user whatever the number of
+recipes.
+"""
+import datetime
+
+from core.models import Ingredient, Recipe, RecipeCounter, Tag
+
+
+# Relation -> (counter kind, related model)
+RELATIONS = {'tags': ('tag', Tag), 'ingredients': ('ingredient', Ingredient)}
+
+
+def recipe_stats(user):
+    """
+    Return the recipe statistics of a user.
+
+    `types` counts recipes per type, `tags` and `ingredients` list the
+    number of recipes using each of the user's tags and ingredients, most
+    used first, and `created_per_day` counts recipes per UTC creation day,
+    oldest first.
+    """
+    using = Recipe.objects.filter(user=user).db
+    counts = read_counters(user, using)
+
+    types = dict.fromkeys(
+        (value for value, _ in Recipe._meta.get_field('type').choices), 0
+    )
+    types.update(counts['type'])
+    stats = {'recipes': sum(types.values()), 'types': types}
+    for field, (kind, model) in RELATIONS.items():
+        usage = [
+            {'id': pk, 'name': name, 'recipes': counts[kind].get(pk, 0)}
+            for pk, name in model.objects.using(using).filter(
+                user=user
+            ).values_list('pk', 'name')
+        ]
+        stats[field] = sorted(
+            usage, key=lambda item: (-item['recipes'], item['id'])
+        )
+    stats['created_per_day'] = [
+        {'day': day.isoformat(), 'recipes': value}
+        for day, value in sorted(counts['day'].items())
+    ]
+    return stats
+
+
+def read_counters(user, using):
+    """Return {kind: {key: count}} from the materialized counters"""
+    counts = {'type': {}, 'day': {}, 'tag': {}, 'ingredient': {}}
+    for kind, key, value in RecipeCounter.objects.using(using).filter(
+        user=user,
+        value__gt=0
+    ).values_list('kind', 'key', 'value'):
+        if kind == 'day':
+            key = datetime.date.fromisoformat(key)
+        elif kind != 'type':
+            key = int(key)
+        counts[kind][key] = value
+    return counts
@@ -0,0 +1,183 @@
+import base64
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import credential_cache, token_cache
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+ASYNC_RECIPE_URL = reverse('recipe:async-recipe-list')
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+ASYNC_INGREDIENTS_URL = reverse('recipe:async-ingredient-list')
+
+
+def detail_url(name, recipe_id):
+    """Return a recipe detail URL"""
+    return reverse(f'recipe:{name}', args=[recipe_id])
+
+
+def basic_header(email, password):
+    """Return an HTTP Basic authorization header value"""
+    credentials = base64.b64encode(f'{email}:{password}'.encode()).decode()
+    return f'Basic {credentials}'
+
+
+# Async views read on pool threads, which only see committed rows
+class AsyncReadEndpointTests(TransactionTestCase):
+    """Test the async read endpoints behave like the sync ones"""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        credential_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                type='VEG',
+                cookingInstruction='Boil the rice',
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+    def _assert_same(self, sync_url, async_url, params=None):
+        expected = self.client.get(sync_url, params)
+        cache.clear()
+        res = self.client.get(async_url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Page links point back at the endpoint that was called
+        self.assertEqual(
+            res.content,
+            expected.content.replace(sync_url.encode(), async_url.encode())
+        )
+
+    def test_list_parity(self):
+        """Test async lists render the same bytes as the sync endpoints"""
+        self._assert_same(RECIPE_URL, ASYNC_RECIPE_URL)
+        self._assert_same(RECIPE_URL, ASYNC_RECIPE_URL, {'page_size': 2})
+        self._assert_same(TAGS_URL, ASYNC_TAGS_URL)
+        self._assert_same(INGREDIENTS_URL, ASYNC_INGREDIENTS_URL)
+
+    def test_detail_parity(self):
+        """Test the async detail renders the same bytes as the sync one"""
+        recipe = self.recipes[0]
+        self._assert_same(
+            detail_url('recipe-detail', recipe.id),
+            detail_url('async-recipe-detail', recipe.id)
+        )
+
+    def test_other_users_recipe_not_found(self):
+        """Test the async detail only serves the user's recipes"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpassword'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Hidden', type='VEG', cookingInstruction=''
+        )
+
+        res = self.client.get(detail_url('async-recipe-detail', recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_login_required(self):
+        """Test the async endpoints reject anonymous requests"""
+        self.client.credentials()
+
+        for url in (ASYNC_RECIPE_URL, ASYNC_TAGS_URL, ASYNC_INGREDIENTS_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_credentials(self):
+        """Test wrong credentials get the sync endpoints' error"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'wrong')
+        )
+        expected = self.client.get(RECIPE_URL)
+
+        res = self.client.get(ASYNC_RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.content, expected.content)
+
+    def test_invalid_credentials_checked_once(self):
+        """Test a wrong password runs the password hasher once"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'wrong')
+        )
+
+        with mock.patch.object(
+            get_user_model(), 'check_password',
+            autospec=True, return_value=False
+        ) as check_password:
+            res = self.client.get(ASYNC_RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(res.has_header('WWW-Authenticate'))
+        check_password.assert_called_once()
+
+    def test_basic_auth(self):
+        """Test the async endpoints accept basic authentication"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_header('test@test.com', 'testpassword')
+        )
+
+        res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Spicy')
+
+    def test_cached_token_skips_database_lookup(self):
+        """Test a cached token is authenticated on the event loop"""
+        self.client.get(ASYNC_TAGS_URL)
+
+        with mock.patch(
+            'core.authentication.run_db',
+            side_effect=AssertionError('token looked up again')
+        ):
+            res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_non_read_methods_not_allowed(self):
+        """Test the async endpoints are read only"""
+        res = self.client.post(ASYNC_TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_async_client(self):
+        """Test the endpoints serve requests through the ASGI handler"""
+        client = AsyncClient()
+
+        res = await client.get(ASYNC_RECIPE_URL, headers=[
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {self.token.key}'.encode()),
+        ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', res)
+        self.assertIn(b'Recipe 2', res.content)
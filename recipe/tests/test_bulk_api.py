@@ -0,0 +1,226 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk create and update endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating several tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Quick'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tags = Tag.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [item['id'] for item in res.data],
+            [tag.id for tag in tags]
+        )
+        self.assertEqual(
+            [tag.name for tag in tags],
+            ['Vegan', 'Dessert', 'Quick']
+        )
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported by position and nothing saved"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {'name': 'Pepper'},
+            {'name': ''},
+            {'name': 'Salt'},
+            {'name': 'Pepper'},
+        ]
+
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+        self.assertIn('name', res.data[3])
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_tags(self):
+        """Test renaming several tags in one request"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        other = Tag.objects.create(
+            user=get_user_model().objects.create_user('o@test.com', 'pass'),
+            name='Other'
+        )
+        payload = [
+            {'id': tag1.id, 'name': 'Plant based'},
+            {'id': tag2.id, 'name': 'Sweets'},
+        ]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        self.assertEqual(tag1.name, 'Plant based')
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': other.id, 'name': 'Mine'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes together with their relations"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        Ingredient.objects.create(user=self.user, name='Sugar')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'type': 'VEG',
+                'tags': ['Vegan', 'Dessert'],
+                'ingredients': ['Sugar'],
+            }
+            for i in range(10)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 10)
+        self.assertEqual(res.data[0]['tags'], ['Vegan', 'Dessert'])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 10)
+        self.assertEqual(
+            Recipe.tags.through.objects.filter(recipe__in=recipes).count(),
+            20
+        )
+
+    def test_bulk_create_recipes_in_one_insert(self):
+        """Test recipes are inserted together with the right ids"""
+        Recipe.objects.create(user=self.user, title='Existing', type='VEG')
+        saved = mock.Mock()
+        post_save.connect(saved, sender=Recipe)
+        self.addCleanup(post_save.disconnect, saved, sender=Recipe)
+        payload = [
+            {'title': f'Recipe {i}', 'type': 'VEG', 'tags': [],
+             'ingredients': []}
+            for i in range(5)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        saved.assert_not_called()
+        self.assertEqual(
+            [Recipe.objects.get(pk=item['id']).title for item in res.data],
+            [item['title'] for item in payload]
+        )
+
+    def test_bulk_create_recipes_unknown_name(self):
+        """Test a recipe naming a missing tag fails that item"""
+        payload = [
+            {'title': 'Good', 'type': 'VEG', 'tags': [], 'ingredients': []},
+            {'title': 'Bad', 'type': 'VEG', 'tags': ['Missing']},
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_invalid_batch_creates_no_names(self):
+        """Test names opted in to are only created when the batch is valid"""
+        payload = [
+            {'title': 'Good', 'type': 'VEG', 'tags': ['bulk1'],
+             'ingredients': []},
+            {'title': 'Bad', 'type': 'BAD', 'tags': ['bulk1', 'bulk2'],
+             'ingredients': []},
+        ]
+
+        res = self.client.post(
+            f'{RECIPE_BULK_URL}?create_missing=true', payload, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+        payload[1]['type'] = 'VEG'
+        res = self.client.post(
+            f'{RECIPE_BULK_URL}?create_missing=true', payload, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(res.data[1]['tags'], ['bulk1', 'bulk2'])
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields and replacing relations in one request"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        new_tag = Tag.objects.create(user=self.user, name='Quick')
+        recipe1 = Recipe.objects.create(user=self.user, title='A', type='VEG')
+        recipe2 = Recipe.objects.create(user=self.user, title='B', type='VEG')
+        recipe1.tags.add(tag)
+        recipe2.tags.add(tag)
+        payload = [
+            {'id': recipe1.id, 'title': 'A2'},
+            {'id': recipe2.id, 'tags': ['Quick']},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'A2')
+        self.assertEqual(list(recipe1.tags.all()), [tag])
+        self.assertEqual(list(recipe2.tags.all()), [new_tag])
+
+    def test_bulk_update_repeated_id(self):
+        """Test an update naming an object twice fails with its position"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(user=self.user, title='A', type='VEG')
+
+        for url, payload in (
+            (RECIPE_BULK_URL, [
+                {'id': recipe.id, 'tags': ['Vegan']},
+                {'id': recipe.id, 'tags': ['Vegan']},
+            ]),
+            (TAGS_BULK_URL, [
+                {'id': tag.id, 'name': 'Plant based'},
+                {'id': tag.id, 'name': 'Sweets'},
+            ]),
+        ):
+            res = self.client.patch(url, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data[0], {})
+            self.assertIn('item 0', res.data[1]['id'][0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_requires_list(self):
+        """Test the bulk endpoint rejects a single object"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'x'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
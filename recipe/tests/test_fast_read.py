@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.views import RecipeViewset, TagViewset, IngredientViewset
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastListParityTests(TestCase):
+    """Test the values() list path renders the same bytes as serializers"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Spicy', 'Dinner', 'Vegan "raw"')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Dal', 'Jeera')
+        ]
+        for i in range(7):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i} with rice',
+                type='VEG' if i % 2 else 'NON-VEG',
+                cookingInstruction='Boil the rice\nthen fry' * i,
+            )
+            recipe.tags.add(*reversed(tags[:i % 4]))
+            recipe.ingredients.add(*ingredients[i % 3:])
+
+    def _fetch_both(self, viewset, url, params=None):
+        """Return the response bodies of the fast and the regular path"""
+        bodies = []
+        for fast in (True, False):
+            cache.clear()
+            with mock.patch.object(viewset, 'fast_list', fast):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, 200)
+            bodies.append(res.content)
+        return bodies
+
+    def test_recipe_list_parity(self):
+        """Test recipe pages render identically, cursors included"""
+        fast, regular = self._fetch_both(
+            RecipeViewset, RECIPE_URL, {'page_size': 3}
+        )
+        self.assertEqual(fast, regular)
+        self.assertIn(b'"next":"http', fast)
+
+    def test_recipe_next_page_parity(self):
+        """Test following a fast path cursor gives the regular next page"""
+        with mock.patch.object(RecipeViewset, 'fast_list', True):
+            next_url = self.client.get(
+                RECIPE_URL, {'page_size': 3}
+            ).data['next']
+
+        fast, regular = self._fetch_both(RecipeViewset, next_url)
+
+        self.assertEqual(fast, regular)
+
+    def test_recipe_filtered_and_search_parity(self):
+        """Test filtered and ranked listings render identically"""
+        for params in (
+            {'tags': 'Spicy,Dinner', 'match': 'all'},
+            {'ingredients': 'Rice'},
+            {'q': 'rice', 'page_size': 2},
+        ):
+            fast, regular = self._fetch_both(RecipeViewset, RECIPE_URL, params)
+            self.assertEqual(fast, regular)
+
+    def test_tag_and_ingredient_list_parity(self):
+        """Test tag and ingredient pages render identically"""
+        for viewset, url in (
+            (TagViewset, TAGS_URL),
+            (IngredientViewset, INGREDIENTS_URL),
+        ):
+            fast, regular = self._fetch_both(viewset, url, {'page_size': 2})
+            self.assertEqual(fast, regular)
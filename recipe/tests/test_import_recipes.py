@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes management command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@test.com',
+            'testpassword'
+        )
+
+    def _write(self, content, suffix):
+        """Write content to a temporary file and return its path"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as dataset:
+            dataset.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def _ndjson(self, rows):
+        return self._write(
+            ''.join(json.dumps(row) + '\n' for row in rows), '.ndjson'
+        )
+
+    def _import(self, path, *args):
+        """Run the command and return its output"""
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_recipes', path, *args, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_ndjson(self):
+        """Test recipes, names and relation rows are created"""
+        Tag.objects.create(user=self.user, name='Spicy')
+        path = self._ndjson([
+            {
+                'title': f'Curry {i}',
+                'type': 'VEG',
+                'tags': ['Spicy', 'Dinner'],
+                'ingredients': ['Rice', ' Rice '],
+            }
+            for i in range(5)
+        ])
+
+        out, err = self._import(path, '--user', self.user.email,
+                                '--chunk-size', '2')
+
+        self.assertIn('Imported 5 recipes', out)
+        self.assertEqual(len(err.splitlines()), 3)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            [f'Curry {i}' for i in range(5)]
+        )
+        for recipe in recipes:
+            self.assertEqual(
+                sorted(recipe.tags.values_list('name', flat=True)),
+                ['Dinner', 'Spicy']
+            )
+            self.assertEqual(
+                list(recipe.ingredients.values_list('name', flat=True)),
+                ['Rice']
+            )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_import_csv_per_row_users(self):
+        """Test CSV rows can name their owner and keep names per user"""
+        path = self._write(
+            'user,title,type,cookingInstruction,tags,ingredients\n'
+            'test@test.com,Dal,VEG,Boil,Lunch;Quick,Lentil\n'
+            'other@test.com,Fish fry,NON-VEG,Fry,Lunch,Fish\n',
+            '.csv'
+        )
+
+        self._import(path)
+
+        dal = Recipe.objects.get(title='Dal')
+        fish = Recipe.objects.get(title='Fish fry')
+        self.assertEqual(dal.user, self.user)
+        self.assertEqual(fish.user, self.other)
+        self.assertEqual(dal.cookingInstruction, 'Boil')
+        self.assertEqual(
+            sorted(dal.tags.values_list('name', flat=True)),
+            ['Lunch', 'Quick']
+        )
+        self.assertEqual(fish.tags.get().user, self.other)
+
+    def test_invalid_row_stops_import(self):
+        """Test an invalid row aborts with its line number"""
+        path = self._ndjson([
+            {'title': 'Dal', 'type': 'VEG'},
+            {'title': 'Soup', 'type': 'SOUP'},
+        ])
+
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            self._import(path, '--user', self.user.email)
+
+    def test_skip_invalid_rows(self):
+        """Test invalid rows can be skipped"""
+        path = self._ndjson([
+            {'title': 'Dal', 'type': 'VEG'},
+            {'title': '', 'type': 'VEG'},
+            {'title': 'Soup', 'type': 'VEG', 'user': 'nobody@test.com'},
+        ])
+
+        out, _ = self._import(path, '--user', self.user.email,
+                              '--skip-invalid')
+
+        self.assertIn('skipped 2 invalid rows', out)
+        self.assertEqual(Recipe.objects.get().title, 'Dal')
@@ -0,0 +1,97 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def _collect(self, url, params, link='next'):
+        """Follow pagination links and return the ids of every page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in res.data['results']])
+            if not res.data[link]:
+                return pages
+            res = self.client.get(res.data[link])
+
+    def test_recipes_paginate_newest_first(self):
+        """Test recipes are paged by creation time including ties"""
+        created = timezone.now()
+        for i in range(7):
+            Recipe.objects.create(user=self.user, title=f'R{i}', type='VEG')
+        # Force identical timestamps so the id breaks the ties
+        Recipe.objects.filter(user=self.user).update(rcpCreatedOn=created)
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+
+        pages = self._collect(RECIPE_URL, {'page_size': 3})
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_link_walks_back(self):
+        """Test the previous link returns the preceding page"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNotNone(back.data['next'])
+
+    def test_tags_paginate_by_id(self):
+        """Test tags are paged in id order"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        expected = list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+        pages = self._collect(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        res = self.client.get(RECIPE_URL, {'cursor': 'cD1ub3Rqc29u'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_null_position(self):
+        """Test a cursor holding null values is rejected"""
+        cursor = base64.b64encode(
+            urlencode({'p': json.dumps([None, 1])}).encode()
+        ).decode()
+
+        res = self.client.get(RECIPE_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.tests.utils import constant_queries
+
+
+class AttrQueryCountTests:
+    """Query budget tests shared by the tag and ingredient endpoints"""
+    model = None
+    basename = None
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.target = self.model.objects.create(user=self.user, name='Target')
+        self.created = 0
+
+    def populate(self, size):
+        """Top the user's objects up to `size`"""
+        existing = self.model.objects.filter(user=self.user).count()
+        self.model.objects.bulk_create([
+            self.model(user=self.user, name=f'Name {index}')
+            for index in range(existing, size)
+        ])
+        # bulk_create skips the signals dropping the cached lists
+        cache.clear()
+
+    def next_name(self):
+        """Return a name the user does not have yet"""
+        self.created += 1
+        return f'New {self.created}'
+
+    @constant_queries('populate', budget=1)
+    def test_list(self):
+        """Test listing does not query per object"""
+        res = self.client.get(reverse(f'recipe:{self.basename}-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @constant_queries('populate', budget=1)
+    def test_retrieve(self):
+        """Test retrieving does not depend on the object count"""
+        res = self.client.get(reverse(
+            f'recipe:{self.basename}-detail', args=[self.target.id]
+        ))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @constant_queries('populate', budget=2)
+    def test_create(self):
+        """Test creating checks the name in constant queries"""
+        res = self.client.post(
+            reverse(f'recipe:{self.basename}-list'),
+            {'name': self.next_name()}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    # One more to find the recipes rendering the old name
+    @constant_queries('populate', budget=4)
+    def test_update(self):
+        """Test renaming checks the name in constant queries"""
+        res = self.client.patch(
+            reverse(f'recipe:{self.basename}-detail', args=[self.target.id]),
+            {'name': self.next_name()}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class TagQueryCountTests(AttrQueryCountTests, TestCase):
+    """Test the tag endpoints run a fixed number of queries"""
+    model = Tag
+    basename = 'tag'
+
+
+class IngredientQueryCountTests(AttrQueryCountTests, TestCase):
+    """Test the ingredient endpoints run a fixed number of queries"""
+    model = Ingredient
+    basename = 'ingredient'
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the recipe endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Target', type='VEG'
+        )
+
+    def populate_recipes(self, size):
+        """Top the user's recipes up to `size`, each with relations"""
+        tag = Tag.objects.get_or_create(user=self.user, name='Tag')[0]
+        ingredient = Ingredient.objects.get_or_create(
+            user=self.user, name='Ingredient'
+        )[0]
+        for index in range(Recipe.objects.count(), size):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}', type='VEG'
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def populate_names(self, size):
+        """Top the user's tags and ingredients up to `size` each"""
+        # Updates drop one name, keep one so the lookup still runs
+        size = max(size, 2)
+        for model in (Tag, Ingredient):
+            existing = model.objects.filter(user=self.user).count()
+            model.objects.bulk_create([
+                model(user=self.user, name=f'Name {index}')
+                for index in range(existing, size)
+            ])
+        self.tags = list(Tag.objects.values_list('name', flat=True))
+        self.ingredients = list(
+            Ingredient.objects.values_list('name', flat=True)
+        )
+        self.recipe.tags.set(Tag.objects.all())
+        self.recipe.ingredients.set(Ingredient.objects.all())
+
+    @constant_queries('populate_recipes', budget=1)
+    def test_list(self):
+        """Test listing loads relations in bulk"""
+        res = self.client.get(reverse('recipe:recipe-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    # The updated_at stamp of the validators, then the recipe and names
+    @constant_queries('populate_names', budget=4)
+    def test_retrieve(self):
+        """Test the detail loads any number of names in bulk"""
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    # Includes one counter upsert for the recipe and one per relation, and
+    # the savepoint of the write
+    @constant_queries('populate_names', budget=16)
+    def test_create(self):
+        """Test creating resolves any number of names in bulk"""
+        res = self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'New recipe',
+            'type': 'VEG',
+            'tags': self.tags,
+            'ingredients': self.ingredients,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    # Includes reading then uncounting the unlinked names per relation, and
+    # the savepoint of the write
+    @constant_queries('populate_names', budget=16)
+    def test_update(self):
+        """Test updating relinks any number of names in bulk"""
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]),
+            {'tags': self.tags[1:], 'ingredients': self.ingredients[1:]},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    # Counters, tag and ingredient names
+    @constant_queries('populate_recipes', budget=3)
+    def test_stats(self):
+        """Test the statistics are read without scanning recipes"""
+        res = self.client.get(reverse('recipe:recipe-stats'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -1,16 +1,26 @@
+import json
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import checks
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewset
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -82,7 +92,7 @@ class PrivateRecipeApiTest(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -97,11 +107,13 @@ class PrivateRecipeApiTest(TestCase):
 
         res = self.client.get(RECIPE_URL)
 
-        recipes = Recipe.objects.filter(user=self.user)
+        recipes = Recipe.objects.filter(
+            user=self.user
+        ).order_by('-rcpCreatedOn', '-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_details(self):
         """Test viewing a recipe detail"""
@@ -220,9 +232,9 @@ class PrivateRecipeApiTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_by_ingredient(self):
         """Test returning recipes with specific ingredients"""
@@ -242,6 +254,382 @@ class PrivateRecipeApiTest(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipe_no_duplicates(self):
+        """Test matching several tags and ingredients returns each once"""
+        recipe = sample_veg_recipe(user=self.user, title='Masala dosa')
+        tag1 = sample_tag(user=self.user, name='South Indian')
+        tag2 = sample_tag(user=self.user, name='Breakfast')
+        ingredient1 = sample_ingredient(user=self.user, name='Rice')
+        ingredient2 = sample_ingredient(user=self.user, name='Potato')
+        recipe.tags.add(tag1, tag2)
+        recipe.ingredients.add(ingredient1, ingredient2)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.name},{tag2.name}',
+            'ingredients': f'{ingredient1.name},{ingredient2.name}',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipe_match_all(self):
+        """Test match=all only returns recipes carrying every tag"""
+        recipe1 = sample_veg_recipe(user=self.user, title='Idli')
+        recipe2 = sample_veg_recipe(user=self.user, title='Upma')
+        tag1 = sample_tag(user=self.user, name='Steamed')
+        tag2 = sample_tag(user=self.user, name='Breakfast')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.name}, {tag2.name},{tag1.name}',
+            'match': 'all',
+        })
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipe_invalid_params(self):
+        """Test malformed filter params are rejected"""
+        res = self.client.get(RECIPE_URL, {'tags': 'Vegan', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'ingredients': ' , ,'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_recipe_ignores_other_users_names(self):
+        """Test names resolve against the requesting user's tags only"""
+        user2 = get_user_model().objects.create_user(
+            'testother@test.com',
+            'testotherpassword'
+        )
+        sample_tag(user=user2, name='Vegan')
+        payload = {'title': 'Salad', 'type': 'VEG', 'tags': ['Vegan']}
+
+        res = self.client.post(RECIPE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        tag = sample_tag(user=self.user, name='Vegan')
+        res = self.client.post(RECIPE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_create_recipe_resolves_names_in_one_query(self):
+        """Test validation cost does not grow with the number of names"""
+        names = [f'Ingredient {i}' for i in range(30)]
+        for name in names:
+            sample_ingredient(user=self.user, name=name)
+        payload = {
+            'title': 'Biryani',
+            'type': 'NON-VEG',
+            'tags': [],
+            'ingredients': names,
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        lookups = [
+            query for query in context.captured_queries
+            if '"core_ingredient"."name" IN' in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+
+    def test_create_recipe_creates_missing_names(self):
+        """Test unknown names are created when the client opts in"""
+        sample_tag(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Salad',
+            'type': 'VEG',
+            'tags': ['Vegan', 'Raw'],
+            'ingredients': ['Lettuce', 'Tomato'],
+        }
+
+        res = self.client.post(
+            f'{RECIPE_URL}?create_missing=true',
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tags'], ['Vegan', 'Raw'])
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            2
+        )
+
+    def test_invalid_recipe_creates_no_names(self):
+        """Test a recipe failing validation leaves no new names behind"""
+        payload = {
+            'title': 'Salad',
+            'type': 'BAD',
+            'tags': ['Raw'],
+            'ingredients': ['Lettuce'],
+        }
+
+        res = self.client.post(
+            f'{RECIPE_URL}?create_missing=true',
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+        self.assertFalse(Ingredient.objects.filter(user=self.user).exists())
+
+
+class RecipeQueryCountTest(TestCase):
+    """Test that recipe reads run a constant number of queries"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def _create_recipes(self, count):
+        """Create recipes that each carry a tag and an ingredient"""
+        for i in range(count):
+            recipe = sample_veg_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def _count_queries(self, url):
+        """Return the number of queries run while fetching the url"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query once per recipe"""
+        self._create_recipes(1)
+        baseline = self._count_queries(RECIPE_URL)
+
+        self._create_recipes(20)
+        self.assertEqual(self._count_queries(RECIPE_URL), baseline)
+        # Names come from the denormalized columns of the recipe page
+        self.assertEqual(baseline, 1)
+
+    def test_detail_query_count(self):
+        """Test the recipe detail loads its relations in bulk"""
+        recipe = sample_veg_recipe(user=self.user)
+        recipe.tags.add(self.tag, sample_tag(user=self.user, name='Spicy'))
+        recipe.ingredients.add(self.ingredient)
+
+        # The updated_at stamp of the validators, then the recipe and names
+        self.assertEqual(self._count_queries(detail_url(recipe.id)), 4)
+
+
+class RecipeConditionalGetTest(TestCase):
+    """Test ETag and Last-Modified handling of the recipe API"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_veg_recipe(user=self.user)
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match on the list returns 304"""
+        res = self.client.get(RECIPE_URL)
+        self.assertTrue(res['ETag'].startswith('W/"'))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_not_modified_since(self):
+        """Test a current If-Modified-Since on the detail returns 304"""
+        url = detail_url(self.recipe.id)
+        res = self.client.get(url)
+
+        res = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_invalidate_etag(self):
+        """Test recipe, relation and tag changes produce a new ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res['ETag']
+
+        tag.name = 'Dessert'
+        tag.save()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res['ETag']
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'New'})
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'New')
+
+    def test_detail_validators_from_updated_at(self):
+        """Test detail validators follow the row, not the cache"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        # Another process's cache never saw a change
+        cache.clear()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            title='Updated', updated_at=timezone.now()
+        )
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Updated')
+
+    def test_detail_renamed_tag_invalidates_etag(self):
+        """Test renaming a linked tag changes the recipe detail ETag"""
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag.name = 'Dessert'
+        tag.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Dessert')
+
+    def test_missing_detail_not_found(self):
+        """Test validators of another user's recipe do not leak it"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        recipe = sample_veg_recipe(user=other)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+    def test_malformed_detail_not_found(self):
+        """Test a detail url with a non numeric id returns 404"""
+        res = self.client.get(RECIPE_URL + 'abc/')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_process_local_cache_with_workers(self):
+        """Test several workers on a process local cache fail the checks"""
+        with self.settings(WEB_CONCURRENCY=4):
+            errors = checks.check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+    def test_updated_at_moves_on_save(self):
+        """Test the recipe records when it was last changed"""
+        updated_at = self.recipe.updated_at
+        self.recipe.title = 'Renamed'
+        self.recipe.save()
+
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+
+class RecipeExportTest(TestCase):
+    """Test streaming recipe exports"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def _create_recipes(self, count):
+        """Create recipes that each carry a tag and an ingredient"""
+        for i in range(count):
+            recipe = sample_veg_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def _export(self, **params):
+        """Fetch the export and return the response and its body"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, b''.join(res.streaming_content)
+
+    def test_export_ndjson(self):
+        """Test every recipe is streamed as one JSON line"""
+        self._create_recipes(3)
+        sample_veg_recipe(
+            user=get_user_model().objects.create_user('o@test.com', 'pass')
+        )
+
+        res, body = self._export()
+
+        recipes = Recipe.objects.filter(user=self.user).order_by(
+            '-rcpCreatedOn', '-id'
+        )
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line) for line in body.splitlines()],
+            json.loads(json.dumps(RecipeSerializer(recipes, many=True).data))
+        )
+
+    def test_export_json_array(self):
+        """Test the export can be streamed as one JSON array"""
+        self._create_recipes(3)
+
+        res, body = self._export(**{'as': 'json'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(len(json.loads(body)), 3)
+
+    def test_export_empty(self):
+        """Test an empty export is still valid JSON"""
+        res, body = self._export(**{'as': 'json'})
+
+        self.assertEqual(json.loads(body), [])
+
+    def test_export_applies_filters(self):
+        """Test the export honours the list filters"""
+        self._create_recipes(2)
+        sample_veg_recipe(user=self.user, title='Untagged')
+
+        res, body = self._export(tags=self.tag.name)
+
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_export_query_count_grows_per_batch(self):
+        """Test relations are loaded per batch rather than per recipe"""
+        self._create_recipes(5)
+
+        with mock.patch.object(RecipeViewset, 'export_chunk_size', 2):
+            with CaptureQueriesContext(connection) as context:
+                self._export()
+
+        # One recipe query plus a tag and an ingredient query per batch
+        self.assertEqual(len(context.captured_queries), 1 + 2 * 3)
+
+    def test_export_invalid_layout(self):
+        """Test an unknown export layout is rejected"""
+        res = self.client.get(EXPORT_URL, {'as': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
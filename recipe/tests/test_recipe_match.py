@@ -0,0 +1,212 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+from recipe import importer, matching
+
+
+MATCH_URL = reverse('recipe:recipe-match')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class IngredientIndexTests(SimpleTestCase):
+    """Test the posting lists of the match index"""
+
+    def test_build_and_replace(self):
+        """Test posting lists stay sorted through incremental changes"""
+        index = matching.IngredientIndex(1, [(3, 10), (1, 10), (2, 11)])
+        self.assertEqual(index.postings, {10: [1, 3], 11: [2]})
+
+        index.replace(2, {10, 12})
+        index.replace(3, set())
+
+        self.assertEqual(index.postings, {10: [1, 2], 12: [2]})
+        self.assertEqual(index.recipes, {1: {10}, 2: {10, 12}})
+
+    def test_match_ranks_by_coverage(self):
+        """Test full coverage beats more matches, ties go to the newest"""
+        index = matching.IngredientIndex(1, [
+            (1, 10), (1, 11), (1, 12),
+            (2, 10),
+            (3, 10), (3, 13),
+            (4, 10), (4, 11), (4, 14), (4, 15),
+        ])
+
+        ranked = index.match([10, 11], limit=3)
+
+        self.assertEqual(ranked, [(1.0, 1, 2), (2 / 3, 2, 1), (0.5, 2, 4)])
+
+
+class RecipeMatchApiTests(TransactionTestCase):
+    """Test the "what can I cook" endpoint and its index upkeep"""
+
+    def setUp(self):
+        cache.clear()
+        matching.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Dal', 'Salt', 'Paneer')
+        }
+
+    def tearDown(self):
+        matching.clear()
+
+    def create_recipe(self, title, *names):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, type='VEG', cookingInstruction=''
+        )
+        recipe.ingredients.add(*[self.ingredients[name] for name in names])
+        return recipe
+
+    def match(self, names, **params):
+        return self.client.get(MATCH_URL, {'ingredients': names, **params})
+
+    def titles(self, res):
+        return [recipe['title'] for recipe in res.data]
+
+    def test_ranked_by_coverage(self):
+        """Test recipes come best covered first with what they miss"""
+        self.create_recipe('Khichdi', 'Rice', 'Dal', 'Salt')
+        self.create_recipe('Plain rice', 'Rice')
+        self.create_recipe('Paneer', 'Paneer', 'Salt')
+
+        res = self.match('Rice,Dal,Butter')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ['Plain rice', 'Khichdi'])
+        khichdi = res.data[1]
+        self.assertEqual(khichdi['ingredients'], ['Rice', 'Dal', 'Salt'])
+        self.assertEqual(khichdi['matched'], 2)
+        self.assertAlmostEqual(khichdi['coverage'], 2 / 3)
+        self.assertEqual(khichdi['missing'], ['Salt'])
+
+    def test_limit(self):
+        """Test the number of results is capped and validated"""
+        for index in range(3):
+            self.create_recipe(f'Rice {index}', 'Rice')
+
+        res = self.match('Rice', limit=2)
+
+        self.assertEqual(self.titles(res), ['Rice 2', 'Rice 1'])
+        for limit in ('0', '101', 'many'):
+            res = self.match('Rice', limit=limit)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ingredients_required(self):
+        """Test matching needs at least one ingredient name"""
+        res = self.client.get(MATCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_ingredients(self):
+        """Test unknown names match nothing without building the index"""
+        self.create_recipe('Khichdi', 'Rice', 'Dal')
+
+        res = self.match('Butter')
+
+        self.assertEqual(res.data, [])
+        self.assertNotIn(self.user.pk, matching._indexes)
+
+    def test_other_users_recipes_hidden(self):
+        """Test only the user's own recipes are matched"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        rice = Ingredient.objects.create(user=other, name='Rice')
+        recipe = Recipe.objects.create(
+            user=other, title='Theirs', type='VEG', cookingInstruction=''
+        )
+        recipe.ingredients.add(rice)
+
+        res = self.match('Rice')
+
+        self.assertEqual(res.data, [])
+
+    def test_index_follows_changes(self):
+        """Test relinks and deletes update the built index in place"""
+        khichdi = self.create_recipe('Khichdi', 'Rice', 'Dal')
+        paneer = self.create_recipe('Paneer', 'Paneer')
+        self.assertEqual(self.titles(self.match('Rice')), ['Khichdi'])
+        index = matching.get_index(self.user.pk)
+
+        paneer.ingredients.add(self.ingredients['Rice'])
+        self.ingredients['Dal'].recipe_set.remove(khichdi)
+        self.assertEqual(
+            self.titles(self.match('Rice')), ['Khichdi', 'Paneer']
+        )
+
+        self.ingredients['Rice'].delete()
+        self.assertEqual(self.titles(self.match('Paneer')), ['Paneer'])
+        paneer.delete()
+        self.ingredients['Paneer'].recipe_set.clear()
+
+        self.assertEqual(self.match('Paneer').data, [])
+        self.assertIs(matching.get_index(self.user.pk), index)
+        self.assertEqual(index.postings, {})
+
+    def test_api_writes_update_index(self):
+        """Test single and bulk API writes reach the index"""
+        self.match('Rice')
+        self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'Posted',
+            'type': 'VEG',
+            'tags': [],
+            'ingredients': ['Rice'],
+            'cookingInstruction': '',
+        }, format='json')
+        res = self.client.post(RECIPE_BULK_URL, [{
+            'title': 'Bulk',
+            'type': 'VEG',
+            'tags': [],
+            'ingredients': ['Rice', 'Dal'],
+            'cookingInstruction': '',
+        }], format='json')
+        self.assertEqual(self.titles(self.match('Rice')), ['Posted', 'Bulk'])
+
+        self.client.patch(RECIPE_BULK_URL, [
+            {'id': res.data[0]['id'], 'ingredients': ['Rice']},
+        ], format='json')
+
+        self.assertEqual(self.titles(self.match('Rice')), ['Bulk', 'Posted'])
+
+    def test_other_process_rebuilds(self):
+        """Test a change made elsewhere outdates the local index"""
+        self.create_recipe('Khichdi', 'Rice', 'Dal')
+        index = matching.get_index(self.user.pk)
+
+        importer.RecipeImporter(default_user=self.user).run(
+            importer.read_ndjson(StringIO(json.dumps({
+                'title': 'Imported',
+                'type': 'VEG',
+                'ingredients': ['Rice'],
+            })))
+        )
+
+        self.assertEqual(
+            self.titles(self.match('Rice')), ['Imported', 'Khichdi']
+        )
+        self.assertIsNot(matching.get_index(self.user.pk), index)
+
+    def test_constant_queries(self):
+        """Test a warm match runs a fixed number of queries"""
+        for index in range(20):
+            self.create_recipe(f'Rice {index}', 'Rice', 'Dal')
+        self.match('Rice')
+
+        # Resolving the names and loading the ranked recipes
+        with self.assertNumQueries(2):
+            self.match('Rice,Dal')
@@ -0,0 +1,231 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import similarity
+from core.models import Ingredient, Recipe, SimilarityBucket, Tag
+from recipe import importer
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def similar_url(recipe_id):
+    """Return the similar recipes URL of a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class MinHashTests(SimpleTestCase):
+    """Test the signatures and buckets of tag and ingredient sets"""
+
+    def test_buckets_are_stable(self):
+        """Test equal sets share every bucket whatever their order"""
+        self.assertEqual(
+            similarity.buckets({1, 2, 3}), similarity.buckets({3, 1, 2})
+        )
+        self.assertEqual(len(similarity.buckets({1})), similarity.BANDS)
+        self.assertEqual(similarity.buckets(set()), [])
+
+    def test_signature_estimates_jaccard(self):
+        """Test matching signature values approximate the similarity"""
+        first = set(range(0, 100))
+        second = set(range(50, 150))
+
+        agree = sum(
+            a == b for a, b in zip(
+                similarity.signature(first), similarity.signature(second)
+            )
+        )
+
+        self.assertAlmostEqual(
+            agree / len(similarity.PERMUTATIONS),
+            similarity.jaccard(first, second),
+            delta=0.25
+        )
+
+
+class SimilarRecipesTests(TransactionTestCase):
+    """Test the similar recipes action and the upkeep of its buckets"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('Dinner', 'Spicy', 'Quick')
+        }
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Dal', 'Salt', 'Paneer', 'Sugar')
+        }
+
+    def create_recipe(self, title, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, type='VEG', cookingInstruction=''
+        )
+        recipe.tags.add(*[self.tags[name] for name in tags])
+        recipe.ingredients.add(
+            *[self.ingredients[name] for name in ingredients]
+        )
+        return recipe
+
+    def similar(self, recipe, **params):
+        return self.client.get(similar_url(recipe.id), params)
+
+    def titles(self, res):
+        return [recipe['title'] for recipe in res.data]
+
+    def test_ranked_by_similarity(self):
+        """Test neighbours come most similar first with their score"""
+        khichdi = self.create_recipe(
+            'Khichdi', ['Dinner'], ['Rice', 'Dal', 'Salt']
+        )
+        self.create_recipe('Twin', ['Dinner'], ['Rice', 'Dal', 'Salt'])
+        self.create_recipe('Dal', ['Dinner'], ['Dal', 'Salt'])
+        self.create_recipe('Kheer', [], ['Sugar'])
+
+        res = self.similar(khichdi)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res)[:2], ['Twin', 'Dal'])
+        self.assertNotIn('Kheer', self.titles(res))
+        self.assertEqual(res.data[0]['similarity'], 1.0)
+        self.assertEqual(res.data[1]['similarity'], 0.75)
+        self.assertEqual(res.data[0]['ingredients'], ['Rice', 'Dal', 'Salt'])
+
+    def test_limit(self):
+        """Test the number of neighbours is capped and validated"""
+        recipe = self.create_recipe('Rice', ingredients=['Rice'])
+        for index in range(3):
+            self.create_recipe(f'Rice {index}', ingredients=['Rice'])
+
+        res = self.similar(recipe, limit=2)
+
+        self.assertEqual(self.titles(res), ['Rice 2', 'Rice 1'])
+        res = self.similar(recipe, limit=0)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_recipe_not_found(self):
+        """Test only the user's own recipes can be compared"""
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Theirs', type='VEG', cookingInstruction=''
+        )
+
+        res = self.similar(recipe)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_buckets_follow_changes(self):
+        """Test relinks and deletes from either side refresh the buckets"""
+        khichdi = self.create_recipe('Khichdi', ['Dinner'])
+        paneer = self.create_recipe('Paneer')
+        self.assertEqual(self.similar(khichdi).data, [])
+
+        self.tags['Dinner'].recipe_set.add(paneer)
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Paneer'])
+
+        self.tags['Dinner'].delete()
+        khichdi.ingredients.add(self.ingredients['Rice'])
+        self.assertEqual(self.similar(khichdi).data, [])
+
+        self.ingredients['Rice'].recipe_set.add(paneer)
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Paneer'])
+
+        self.ingredients['Rice'].recipe_set.clear()
+        self.assertFalse(SimilarityBucket.objects.exists())
+        khichdi.tags.add(self.tags['Spicy'])
+        paneer.tags.add(self.tags['Spicy'])
+        paneer.delete()
+        self.assertEqual(
+            list(SimilarityBucket.objects.values_list(
+                'recipe', flat=True
+            ).distinct()),
+            [khichdi.id]
+        )
+
+    def test_api_writes_refresh_buckets(self):
+        """Test single and bulk API writes reach the buckets"""
+        khichdi = self.create_recipe('Khichdi', [], ['Rice', 'Dal'])
+        res = self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'Posted',
+            'type': 'VEG',
+            'tags': [],
+            'ingredients': ['Rice', 'Dal'],
+            'cookingInstruction': '',
+        }, format='json')
+        posted = res.data['id']
+        res = self.client.post(RECIPE_BULK_URL, [{
+            'title': 'Bulk',
+            'type': 'VEG',
+            'tags': [],
+            'ingredients': ['Sugar'],
+            'cookingInstruction': '',
+        }], format='json')
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Posted'])
+
+        self.client.patch(RECIPE_BULK_URL, [
+            {'id': res.data[0]['id'], 'ingredients': ['Rice', 'Dal']},
+            {'id': posted, 'ingredients': ['Sugar']},
+        ], format='json')
+
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Bulk'])
+
+    def test_importer(self):
+        """Test imported recipes get their buckets"""
+        khichdi = self.create_recipe('Khichdi', [], ['Rice', 'Dal'])
+
+        importer.RecipeImporter(default_user=self.user).run(
+            importer.read_ndjson(StringIO(json.dumps({
+                'title': 'Imported',
+                'type': 'VEG',
+                'ingredients': ['Rice', 'Dal'],
+            })))
+        )
+
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Imported'])
+
+    def test_rebuild_command(self):
+        """Test the command restores buckets removed behind its back"""
+        khichdi = self.create_recipe('Khichdi', [], ['Rice', 'Dal'])
+        self.create_recipe('Twin', [], ['Rice', 'Dal'])
+        SimilarityBucket.objects.all().delete()
+        out = StringIO()
+
+        call_command(
+            'rebuild_similarity_index', '--user', 'test@test.com',
+            stdout=out, stderr=StringIO()
+        )
+
+        self.assertIn('Indexed 2 recipes', out.getvalue())
+        self.assertEqual(self.titles(self.similar(khichdi)), ['Twin'])
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_similarity_index', '--user', 'nobody@test.com',
+                stdout=StringIO(), stderr=StringIO()
+            )
+
+    def test_constant_queries(self):
+        """Test finding neighbours runs a fixed number of queries"""
+        recipe = self.create_recipe('Khichdi', ['Dinner'], ['Rice', 'Dal'])
+        for index in range(20):
+            self.create_recipe(f'Rice {index}', ['Dinner'], ['Rice'])
+
+        # The recipe, its neighbours in the buckets and their rows
+        with self.assertNumQueries(3):
+            self.similar(recipe)
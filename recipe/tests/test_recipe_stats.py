@@ -0,0 +1,259 @@
+import datetime
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import counters
+from core.models import Ingredient, Recipe, RecipeCounter, Tag
+from recipe import bulk, importer, stats
+
+
+STATS_URL = reverse('recipe:recipe-stats')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeStatsApiTests(TestCase):
+    """Test the recipe statistics endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+
+    def create_recipe(self, title, type='VEG', tags=(), ingredients=(),
+                      created=None):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, type=type, cookingInstruction=''
+        )
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        if created is not None:
+            Recipe.objects.filter(pk=recipe.pk).update(rcpCreatedOn=created)
+            # Queryset updates skip the counters
+            counters.fill(Recipe, RecipeCounter, user_id=self.user.pk)
+        return recipe
+
+    def test_empty(self):
+        """Test a user without recipes gets zero counts for every name"""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'recipes': 0,
+            'types': {'VEG': 0, 'NON-VEG': 0},
+            'tags': [
+                {'id': self.spicy.id, 'name': 'Spicy', 'recipes': 0},
+                {'id': self.dinner.id, 'name': 'Dinner', 'recipes': 0},
+            ],
+            'ingredients': [
+                {'id': self.rice.id, 'name': 'Rice', 'recipes': 0},
+            ],
+            'created_per_day': [],
+        })
+
+    def test_counts(self):
+        """Test usage, type and per day counts of the user's recipes"""
+        self.create_recipe(
+            'Curry', 'VEG', [self.spicy, self.dinner], [self.rice],
+            created=datetime.datetime(2026, 1, 2, 23, tzinfo=timezone.utc)
+        )
+        self.create_recipe(
+            'Chicken', 'NON-VEG', [self.dinner],
+            created=datetime.datetime(2026, 1, 1, 8, tzinfo=timezone.utc)
+        )
+        self.create_recipe(
+            'Fish', 'NON-VEG', [self.dinner],
+            created=datetime.datetime(2026, 1, 2, 1, tzinfo=timezone.utc)
+        )
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        Recipe.objects.create(
+            user=other, title='Theirs', type='VEG', cookingInstruction=''
+        )
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipes'], 3)
+        self.assertEqual(res.data['types'], {'VEG': 1, 'NON-VEG': 2})
+        self.assertEqual(res.data['tags'], [
+            {'id': self.dinner.id, 'name': 'Dinner', 'recipes': 3},
+            {'id': self.spicy.id, 'name': 'Spicy', 'recipes': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': self.rice.id, 'name': 'Rice', 'recipes': 1},
+        ])
+        self.assertEqual(res.data['created_per_day'], [
+            {'day': '2026-01-01', 'recipes': 1},
+            {'day': '2026-01-02', 'recipes': 2},
+        ])
+
+
+class RecipeCounterTests(TestCase):
+    """Test the triggers keep the counters on every write path"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Spicy')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.dal = Ingredient.objects.create(user=self.user, name='Dal')
+
+    def assertCountersMatch(self):
+        """Assert the counters equal counting the recipes again"""
+        stored = {
+            (self.user.pk, kind, key): value
+            for kind, key, value in RecipeCounter.objects.filter(
+                user=self.user, value__gt=0
+            ).values_list('kind', 'key', 'value')
+        }
+        self.assertEqual(
+            stored, counters.aggregate(Recipe, 'default', self.user.pk)
+        )
+
+    def test_api_writes(self):
+        """Test create, update and delete through the API"""
+        res = self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'Curry',
+            'type': 'VEG',
+            'tags': ['Spicy'],
+            'ingredients': ['Rice', 'Dal'],
+            'cookingInstruction': '',
+        }, format='json')
+        self.assertCountersMatch()
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[res.data['id']]),
+            {'type': 'NON-VEG', 'ingredients': ['Dal']},
+            format='json'
+        )
+        self.assertCountersMatch()
+        self.assertEqual(
+            stats.read_counters(self.user, 'default')['type'], {'NON-VEG': 1}
+        )
+
+        self.client.delete(
+            reverse('recipe:recipe-detail', args=[res.data['id']])
+        )
+        self.assertCountersMatch()
+        self.assertEqual(stats.read_counters(self.user, 'default')['tag'], {})
+
+    def test_bulk_api(self):
+        """Test bulk creates and updates, which send no signals"""
+        res = self.client.post(RECIPE_BULK_URL, [{
+            'title': f'Recipe {index}',
+            'type': 'VEG',
+            'tags': ['Spicy'],
+            'ingredients': ['Rice'],
+            'cookingInstruction': '',
+        } for index in range(3)], format='json')
+        self.client.patch(RECIPE_BULK_URL, [
+            {'id': res.data[0]['id'], 'type': 'NON-VEG', 'tags': []},
+            {'id': res.data[1]['id'], 'ingredients': ['Rice', 'Dal']},
+        ], format='json')
+
+        self.assertCountersMatch()
+
+    def test_saved_one_by_one(self):
+        """Test recipes saved with signals by the bulk paths count once"""
+        with mock.patch.object(bulk, 'saves_one_by_one', return_value=True):
+            self.client.post(RECIPE_BULK_URL, [{
+                'title': 'Bulk',
+                'type': 'VEG',
+                'tags': ['Spicy'],
+                'ingredients': [],
+                'cookingInstruction': '',
+            }], format='json')
+            importer.RecipeImporter(default_user=self.user).run(
+                importer.read_ndjson(StringIO(json.dumps({
+                    'title': 'Imported',
+                    'type': 'VEG',
+                    'tags': ['Spicy'],
+                    'ingredients': [],
+                })))
+            )
+
+        self.assertCountersMatch()
+        self.assertEqual(
+            stats.read_counters(self.user, 'default')['type'], {'VEG': 2}
+        )
+
+    def test_relinks_and_deletes(self):
+        """Test reverse relinks and cascading deletes"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', type='VEG', cookingInstruction=''
+        )
+        self.rice.recipe_set.add(recipe)
+        self.dal.recipe_set.add(recipe)
+        self.tag.recipe_set.add(recipe)
+        self.rice.recipe_set.clear()
+        self.assertCountersMatch()
+
+        dal_id = self.dal.id
+        self.dal.delete()
+        self.assertFalse(RecipeCounter.objects.filter(
+            kind='ingredient', key=str(dal_id)
+        ).exists())
+        self.assertCountersMatch()
+
+        self.user.delete()
+        self.assertFalse(RecipeCounter.objects.exists())
+
+    def test_importer(self):
+        """Test imported recipes are counted"""
+        importer.RecipeImporter(default_user=self.user).run(
+            importer.read_ndjson(StringIO('\n'.join(json.dumps({
+                'title': f'Imported {index}',
+                'type': 'VEG',
+                'tags': ['Spicy', 'New'],
+                'ingredients': ['Rice'],
+            }) for index in range(3))))
+        )
+
+        self.assertCountersMatch()
+        self.assertEqual(
+            stats.read_counters(self.user, 'default')['tag'][self.tag.id], 3
+        )
+
+    def test_recount_command(self):
+        """Test the command repairs counters changed behind the ORM"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', type='VEG', cookingInstruction=''
+        )
+        recipe.ingredients.add(self.rice)
+        Recipe.objects.filter(pk=recipe.pk).update(type='NON-VEG')
+        RecipeCounter.objects.filter(kind='ingredient').delete()
+        out = StringIO()
+
+        call_command(
+            'recount_recipe_counters', '--user', 'test@test.com',
+            stdout=out, stderr=StringIO()
+        )
+
+        self.assertIn('Counted 1 recipes', out.getvalue())
+        self.assertCountersMatch()
+        self.assertEqual(
+            stats.read_counters(self.user, 'default')['type'], {'NON-VEG': 1}
+        )
@@ -0,0 +1,182 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import importer
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def detail_url(name, pk):
+    return reverse(f'recipe:{name}-detail', args=[pk])
+
+
+class RecipeSummaryTests(TestCase):
+    """Test the denormalized names follow every write path"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.dal = Ingredient.objects.create(user=self.user, name='Dal')
+
+    def _recipe(self, title='Curry'):
+        return Recipe.objects.create(
+            user=self.user, title=title, type='VEG', cookingInstruction=''
+        )
+
+    def assertSummary(self, recipe, tags, ingredients):
+        """Assert the stored names and counts of a recipe"""
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_names, tags)
+        self.assertEqual(recipe.tag_count, len(tags))
+        self.assertEqual(recipe.ingredient_names, ingredients)
+        self.assertEqual(recipe.ingredient_count, len(ingredients))
+
+    def test_create_and_update_through_api(self):
+        """Test the serializer writes the names in id order"""
+        res = self.client.post(RECIPE_URL, {
+            'title': 'Curry',
+            'type': 'VEG',
+            'tags': ['Dinner', 'Spicy'],
+            'ingredients': ['Dal'],
+            'cookingInstruction': '',
+        }, format='json')
+        recipe = Recipe.objects.get(pk=res.data['id'])
+        self.assertSummary(recipe, ['Spicy', 'Dinner'], ['Dal'])
+
+        self.client.patch(
+            detail_url('recipe', recipe.id), {'tags': ['Dinner']},
+            format='json'
+        )
+
+        self.assertSummary(recipe, ['Dinner'], ['Dal'])
+
+    def test_relinking_from_either_side(self):
+        """Test m2m changes on recipes, tags and ingredients refresh"""
+        recipe = self._recipe()
+        recipe.tags.add(self.dinner, self.spicy)
+        recipe.ingredients.add(self.rice)
+        self.assertSummary(recipe, ['Spicy', 'Dinner'], ['Rice'])
+
+        self.dal.recipe_set.add(recipe)
+        self.spicy.recipe_set.remove(recipe)
+        self.assertSummary(recipe, ['Dinner'], ['Rice', 'Dal'])
+
+        self.rice.recipe_set.clear()
+        recipe.tags.clear()
+        self.assertSummary(recipe, [], ['Dal'])
+
+    def test_rename_and_delete(self):
+        """Test renamed and deleted names are rewritten in recipes"""
+        recipe = self._recipe()
+        recipe.tags.add(self.spicy, self.dinner)
+
+        self.client.patch(
+            detail_url('tag', self.spicy.id), {'name': 'Hot'}, format='json'
+        )
+        self.assertSummary(recipe, ['Hot', 'Dinner'], [])
+
+        self.dinner.delete()
+        self.assertSummary(recipe, ['Hot'], [])
+
+    def test_bulk_api(self):
+        """Test the bulk endpoints write the names without signals"""
+        res = self.client.post(RECIPE_BULK_URL, [{
+            'title': 'Curry',
+            'type': 'VEG',
+            'tags': ['Dinner', 'Spicy'],
+            'ingredients': ['Rice'],
+            'cookingInstruction': '',
+        }], format='json')
+        recipe = Recipe.objects.get(pk=res.data[0]['id'])
+        self.assertSummary(recipe, ['Spicy', 'Dinner'], ['Rice'])
+
+        self.client.patch(RECIPE_BULK_URL, [
+            {'id': recipe.id, 'ingredients': ['Dal', 'Rice']},
+        ], format='json')
+        self.assertSummary(recipe, ['Spicy', 'Dinner'], ['Rice', 'Dal'])
+
+        res = self.client.patch(TAGS_BULK_URL, [
+            {'id': self.dinner.id, 'name': 'Supper'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertSummary(recipe, ['Spicy', 'Supper'], ['Rice', 'Dal'])
+
+    def test_importer(self):
+        """Test imported recipes carry their names"""
+        importer.RecipeImporter(default_user=self.user).run(
+            importer.read_ndjson(StringIO(json.dumps({
+                'title': 'Imported',
+                'type': 'VEG',
+                'tags': ['New', 'Dinner'],
+                'ingredients': ['Rice'],
+            })))
+        )
+
+        recipe = Recipe.objects.get(title='Imported')
+        self.assertSummary(recipe, ['Dinner', 'New'], ['Rice'])
+
+    def test_backfill_command(self):
+        """Test the command repairs names written around the signals"""
+        recipe = self._recipe()
+        recipe.tags.add(self.spicy)
+        Recipe.tags.through.objects.create(recipe=recipe, tag=self.dinner)
+        other = get_user_model().objects.create_user(
+            'other@test.com', 'testpassword'
+        )
+        untouched = Recipe.objects.create(
+            user=other, title='Other', type='VEG', cookingInstruction='',
+            tag_names=['Stale'], tag_count=1
+        )
+        out = StringIO()
+
+        call_command(
+            'backfill_recipe_summaries', '--user', 'test@test.com',
+            stdout=out, stderr=StringIO()
+        )
+
+        self.assertIn('Backfilled 1 recipes', out.getvalue())
+        self.assertSummary(recipe, ['Spicy', 'Dinner'], [])
+        self.assertSummary(untouched, ['Stale'], [])
+
+    def test_backfill_unknown_user(self):
+        """Test the command rejects an unknown user"""
+        with self.assertRaises(CommandError):
+            call_command(
+                'backfill_recipe_summaries', '--user', 'nobody@test.com',
+                stdout=StringIO(), stderr=StringIO()
+            )
+
+    def test_list_modes_match(self):
+        """Test lists render the same from the summary and the joins"""
+        for index in range(3):
+            recipe = self._recipe(f'Recipe {index}')
+            recipe.tags.add(self.dinner, self.spicy)
+            recipe.ingredients.add(*[self.rice, self.dal][index:])
+
+        summarized = self.client.get(RECIPE_URL)
+        cache.clear()
+        with override_settings(RECIPE_LIST_FROM_SUMMARY=False):
+            joined = self.client.get(RECIPE_URL)
+
+        self.assertEqual(summarized.content, joined.content)
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import search
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test free text search over recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword'
+        )
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def _create(self, title, instructions='', user=None):
+        return Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            type='VEG',
+            cookingInstruction=instructions
+        )
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_search_ranks_title_matches_first(self):
+        """Test title hits outrank instruction hits"""
+        in_text = self._create('Veg pulao', 'Add paneer cubes and rice')
+        in_title = self._create('Paneer tikka', 'Grill on skewers')
+        self._create('Dal fry', 'Boil lentils')
+
+        res = self._search('paneer')
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [in_title.id, in_text.id])
+
+    def test_search_prefix_and_all_terms(self):
+        """Test terms match word prefixes and must all be present"""
+        match = self._create('Masala dosa', 'Spread the potato filling')
+        self._create('Plain dosa', 'Spread thin')
+
+        res = self._search('dos pota')
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [match.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched"""
+        other = get_user_model().objects.create_user('o@test.com', 'pass')
+        self._create('Chole bhature', user=other)
+
+        res = self._search('chole')
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_index_follows_updates(self):
+        """Test edited and deleted recipes are reindexed"""
+        recipe = self._create('Upma')
+        recipe.title = 'Poha'
+        recipe.save()
+
+        self.assertEqual(self._search('upma').data['results'], [])
+        self.assertEqual(len(self._search('poha').data['results']), 1)
+
+        recipe.delete()
+        self.assertEqual(self._search('poha').data['results'], [])
+
+    def test_search_pages_by_rank(self):
+        """Test paging through ranked results visits every match once"""
+        for i in range(5):
+            self._create(f'Khichdi {i}', 'khichdi ' * i)
+
+        res = self._search('khichdi', page_size=2)
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_search_requires_a_word(self):
+        """Test a query without words is rejected"""
+        res = self.client.get(RECIPE_URL, {'q': '"*"'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_icontains_fallback_matches(self):
+        """Test the scan fallback finds the same recipes"""
+        match = self._create('Paneer tikka')
+        self._create('Dal fry')
+
+        queryset = search.icontains_search(
+            Recipe.objects.filter(user=self.user),
+            ['paneer']
+        )
+
+        self.assertEqual(list(queryset), [match])
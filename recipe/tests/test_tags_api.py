@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -34,6 +35,7 @@ class PrivateTagsApiTests(TestCase):
             'test@test.com',
             'testpassword'
         )
+        cache.clear()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -47,7 +49,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data,  serializer.data)
+        self.assertEqual(res.data['results'],  serializer.data)
 
     def test_tags_limited_to_user_self(self):
         """Test that the tags returned are authenticated user"""
@@ -61,8 +63,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -84,6 +86,42 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_name(self):
+        """Test creating a tag with a name the user already has fails"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_tag_list_is_cached(self):
+        """Test repeated tag lists are served without querying"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(second.data, first.data)
+
+    def test_tag_list_cache_invalidated(self):
+        """Test tag writes through the API or the ORM refresh the list"""
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+        Tag.objects.create(user=self.user, name='Desert')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        Tag.objects.filter(user=self.user, name='Vegan').delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Desert']
+        )
+
     # def test_retrieve_tags_assigned_to_recipes(self):
     #     """Test filtering tags by those assigned to recipes"""
     #     tag1 = Tag.objects.create(user=self.user, name='breakfast')
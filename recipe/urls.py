@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 
 router = DefaultRouter()
@@ -12,5 +12,22 @@ router.register('recipe', views.RecipeViewset)
 app_name = 'recipe'
 
 urlpatterns = [
-    path('', include(router.urls))
-]
\ No newline at end of file
+    path('', include(router.urls)),
+    # Async variants of the read endpoints for ASGI deployments
+    path(
+        'async/recipe/',
+        async_views.recipe_list,
+        name='async-recipe-list'
+    ),
+    path(
+        'async/recipe/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipe-detail'
+    ),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path(
+        'async/ingredient/',
+        async_views.ingredient_list,
+        name='async-ingredient-list'
+    ),
+]
@@ -1,21 +1,47 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication, BasicAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from recipe import serializers
+from core import counters, similarity, summary
+from core.authentication import (
+    CachedBasicAuthentication, CachedTokenAuthentication,
+)
+from core.instrumentation import timed
+from recipe import cache, export, matching, search, serializers, stats
+from recipe.bulk import BulkModelMixin, bulk_insert
+from recipe.conditional import ConditionalGetMixin
+from recipe.fastread import FastListMixin
+from recipe.pagination import KeysetPagination, RecipePagination
+from recipe.serializers import save_new_names
 
 from core.models import Tag, Ingredient, Recipe
 
 
 class BaseRecipeAttrViewset(
+    BulkModelMixin,
+    FastListMixin,
     # viewsets.GenericViewSet,
     # mixins.ListModelMixin,
     # mixins.CreateModelMixin,
     viewsets.ModelViewSet
 ):
     """Base viewset for user owned recipe attribute"""
-    authentication_classes = (BasicAuthentication, TokenAuthentication, )
+    authentication_classes = (
+        CachedBasicAuthentication, CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    list_cache_timeout = settings.RECIPE_ATTR_CACHE_TIMEOUT
+    # Recipe relation rendering the names of this model
+    recipe_field = None
 
     """
     Uncomment the following lines if you wish to want the user to be able to see tags and ingredients
@@ -26,58 +52,513 @@ class BaseRecipeAttrViewset(
         # return self.queryset.filter(user=self.request.user).order_by('-name')
         return self.queryset.filter(user=self.request.user).order_by('id')
 
+    def list(self, request, *args, **kwargs):
+        """List the user's objects, served from cache when unchanged"""
+        key = cache.list_key(self.queryset.model, request)
+        data = cache.get_cache().get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.get_cache().set(key, response.data, self.list_cache_timeout)
+        return response
+
     def perform_create(self, serializer):
         """Create a new recipe object"""
         serializer.save(user=self.request.user)
+        self._invalidate_list()
+
+    def perform_update(self, serializer):
+        """Update an object and drop the cached lists"""
+        serializer.save()
+        self._invalidate_list()
+
+    def perform_destroy(self, instance):
+        """Delete an object and drop the cached lists"""
+        instance.delete()
+        self._invalidate_list()
+
+    def get_bulk_context(self, items):
+        """Look up which of the batch's names the user already has"""
+        context = super().get_bulk_context(items)
+        names = [
+            item['name'].strip() for item in items
+            if isinstance(item, dict) and isinstance(item.get('name'), str)
+        ]
+        context['existing_names'] = set(
+            self.get_queryset().filter(name__in=names).values_list(
+                'name', flat=True
+            )
+        )
+        return context
+
+    def check_bulk_items(self, serializers, errors):
+        """Reject names repeated within the batch"""
+        seen = set()
+        for serializer, error in zip(serializers, errors):
+            if serializer is None or error:
+                continue
+            name = serializer.validated_data.get('name')
+            if name in seen:
+                error['name'] = ['Name is repeated in this batch.']
+            seen.add(name)
+
+    def perform_bulk_create(self, serializers):
+        """Insert the batch with one statement"""
+        model = self.queryset.model
+        objs = model.objects.bulk_create([
+            model(user=self.request.user, **serializer.validated_data)
+            for serializer in serializers
+        ])
+        if objs and objs[0].pk is None:
+            # The backend cannot return ids from a bulk insert, names are
+            # unique per user so fetch them back in one query instead
+            ids = dict(
+                self.get_queryset().filter(
+                    name__in=[obj.name for obj in objs]
+                ).values_list('name', 'id')
+            )
+            for obj in objs:
+                obj.pk = ids[obj.name]
+        return objs
+
+    def perform_bulk_update(self, serializers):
+        """Write the changed fields of the batch with one statement"""
+        fields = set()
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+            fields.update(serializer.validated_data)
+        objs = [serializer.instance for serializer in serializers]
+        if fields:
+            self.queryset.model.objects.bulk_update(objs, sorted(fields))
+        if 'name' in fields:
+            # bulk_update sends no signals, rename in the recipes here
+            using = router.db_for_write(Recipe)
+            summary.refresh(
+                Recipe,
+                summary.linked_recipes(
+                    Recipe, self.recipe_field, [obj.pk for obj in objs], using
+                ),
+                (self.recipe_field,),
+                using
+            )
+        return objs
+
+    def invalidate_bulk(self):
+        """Drop the cached lists and recipes that render these names"""
+        self._invalidate_list()
+        cache.bump_version(Recipe, self.request.user.pk)
+
+    def _invalidate_list(self):
+        """Drop the cached lists of the requesting user"""
+        cache.bump_version(self.queryset.model, self.request.user.pk)
 
 
 class TagViewset(BaseRecipeAttrViewset):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewset(BaseRecipeAttrViewset):
     """Manage Ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewset(viewsets.ModelViewSet):
+class RecipeViewset(
+    BulkModelMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    viewsets.ModelViewSet
+):
     """Manage Recipes in DB"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (BasicAuthentication, TokenAuthentication,)
+    authentication_classes = (
+        CachedBasicAuthentication, CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+
+    max_filter_names = 50
+    match_modes = ('any', 'all')
+    relation_fields = {'tags': Tag, 'ingredients': Ingredient}
+    pagination_ordering = None
+    export_chunk_size = 500
+    match_limit = 10
+    similar_limit = 10
+    # Neighbours fetched from the LSH buckets per result, then re-ranked
+    similar_candidates_per_result = 5
+    max_results = 100
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [str(str_name) for str_name in qs.split(',')]
+    def _params_to_names(self, param, qs):
+        """Split a comma separated query param into unique names"""
+        names = []
+        for name in qs.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        if not names:
+            raise ValidationError({param: 'Provide at least one name.'})
+        if len(names) > self.max_filter_names:
+            raise ValidationError({
+                param: f'Filter by at most {self.max_filter_names} names.'
+            })
+        if any(len(name) > 255 for name in names):
+            raise ValidationError({param: 'Names are at most 255 characters.'})
+        return names
+
+    def _param_to_limit(self, default):
+        """Read the number of results to return from the `limit` param"""
+        try:
+            limit = int(self.request.query_params.get('limit', default))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_results:
+            raise ValidationError({
+                'limit': f'Use a number from 1 to {self.max_results}.'
+            })
+        return limit
+
+    def _filter_by_names(self, queryset, field, names, match):
+        """Keep recipes related to any or all of the given names"""
+        relation = getattr(Recipe, field)
+        related = relation.field.m2m_reverse_field_name()
+        links = relation.through.objects.filter(recipe_id=OuterRef('pk'))
+        if match == 'any':
+            return queryset.filter(
+                Exists(links.filter(**{f'{related}__name__in': names}))
+            )
+        for name in names:
+            queryset = queryset.filter(
+                Exists(links.filter(**{f'{related}__name': name}))
+            )
+        return queryset
 
     """
     Comment following lines of code to be able to see all available recipes in the app.
     """
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
+        match = params.get('match', 'any')
+        if match not in self.match_modes:
+            raise ValidationError({'match': "Use 'any' or 'all'."})
+
         queryset = self.queryset
-        if tags:
-            tag_names = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__name__in=tag_names)
-        if ingredients:
-            ingredient_names = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__name__in=ingredient_names)
+        for param in ('tags', 'ingredients'):
+            if params.get(param):
+                names = self._params_to_names(param, params[param])
+                queryset = self._filter_by_names(
+                    queryset, param, names, match
+                )
+
+        if params.get('q'):
+            terms = search.parse_terms(params['q'])
+            if not terms:
+                raise ValidationError({'q': 'Provide at least one word.'})
+            queryset = search.search_recipes(
+                queryset, terms, self.request.user.pk
+            )
+            # Best matches first instead of newest first
+            self.pagination_ordering = ('search_rank', 'id')
+
+        if self.action in ('list', 'retrieve'):
+            queryset = self.get_serializer_class().setup_eager_loading(
+                queryset
+            )
 
         # return self.queryset.filter(user=self.request.user)
         return queryset.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        """List recipes, answering 304 when nothing changed"""
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 when nothing changed"""
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every matching recipe as NDJSON or one JSON array"""
+        layout = request.query_params.get('as', 'ndjson')
+        if layout not in export.RENDERERS:
+            raise ValidationError({'as': "Use 'ndjson' or 'json'."})
+
+        serializer_class = self.get_serializer_class()
+        queryset = self.get_queryset().only(
+            *serializer_class.eager_fields
+        ).order_by(*(self.pagination_ordering or RecipePagination.ordering))
+        return export.streaming_response(
+            queryset,
+            serializer_class,
+            self.get_serializer_context(),
+            layout,
+            self.export_chunk_size
+        )
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Count the user's recipes by type, tag, ingredient and day"""
+        return Response(stats.recipe_stats(request.user))
+
+    @action(detail=False, methods=['get'])
+    def match(self, request):
+        """Rank recipes by the fraction of their ingredients the user has"""
+        params = request.query_params
+        names = self._params_to_names(
+            'ingredients', params.get('ingredients', '')
+        )
+        limit = self._param_to_limit(self.match_limit)
+
+        # Read before matching, the index is searched under a process lock
+        ingredient_ids = list(Ingredient.objects.filter(
+            user=request.user,
+            name__in=names
+        ).values_list('id', flat=True))
+        if not ingredient_ids:
+            return Response([])
+        ranked = matching.match(request.user.pk, ingredient_ids, limit)
+        if not ranked:
+            return Response([])
+
+        have = set(names)
+        serializer_class = serializers.RecipeSerializer
+        rows = Recipe.objects.filter(
+            user=request.user,
+            pk__in=[recipe_id for _, _, recipe_id in ranked]
+        ).values(*serializer_class.values_fields())
+        with timed('serialize'):
+            recipes = {
+                recipe['id']: recipe
+                for recipe in serializer_class.serialize_rows(rows)
+            }
+            data = []
+            for coverage, matched, recipe_id in ranked:
+                recipe = recipes.get(recipe_id)
+                if recipe is None:
+                    # Deleted since the index was read
+                    continue
+                data.append(dict(
+                    recipe,
+                    matched=matched,
+                    coverage=coverage,
+                    missing=[
+                        name for name in recipe['ingredients']
+                        if name not in have
+                    ],
+                ))
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """List the recipes sharing the most tags and ingredients with one"""
+        limit = self._param_to_limit(self.similar_limit)
+        recipe = self.get_object()
+        shared = dict(similarity.candidates(
+            Recipe,
+            recipe.pk,
+            request.user.pk,
+            limit * self.similar_candidates_per_result
+        ))
+        if not shared:
+            return Response([])
+
+        serializer_class = serializers.RecipeSerializer
+        rows = Recipe.objects.filter(
+            user=request.user,
+            pk__in=[recipe.pk, *shared]
+        ).values(*serializer_class.values_fields())
+        with timed('serialize'):
+            recipes = {
+                row['id']: row for row in serializer_class.serialize_rows(rows)
+            }
+            linked = self._linked_names(recipes.pop(recipe.pk))
+            scores = {
+                pk: similarity.jaccard(linked, self._linked_names(candidate))
+                for pk, candidate in recipes.items()
+            }
+            # Exact similarity first, the buckets shared only break ties
+            ranked = sorted(
+                recipes,
+                key=lambda pk: (scores[pk], shared[pk], pk),
+                reverse=True
+            )
+            data = [
+                dict(recipes[pk], similarity=scores[pk])
+                for pk in ranked[:limit]
+            ]
+        return Response(data)
+
+    @staticmethod
+    def _linked_names(recipe):
+        """Return the tag and ingredient names of a rendered recipe"""
+        return {('tags', name) for name in recipe['tags']} | {
+            ('ingredients', name) for name in recipe['ingredients']
+        }
+
     def get_serializer_class(self):
         """Return a appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
         return self.serializer_class
 
+    def get_serializer_context(self):
+        """Let clients opt in to creating unknown tag and ingredient names"""
+        context = super().get_serializer_context()
+        context['create_missing_names'] = (
+            self.request.query_params.get('create_missing') in ('1', 'true')
+        )
+        return context
+
     def perform_create(self, serializer):
         """Create a new recipe"""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    def get_bulk_context(self, items):
+        """Resolve every tag and ingredient name of the batch up front"""
+        context = super().get_bulk_context(items)
+        resolved = {}
+        for field, model in self.relation_fields.items():
+            names = {
+                name
+                for item in items if isinstance(item, dict)
+                for name in (item.get(field) or ())
+                if isinstance(name, str)
+            }
+            objs = model.objects.filter(
+                user=self.request.user,
+                name__in=names
+            ) if names else ()
+            resolved[model] = {obj.name: obj for obj in objs}
+        context['resolved_names'] = resolved
+        return context
+
+    def perform_bulk_create(self, serializers):
+        """Insert the recipes and their relation rows"""
+        rows = []
+        self._save_new_names(serializers)
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            relations = {
+                field: data.pop(field, []) for field in self.relation_fields
+            }
+            for field, objs in relations.items():
+                data.update(self._summarize(field, objs))
+            rows.append((Recipe(user=self.request.user, **data), relations))
+
+        recipes = [recipe for recipe, _ in rows]
+        using = router.db_for_write(Recipe)
+        deltas = Counter()
+        if not bulk_insert(Recipe, recipes):
+            # Otherwise the save signals counted them
+            deltas.update(counters.recipe_deltas(recipes))
+        deltas.update(self._link_relations(rows, using))
+        counters.add(deltas, using)
+        return recipes
+
+    def perform_bulk_update(self, serializers):
+        """Write the changed fields and replace the given relations"""
+        rows = []
+        self._save_new_names(serializers)
+        fields = {'updated_at'}
+        now = timezone.now()
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            relations = {
+                field: data.pop(field)
+                for field in self.relation_fields if field in data
+            }
+            for field, objs in relations.items():
+                data.update(self._summarize(field, objs))
+            for attr, value in data.items():
+                setattr(serializer.instance, attr, value)
+            serializer.instance.updated_at = now
+            fields.update(data)
+            rows.append((serializer.instance, relations))
+
+        recipes = [recipe for recipe, _ in rows]
+        using = router.db_for_write(Recipe)
+        Recipe.objects.using(using).bulk_update(recipes, sorted(fields))
+        deltas = counters.change_deltas(recipes, using)
+        deltas.update(self._link_relations(rows, using, replace=True))
+        counters.add(deltas, using)
+        return recipes
+
+    def _save_new_names(self, serializers):
+        """Create the unknown names of the batch, now it is valid"""
+        save_new_names(self.request.user, [
+            obj for serializer in serializers
+            for field in self.relation_fields
+            for obj in serializer.validated_data.get(field, ())
+        ])
+
+    def _summarize(self, field, objs):
+        """Return the summary columns of a relation about to be linked"""
+        return summary.summarize(field, [(obj.pk, obj.name) for obj in objs])
+
+    def _link_relations(self, rows, using, replace=False):
+        """
+        Insert the relation rows of a batch, one statement per relation.
+
+        Returns the changes of the tag and ingredient counters.
+        """
+        user_id = self.request.user.pk
+        deltas = Counter()
+        for field in self.relation_fields:
+            relation = getattr(Recipe, field)
+            column = relation.field.m2m_reverse_field_name() + '_id'
+            links = relation.through.objects.using(using)
+            linked = [
+                (recipe, relations[field])
+                for recipe, relations in rows if field in relations
+            ]
+            if replace and linked:
+                recipe_ids = [recipe.pk for recipe, _ in linked]
+                deltas.update(counters.link_deltas(user_id, field, (
+                    counters.linked(Recipe, field, recipe_ids, using=using)
+                ), -1))
+                links.filter(recipe_id__in=recipe_ids).delete()
+            created = links.bulk_create([
+                relation.through(recipe_id=recipe.pk, **{column: obj.pk})
+                for recipe, objs in linked
+                for obj in dict.fromkeys(objs)
+            ])
+            deltas.update(counters.link_deltas(
+                user_id, field, [getattr(link, column) for link in created]
+            ))
+        # The relation rows are written without signals
+        matching.recipes_changed(self.request.user.pk, [
+            recipe.pk for recipe, relations in rows
+            if 'ingredients' in relations
+        ], using)
+        similarity.schedule(
+            Recipe,
+            [recipe.pk for recipe, relations in rows if relations],
+            using
+        )
+        return deltas
+
+    def get_bulk_response_data(self, objs):
+        """Serialize the batch with its relations loaded in bulk"""
+        ids = [recipe.pk for recipe in objs]
+        recipes = serializers.RecipeSerializer.setup_eager_loading(
+            Recipe.objects.all()
+        ).in_bulk(ids)
+        return self.get_serializer(
+            [recipes[pk] for pk in ids],
+            many=True
+        ).data
+
+    def invalidate_bulk(self):
+        """Move the recipe change stamp past the batch"""
+        cache.bump_version(Recipe, self.request.user.pk)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.utils import constant_queries
+
+
+ME_URL = reverse('user:me')
+
+
+class ManageUserQueryCountTests(TestCase):
+    """Test the profile endpoint runs a fixed number of queries"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpassword',
+            name='Test'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, size):
+        """Top the number of users up to `size`"""
+        for index in range(get_user_model().objects.count(), size):
+            get_user_model().objects.create(
+                email=f'user{index}@test.com', name=f'User {index}'
+            )
+
+    @constant_queries('populate', budget=0)
+    def test_retrieve(self):
+        """Test the profile is served without queries"""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @constant_queries('populate', budget=1)
+    def test_update(self):
+        """Test updating the profile runs a fixed number of queries"""
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -1,7 +1,10 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import (
+    CachedBasicAuthentication, CachedTokenAuthentication,
+)
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -17,7 +20,9 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, authentication.BasicAuthentication)
+    authentication_classes = (
+        CachedTokenAuthentication, CachedBasicAuthentication,
+    )
     permission_classes = (permissions.IsAuthenticated, )
 
     def get_object(self):